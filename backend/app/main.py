@@ -1,23 +1,28 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 import uvicorn
 import base64
 import io
-from PIL import Image
 import json
+import zipfile
 from datetime import datetime, date
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import logging
+import numpy as np
 
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from services.crop_disease_service import CropDiseaseService
-from services.crop_recommendation_service import CropRecommendationService
+from services.baseline_store import BaselineStore
+from services.efficiency_history import EfficiencyHistory
+from services.crop_catalog import get_crop_catalog
 from services.field_efficiency_service import FieldEfficiencyService
 from services.harvest_planning_service import HarvestPlanningService
+from utils.executors import InferenceExecutor
+from utils.image_utils import ImageDecodeError
+from utils.lazy_service import LazyService
 from app.models import (
     CropAnalysisRequest, 
     CropAnalysisResponse, 
@@ -27,10 +32,21 @@ from app.models import (
     StatisticsResponse,
     CropRecommendationRequest,
     CropRecommendationResponse,
+    CropRecommendationBatchRequest,
+    CropRecommendationBatchResponse,
+    CropSensitivityRequest,
+    CropSensitivityResponse,
+    CropOutcomeRequest,
+    CropOutcomeResponse,
     FieldEfficiencyRequest,
     FieldEfficiencyResponse,
     FieldComparisonRequest,
     FieldComparisonResponse,
+    FieldEfficiencyReportRequest,
+    FieldEfficiencyReportResponse,
+    FieldHistoryRequest,
+    FieldHistoryQueryRequest,
+    FieldHistoryResponse,
     HarvestPlanningRequest,
     HarvestPlanningResponse
 )
@@ -39,6 +55,22 @@ from app.models import (
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Upload limits
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+MAX_BATCH_IMAGES = int(os.getenv("ANALYZE_BATCH_MAX_IMAGES", 500))
+ARCHIVE_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+RAW_BODY_CONTENT_TYPES = ('image/', 'application/octet-stream')
+MAX_TILES = int(os.getenv("ANALYZE_TILED_MAX_TILES", 64))
+MAX_RECOMMEND_ROWS = int(os.getenv("RECOMMEND_BATCH_MAX_ROWS", 10000))
+MAX_RECOMMEND_NEIGHBORS = int(os.getenv("RECOMMEND_MAX_NEIGHBORS", 50))
+MAX_SENSITIVITY_POINTS = int(os.getenv("RECOMMEND_SENSITIVITY_MAX_POINTS", 20000))
+MAX_SENSITIVITY_STEPS = 101
+MAX_COMPARE_PAGE_SIZE = int(os.getenv("COMPARE_FIELDS_MAX_PAGE_SIZE", 1000))
+MAX_COMPARE_TOP_K = 100
+MAX_BASELINE_FIELDS = int(os.getenv("FIELD_BASELINE_MAX_FIELDS", 50000))
+MAX_HISTORY_FIELDS = int(os.getenv("FIELD_HISTORY_MAX_FIELDS", 50000))
+MAX_HISTORY_WINDOW = 30
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Smart Fasal API",
@@ -67,10 +99,90 @@ app.add_middleware(
 )
 
 # Initialize services
-crop_disease_service = CropDiseaseService()
-crop_recommendation_service = CropRecommendationService()
-field_efficiency_service = FieldEfficiencyService()
+# The ML services import TensorFlow / scikit-learn and load models, so they are built
+# off the import path: in the background at startup (default), on first use ("lazy"),
+# or before the port is bound ("eager"), controlled by SERVICE_LOADING
+SERVICE_LOADING = os.getenv("SERVICE_LOADING", "background").lower()
+crop_disease_service = LazyService.from_import(
+    "crop_disease", "services.crop_disease_service", "CropDiseaseService",
+    warm_up=lambda service: service.warm_up()
+)
+crop_recommendation_service = LazyService.from_import(
+    "crop_recommendation", "services.crop_recommendation_service", "CropRecommendationService",
+    warm_up=lambda service: service.warm_up()
+)
+MODEL_SERVICES = [crop_disease_service, crop_recommendation_service]
+
+# Folds reported crop outcomes into the recommendation model in the background
+recommendation_updater = LazyService.from_import(
+    "recommendation_updater", "services.model_updater", "ModelUpdater",
+    warm_up=lambda updater: updater.start(), service=crop_recommendation_service
+)
+
+# Regional baselines of submitted field results; without them the built-in averages are used
+try:
+    field_baseline_store = BaselineStore()
+except Exception as e:
+    logger.warning(f"Regional field baselines unavailable, using built-in averages: {e}")
+    field_baseline_store = None
+
+# Per-season field scores for trend analytics
+try:
+    field_history_store = EfficiencyHistory()
+except Exception as e:
+    logger.warning(f"Field efficiency history unavailable: {e}")
+    field_history_store = None
+
+# Plain algorithmic services are cheap to build
+field_efficiency_service = FieldEfficiencyService(baseline_store=field_baseline_store,
+                                                  history_store=field_history_store)
 harvest_planning_service = HarvestPlanningService()
+crop_catalog = get_crop_catalog()
+
+# Image decoding and model inference run here, never on the event loop
+inference_executor = InferenceExecutor()
+
+# Cheap sklearn/NumPy/SQLite work (recommendations, field analytics, stores) gets its own
+# small pool, so it never queues behind image decoding and disease inference
+analytics_executor = InferenceExecutor(
+    mode="thread", max_workers=int(os.getenv("ANALYTICS_WORKERS", 2)), name="analytics"
+)
+
+@app.on_event("startup")
+async def load_services():
+    """Start building the ML services according to SERVICE_LOADING"""
+    if SERVICE_LOADING == "lazy":
+        return
+    for service in MODEL_SERVICES:
+        if SERVICE_LOADING == "eager":
+            try:
+                await service.ensure_loaded()
+            except RuntimeError:
+                pass  # Reported as failed by /health
+        else:
+            service.start_background()
+    recommendation_updater.start_background()
+
+@app.on_event("shutdown")
+async def shutdown_inference():
+    """Stop the inference workers"""
+    if crop_disease_service.loaded:
+        crop_disease_service.batcher.close()
+    if recommendation_updater.loaded:
+        recommendation_updater.stop()
+    inference_executor.shutdown()
+    analytics_executor.shutdown()
+    if field_baseline_store is not None:
+        field_baseline_store.close()
+    if field_history_store is not None:
+        field_history_store.close()
+
+async def require_service(service: LazyService):
+    """Wait for a service to be built, answering 503 if it failed to load"""
+    try:
+        await service.ensure_loaded()
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
 @app.get("/")
 async def root():
@@ -84,12 +196,25 @@ async def root():
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
-    """Health check endpoint"""
-    return HealthResponse(
-        status="healthy",
+    """Health check endpoint, 503 until the models are loaded and warmed up"""
+    services = {service.name: service.get_status() for service in MODEL_SERVICES}
+    failed = any(service.state == LazyService.FAILED for service in MODEL_SERVICES)
+    if SERVICE_LOADING == "lazy":
+        # Nothing loads until requested, so only a failure makes the worker unhealthy
+        ready = not failed
+    else:
+        ready = all(service.ready for service in MODEL_SERVICES)
+    
+    health = HealthResponse(
+        status="healthy" if ready else ("unhealthy" if failed else "starting"),
         service="smart-fasal-api",
-        timestamp=datetime.now().isoformat()
+        timestamp=datetime.now().isoformat(),
+        ready=ready,
+        services=services
     )
+    if not ready:
+        return JSONResponse(status_code=503, content=health.model_dump())
+    return health
 
 @app.post("/analyze")
 async def analyze_crop_health(
@@ -110,6 +235,7 @@ async def analyze_crop_health(
     Returns:
         Analysis results with predictions and recommendations
     """
+    await require_service(crop_disease_service)
     try:
         # Validate image file
         if not image.content_type.startswith('image/'):
@@ -119,21 +245,17 @@ async def analyze_crop_health(
         image_data = await image.read()
         
         # Validate image size (10MB limit)
-        if len(image_data) > 10 * 1024 * 1024:
+        if len(image_data) > MAX_IMAGE_BYTES:
             raise HTTPException(status_code=400, detail="Image size must be less than 10MB")
         
-        # Validate image format
-        try:
-            img = Image.open(io.BytesIO(image_data))
-            if img.mode not in ['RGB', 'RGBA', 'L']:
-                raise HTTPException(status_code=400, detail="Unsupported image format")
-        except Exception:
-            raise HTTPException(status_code=400, detail="Invalid image data")
-        
         logger.info(f"Analyzing image: {image.filename}, size: {len(image_data)} bytes")
         
-        # Analyze crop health
-        analysis_result = crop_disease_service.predict(image_data)
+        # Validate, decode and analyze crop health in one pass
+        try:
+            analysis_result = await crop_disease_service.predict_async(image_data, inference_executor)
+        except ImageDecodeError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        image_info = analysis_result.pop('image_info')
         
         # Add metadata
         analysis_result['metadata'] = {
@@ -141,8 +263,8 @@ async def analyze_crop_health(
             'field_id': field_id,
             'crop_type': crop_type,
             'user_id': user_id,
-            'image_size': img.size,
-            'image_format': img.format,
+            'image_size': image_info['size'],
+            'image_format': image_info['format'],
             'file_size': len(image_data),
             'timestamp': datetime.now().isoformat()
         }
@@ -170,6 +292,7 @@ async def analyze_crop_health_base64(request: CropAnalysisRequest):
     Returns:
         Analysis results with predictions and recommendations
     """
+    await require_service(crop_disease_service)
     try:
         # Decode base64 image
         try:
@@ -178,29 +301,25 @@ async def analyze_crop_health_base64(request: CropAnalysisRequest):
             raise HTTPException(status_code=400, detail="Invalid base64 image data")
         
         # Validate image size (10MB limit)
-        if len(image_bytes) > 10 * 1024 * 1024:
+        if len(image_bytes) > MAX_IMAGE_BYTES:
             raise HTTPException(status_code=400, detail="Image size must be less than 10MB")
         
-        # Validate image format
-        try:
-            img = Image.open(io.BytesIO(image_bytes))
-            if img.mode not in ['RGB', 'RGBA', 'L']:
-                raise HTTPException(status_code=400, detail="Unsupported image format")
-        except Exception:
-            raise HTTPException(status_code=400, detail="Invalid image data")
-        
         logger.info(f"Analyzing base64 image, size: {len(image_bytes)} bytes")
         
-        # Analyze crop health
-        analysis_result = crop_disease_service.predict(image_bytes)
+        # Validate, decode and analyze crop health in one pass
+        try:
+            analysis_result = await crop_disease_service.predict_async(image_bytes, inference_executor)
+        except ImageDecodeError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        image_info = analysis_result.pop('image_info')
         
         # Add metadata
         analysis_result['metadata'] = {
             'field_id': request.field_id,
             'crop_type': request.crop_type,
             'user_id': request.user_id,
-            'image_size': img.size,
-            'image_format': img.format,
+            'image_size': image_info['size'],
+            'image_format': image_info['format'],
             'file_size': len(image_bytes),
             'timestamp': datetime.now().isoformat()
         }
@@ -217,9 +336,278 @@ async def analyze_crop_health_base64(request: CropAnalysisRequest):
         logger.error(f"Error in crop health analysis: {e}")
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
+@app.post("/analyze-raw", response_model=CropAnalysisResponse)
+async def analyze_crop_health_raw(
+    request: Request,
+    field_id: Optional[str] = None,
+    crop_type: Optional[str] = None,
+    user_id: Optional[str] = None,
+    filename: Optional[str] = None,
+    x_field_id: Optional[str] = Header(None),
+    x_crop_type: Optional[str] = Header(None),
+    x_user_id: Optional[str] = Header(None),
+    x_filename: Optional[str] = Header(None)
+):
+    """
+    Analyze crop health from a raw image request body
+    
+    The body is the image file itself (Content-Type image/jpeg, image/png, ... or
+    application/octet-stream), sent whole or chunked. It is read chunk by chunk, so
+    the 10MB limit is enforced while receiving and the cache key is hashed on the fly.
+    
+    Args:
+        request: Request whose body is the image
+        field_id: Optional field ID (or X-Field-Id header)
+        crop_type: Optional crop type (or X-Crop-Type header)
+        user_id: Optional user ID (or X-User-Id header)
+        filename: Optional original filename (or X-Filename header)
+    
+    Returns:
+        Analysis results with predictions and recommendations
+    """
+    content_type = request.headers.get('content-type', '')
+    if not content_type.startswith(RAW_BODY_CONTENT_TYPES):
+        raise HTTPException(status_code=415, detail="Body must be an image (image/* or application/octet-stream)")
+    
+    content_length = request.headers.get('content-length')
+    if content_length and content_length.isdigit() and int(content_length) > MAX_IMAGE_BYTES:
+        raise HTTPException(status_code=413, detail="Image size must be less than 10MB")
+    
+    await require_service(crop_disease_service)
+    try:
+        cache = crop_disease_service.cache
+        hasher = cache.new_hasher() if cache.enabled else None
+        
+        # Receive the body straight into the buffer the decoder reads from
+        body = io.BytesIO()
+        file_size = 0
+        async for chunk in request.stream():
+            file_size += len(chunk)
+            if file_size > MAX_IMAGE_BYTES:
+                raise HTTPException(status_code=413, detail="Image size must be less than 10MB")
+            body.write(chunk)
+            if hasher is not None:
+                hasher.update(chunk)
+        
+        if file_size == 0:
+            raise HTTPException(status_code=400, detail="Request body is empty")
+        body.seek(0)
+        
+        logger.info(f"Analyzing raw image, size: {file_size} bytes")
+        
+        # Validate, decode and analyze crop health in one pass
+        try:
+            analysis_result = await crop_disease_service.predict_async(
+                body, inference_executor,
+                cache_key=hasher.hexdigest() if hasher is not None else None
+            )
+        except ImageDecodeError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        image_info = analysis_result.pop('image_info')
+        
+        # Add metadata
+        analysis_result['metadata'] = {
+            'filename': filename or x_filename,
+            'field_id': field_id or x_field_id,
+            'crop_type': crop_type or x_crop_type,
+            'user_id': user_id or x_user_id,
+            'image_size': image_info['size'],
+            'image_format': image_info['format'],
+            'file_size': file_size,
+            'timestamp': datetime.now().isoformat()
+        }
+        
+        return {
+            "success": True,
+            "analysis": analysis_result,
+            "timestamp": datetime.now().isoformat()
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in crop health analysis: {e}")
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+@app.post("/analyze-tiled")
+async def analyze_crop_health_tiled(
+    image: UploadFile = File(...),
+    overlap: float = Form(0.25),
+    max_tiles: int = Form(MAX_TILES),
+    field_id: Optional[str] = Form(None),
+    crop_type: Optional[str] = Form(None),
+    user_id: Optional[str] = Form(None)
+):
+    """
+    Analyze a high-resolution field photo tile by tile
+    
+    The photo is split into overlapping 224px tiles that are scored in batches, so
+    small lesions in a wide canopy shot are not lost to downscaling.
+    
+    Args:
+        image: Image file (JPEG, PNG, etc.)
+        overlap: Fraction of a tile shared with its neighbour (0 to 0.75)
+        max_tiles: Maximum number of tiles (capped by ANALYZE_TILED_MAX_TILES)
+        field_id: Optional field ID
+        crop_type: Optional crop type
+        user_id: Optional user ID
+    
+    Returns:
+        Field-level verdict, per-tile predictions and a disease probability heatmap
+    """
+    await require_service(crop_disease_service)
+    try:
+        # Validate image file
+        if not image.content_type.startswith('image/'):
+            raise HTTPException(status_code=400, detail="File must be an image")
+        if not 0 <= overlap <= 0.75:
+            raise HTTPException(status_code=400, detail="overlap must be between 0 and 0.75")
+        if not 1 <= max_tiles <= MAX_TILES:
+            raise HTTPException(status_code=400, detail=f"max_tiles must be between 1 and {MAX_TILES}")
+        
+        # Read image data
+        image_data = await image.read()
+        
+        # Validate image size (10MB limit)
+        if len(image_data) > MAX_IMAGE_BYTES:
+            raise HTTPException(status_code=400, detail="Image size must be less than 10MB")
+        
+        logger.info(f"Analyzing tiled image: {image.filename}, size: {len(image_data)} bytes")
+        
+        try:
+            analysis_result = await crop_disease_service.predict_tiled_async(
+                image_data, inference_executor, overlap=overlap, max_tiles=max_tiles
+            )
+        except ImageDecodeError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        image_info = analysis_result.pop('image_info')
+        
+        # Add metadata
+        analysis_result['metadata'] = {
+            'filename': image.filename,
+            'field_id': field_id,
+            'crop_type': crop_type,
+            'user_id': user_id,
+            'image_size': image_info['size'],
+            'image_format': image_info['format'],
+            'file_size': len(image_data),
+            'timestamp': datetime.now().isoformat()
+        }
+        
+        return {
+            "success": True,
+            "analysis": analysis_result,
+            "timestamp": datetime.now().isoformat()
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in tiled crop health analysis: {e}")
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+@app.post("/analyze-batch")
+async def analyze_crop_health_batch(
+    images: List[UploadFile] = File([]),
+    archive: Optional[UploadFile] = File(None),
+    field_id: Optional[str] = Form(None),
+    crop_type: Optional[str] = Form(None),
+    user_id: Optional[str] = Form(None)
+):
+    """
+    Analyze many crop images in one request, streaming results as NDJSON
+    
+    Args:
+        images: Image files (JPEG, PNG, etc.)
+        archive: Optional zip archive of images
+        field_id: Optional field ID
+        crop_type: Optional crop type
+        user_id: Optional user ID
+    
+    Returns:
+        One JSON line per image as soon as it is scored, then a summary line
+    """
+    await require_service(crop_disease_service)
+    
+    # Collect (filename, size, reader) entries without reading any pixels yet
+    entries = []
+    for upload in images:
+        entries.append((upload.filename, upload.size, upload.file.read))
+    
+    if archive is not None:
+        try:
+            # Reading the central directory is blocking file I/O
+            zip_file = await inference_executor.run(zipfile.ZipFile, archive.file)
+        except zipfile.BadZipFile:
+            raise HTTPException(status_code=400, detail="Archive must be a valid zip file")
+        for info in zip_file.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(ARCHIVE_IMAGE_EXTENSIONS):
+                continue
+            entries.append((info.filename, info.file_size, lambda info=info: zip_file.read(info)))
+    
+    if not entries:
+        raise HTTPException(status_code=400, detail="No images provided")
+    if len(entries) > MAX_BATCH_IMAGES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IMAGES} images per batch")
+    
+    logger.info(f"Analyzing batch of {len(entries)} images")
+    
+    accepted = [index for index, entry in enumerate(entries) if entry[1] is None or entry[1] <= MAX_IMAGE_BYTES]
+    rejected = sorted(set(range(len(entries))) - set(accepted))
+    
+    def error_line(index: int, detail: str) -> str:
+        return json.dumps({
+            "index": index,
+            "filename": entries[index][0],
+            "success": False,
+            "error": detail
+        }) + "\n"
+    
+    async def stream_results():
+        failed = len(rejected)
+        for index in rejected:
+            yield error_line(index, "Image size must be less than 10MB")
+        
+        async def read_images():
+            # Images are read lazily as the service pulls them, keeping memory bounded; file
+            # reads and zip decompression block, so they run on the executor one at a time
+            for index in accepted:
+                yield await inference_executor.run(entries[index][2])
+        
+        async for position, result in crop_disease_service.predict_many_async(read_images(), inference_executor):
+            index = accepted[position]
+            if isinstance(result, Exception):
+                failed += 1
+                yield error_line(index, str(result))
+                continue
+            
+            image_info = result.pop('image_info')
+            result['metadata'] = {
+                'filename': entries[index][0],
+                'field_id': field_id,
+                'crop_type': crop_type,
+                'user_id': user_id,
+                'image_size': image_info['size'],
+                'image_format': image_info['format'],
+                'timestamp': datetime.now().isoformat()
+            }
+            yield json.dumps({"index": index, "filename": entries[index][0], "success": True, "analysis": result}) + "\n"
+        
+        yield json.dumps({
+            "summary": {
+                "total": len(entries),
+                "succeeded": len(entries) - failed,
+                "failed": failed
+            },
+            "timestamp": datetime.now().isoformat()
+        }) + "\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
 @app.get("/model/info", response_model=ModelInfoResponse)
 async def get_model_info():
     """Get model information"""
+    await require_service(crop_disease_service)
     try:
         model_info = crop_disease_service.get_model_info()
         return ModelInfoResponse(
@@ -231,9 +619,42 @@ async def get_model_info():
         logger.error(f"Error getting model info: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get model info: {str(e)}")
 
+@app.get("/metrics/inference", response_model=dict)
+async def get_inference_metrics():
+    """Get inference metrics (batching histograms, executor and prediction cache)"""
+    await require_service(crop_disease_service)
+    try:
+        return {
+            "success": True,
+            "batching": crop_disease_service.get_batching_stats(),
+            "executor": inference_executor.get_info(),
+            "cache": crop_disease_service.get_cache_stats(),
+            "timestamp": datetime.now().isoformat()
+        }
+    except Exception as e:
+        logger.error(f"Error getting inference metrics: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get inference metrics: {str(e)}")
+
+@app.get("/metrics/recommendation", response_model=dict)
+async def get_recommendation_metrics():
+    """Get crop recommendation metrics (memoization cache, inference kernel and executor)"""
+    await require_service(crop_recommendation_service)
+    try:
+        return {
+            "success": True,
+            "cache": crop_recommendation_service.get_cache_stats(),
+            "kernel": crop_recommendation_service.get_model_info()['inference_kernel'],
+            "executor": analytics_executor.get_info(),
+            "timestamp": datetime.now().isoformat()
+        }
+    except Exception as e:
+        logger.error(f"Error getting recommendation metrics: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get recommendation metrics: {str(e)}")
+
 @app.get("/classes", response_model=ClassesResponse)
 async def get_classes():
     """Get all available disease classes"""
+    await require_service(crop_disease_service)
     try:
         classes = crop_disease_service.get_classes()
         return ClassesResponse(
@@ -273,53 +694,255 @@ async def get_statistics(user_id: Optional[str] = None):
 
 @app.post("/recommend-crop", response_model=CropRecommendationResponse)
 async def recommend_crop(request: CropRecommendationRequest):
-    """Get crop recommendations based on soil and weather parameters using ML model"""
+    """
+    Get crop recommendations based on soil and weather parameters using ML model
+    
+    With `neighbors=k`, the k most similar samples of the training dataset are
+    returned as well, as evidence for the recommendation.
+    """
+    await require_service(crop_recommendation_service)
     try:
+        if request.neighbors is not None and not 0 <= request.neighbors <= MAX_RECOMMEND_NEIGHBORS:
+            raise HTTPException(status_code=400, detail=f"neighbors must be between 0 and {MAX_RECOMMEND_NEIGHBORS}")
+        
         logger.info(f"Getting crop recommendations for N={request.N}, P={request.P}, K={request.K}, pH={request.ph}, temp={request.temperature}")
         
-        # Get ML predictions
-        predictions = crop_recommendation_service.predict_top_n(
-            N=request.N,
-            P=request.P,
-            K=request.K,
-            temperature=request.temperature,
-            humidity=request.humidity,
-            ph=request.ph,
-            rainfall=request.rainfall,
-            n=5  # Get top 5 recommendations
-        )
+        # Get ML predictions with crop details; repeat inputs are answered from the
+        # cache on the loop, only misses are scored on the executor
+        features = [getattr(request, name) for name in crop_recommendation_service.FEATURES]
+        recommendations = crop_recommendation_service.cached_recommendations(features, n=5)
+        if recommendations is None:
+            recommendations = await analytics_executor.run(
+                crop_recommendation_service.score_recommendations, features, n=5  # Get top 5 recommendations
+            )
         
-        # Format recommendations with additional details
-        recommendations = []
-        for pred in predictions:
-            crop_name = pred['crop']
-            details = crop_recommendation_service.get_crop_details(crop_name)
-            
-            recommendations.append({
-                "crop": crop_name.capitalize(),
-                "confidence": pred['confidence'],
-                "suitability": pred['suitability'],
-                "expected_yield": details['expected_yield'],
-                "profit_potential": details['profit_potential'],
-                "market_demand": details['market_demand'],
-                "reasons": [
-                    f"{details['description']}",
-                    f"Ideal for {details['season']} season",
-                    f"Water requirement: {details['water_requirement']}",
-                    f"Expected yield: {details['expected_yield']} quintals per acre"
-                ]
-            })
+        neighbors = None
+        if request.neighbors:
+            neighbors = await analytics_executor.run(
+                crop_recommendation_service.find_neighbors,
+                N=request.N,
+                P=request.P,
+                K=request.K,
+                temperature=request.temperature,
+                humidity=request.humidity,
+                ph=request.ph,
+                rainfall=request.rainfall,
+                k=request.neighbors
+            )
+            if neighbors is None:
+                raise HTTPException(status_code=503, detail="Neighbor index is not available")
         
         return CropRecommendationResponse(
             success=True,
             recommendations=recommendations,
+            neighbors=neighbors,
             timestamp=datetime.now().isoformat()
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting crop recommendations: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get crop recommendations: {str(e)}")
 
+@app.post("/recommend-crop-batch", response_model=CropRecommendationBatchResponse)
+async def recommend_crop_batch(request: CropRecommendationBatchRequest):
+    """
+    Get crop recommendations for many soil samples in one call
+    
+    Each feature is an array with one value per sample. All samples are scaled and
+    scored in a single predict_proba call; each result row lists the top_n crops
+    with their confidence in percent.
+    """
+    await require_service(crop_recommendation_service)
+    try:
+        columns = [getattr(request, name) for name in crop_recommendation_service.FEATURES]
+        rows = len(columns[0])
+        if any(len(column) != rows for column in columns):
+            raise HTTPException(status_code=400, detail="All feature arrays must have the same length")
+        if not 1 <= rows <= MAX_RECOMMEND_ROWS:
+            raise HTTPException(status_code=400, detail=f"Between 1 and {MAX_RECOMMEND_ROWS} samples are allowed per request")
+        if request.top_n < 1:
+            raise HTTPException(status_code=400, detail="top_n must be at least 1")
+        
+        logger.info(f"Getting crop recommendations for {rows} samples")
+        
+        features = np.column_stack(columns).astype(np.float64, copy=False)
+        # One bundle for scores and labels, even if an update swaps it meanwhile
+        bundle = crop_recommendation_service.bundle
+        top_indices, top_probabilities = await analytics_executor.run(
+            crop_recommendation_service.predict_top_n_batch, features, request.top_n, bundle=bundle
+        )
+        
+        labels = np.array([crop_recommendation_service.catalog.display_name(label) for label in bundle.class_labels])
+        crops = labels[top_indices].tolist()
+        confidences = np.round(top_probabilities * 100, 2).tolist()
+        results = [
+            {"crops": row_crops, "confidence": row_confidence}
+            for row_crops, row_confidence in zip(crops, confidences)
+        ]
+        
+        crop_details = None
+        if request.include_details:
+            # Details once per distinct crop instead of once per result
+            crop_details = {
+                crop: crop_recommendation_service.get_crop_details(crop)
+                for crop in np.unique(labels[top_indices]).tolist()
+            }
+        
+        return CropRecommendationBatchResponse(
+            success=True,
+            count=rows,
+            results=results,
+            crop_details=crop_details,
+            timestamp=datetime.now().isoformat()
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting batch crop recommendations: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get crop recommendations: {str(e)}")
+
+@app.post("/recommend-crop/sensitivity", response_model=CropSensitivityResponse)
+async def recommend_crop_sensitivity(request: CropSensitivityRequest):
+    """
+    What-if analysis: how crop suitability changes as selected inputs vary
+    
+    Every combination of the given feature ranges (the other features stay at the
+    base profile) is scored in one vectorized predict_proba pass. For each crop the
+    response has its confidence surface over the grid, one axis per varied feature in
+    `features` order, and the smallest input change reaching `target_confidence`
+    (null if no grid point does).
+    """
+    await require_service(crop_recommendation_service)
+    try:
+        features = crop_recommendation_service.FEATURES
+        unknown = [name for name in request.ranges if name not in features]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown features: {', '.join(unknown)}; expected some of {', '.join(features)}")
+        if not request.ranges:
+            raise HTTPException(status_code=400, detail="At least one feature range is required")
+        
+        points = 1
+        for name, value_range in request.ranges.items():
+            if not 2 <= value_range.steps <= MAX_SENSITIVITY_STEPS:
+                raise HTTPException(status_code=400, detail=f"steps of {name} must be between 2 and {MAX_SENSITIVITY_STEPS}")
+            if value_range.min > value_range.max:
+                raise HTTPException(status_code=400, detail=f"min of {name} must not exceed max")
+            points *= value_range.steps
+        if points > MAX_SENSITIVITY_POINTS:
+            raise HTTPException(status_code=400, detail=f"Grid has {points} points, at most {MAX_SENSITIVITY_POINTS} are allowed")
+        if not 0 <= request.target_confidence <= 100:
+            raise HTTPException(status_code=400, detail="target_confidence must be between 0 and 100")
+        if request.top_n < 1:
+            raise HTTPException(status_code=400, detail="top_n must be at least 1")
+        
+        logger.info(f"Scoring sensitivity grid of {points} points over {', '.join(request.ranges)}")
+        
+        try:
+            result = await analytics_executor.run(
+                crop_recommendation_service.sensitivity_grid,
+                {name: getattr(request, name) for name in features},
+                {name: (r.min, r.max, r.steps) for name, r in request.ranges.items()},
+                crops=request.crops,
+                target_confidence=request.target_confidence,
+                top_n=request.top_n
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        return CropSensitivityResponse(
+            success=True,
+            **result,
+            timestamp=datetime.now().isoformat()
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error computing crop sensitivity: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to compute crop sensitivity: {str(e)}")
+
+@app.post("/recommend-crop/outcomes", response_model=CropOutcomeResponse)
+async def report_crop_outcomes(request: CropOutcomeRequest):
+    """
+    Report soil samples with the crop actually grown successfully on them
+    
+    Samples are appended to the outcome store and folded into the recommendation
+    model by the next background update. Crops are matched through the crop catalog;
+    unknown ones are rejected per sample.
+    """
+    await require_service(crop_recommendation_service)
+    await require_service(recommendation_updater)
+    try:
+        if not 1 <= len(request.samples) <= MAX_RECOMMEND_ROWS:
+            raise HTTPException(status_code=400, detail=f"Between 1 and {MAX_RECOMMEND_ROWS} samples are allowed per request")
+        
+        features, crops, rejected = [], [], []
+        for index, sample in enumerate(request.samples):
+            crop_id = crop_catalog.resolve(sample.crop)
+            if crop_id is None:
+                rejected.append({"index": index, "crop": sample.crop, "reason": "Unknown crop"})
+                continue
+            features.append([getattr(sample, name) for name in crop_recommendation_service.FEATURES])
+            crops.append(crop_id)
+        
+        store = recommendation_updater.store
+        if crops:
+            stored = await analytics_executor.run(store.append, np.array(features, dtype=np.float64), crops)
+        else:
+            stored = store.count()
+        logger.info(f"Stored {len(crops)} crop outcomes ({len(rejected)} rejected), {stored} in total")
+        
+        return CropOutcomeResponse(
+            success=True,
+            accepted=len(crops),
+            rejected=rejected,
+            stored=stored,
+            timestamp=datetime.now().isoformat()
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error storing crop outcomes: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to store crop outcomes: {str(e)}")
+
+@app.get("/recommend-crop/update", response_model=dict)
+async def get_recommendation_update_status():
+    """Get the state of background recommendation model updates"""
+    await require_service(crop_recommendation_service)
+    await require_service(recommendation_updater)
+    try:
+        return {
+            "success": True,
+            "model_version": crop_recommendation_service.model_version,
+            "pending_outcomes": await analytics_executor.run(recommendation_updater.pending),
+            "updater": recommendation_updater.get().get_status(),
+            "timestamp": datetime.now().isoformat()
+        }
+    except Exception as e:
+        logger.error(f"Error getting update status: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get update status: {str(e)}")
+
+@app.post("/recommend-crop/update", status_code=202, response_model=dict)
+async def trigger_recommendation_update():
+    """Start a recommendation model update now, whatever the number of new outcomes"""
+    await require_service(crop_recommendation_service)
+    await require_service(recommendation_updater)
+    try:
+        started = recommendation_updater.trigger()
+        return {
+            "success": True,
+            "started": started,
+            "updater": recommendation_updater.get().get_status(),
+            "timestamp": datetime.now().isoformat()
+        }
+    except Exception as e:
+        logger.error(f"Error starting model update: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to start model update: {str(e)}")
+
 @app.post("/calculate-field-efficiency", response_model=FieldEfficiencyResponse)
 async def calculate_field_efficiency(request: FieldEfficiencyRequest):
     """Calculate field efficiency metrics using algorithmic approach"""
@@ -327,19 +950,7 @@ async def calculate_field_efficiency(request: FieldEfficiencyRequest):
         logger.info(f"Calculating efficiency for {request.crop_type} crop")
         
         # Convert request to field data dict
-        field_data = {
-            'crop_type': request.crop_type,
-            'area_acres': request.area_acres,
-            'name': request.name,
-            'actual_yield': request.actual_yield,
-            'water_used_liters': request.water_used_liters,
-            'fertilizer_n_kg': request.fertilizer_n_kg,
-            'fertilizer_p_kg': request.fertilizer_p_kg,
-            'fertilizer_k_kg': request.fertilizer_k_kg,
-            'cost_per_acre': request.cost_per_acre,
-            'labor_hours': request.labor_hours,
-            'fuel_liters': request.fuel_liters
-        }
+        field_data = request.model_dump()
         
         # Calculate efficiency
         efficiency = field_efficiency_service.calculate_efficiency(field_data)
@@ -356,29 +967,35 @@ async def calculate_field_efficiency(request: FieldEfficiencyRequest):
 
 @app.post("/compare-fields", response_model=FieldComparisonResponse)
 async def compare_fields(request: FieldComparisonRequest):
-    """Compare efficiency across multiple fields"""
+    """
+    Compare efficiency across multiple fields
+    
+    Returns one page of fields (with rank and percentile by overall efficiency),
+    per-metric distributions and top/bottom `top_k` fields, and per-crop aggregates.
+    """
     try:
+        if request.offset < 0:
+            raise HTTPException(status_code=400, detail="offset must not be negative")
+        if request.limit is not None and not 1 <= request.limit <= MAX_COMPARE_PAGE_SIZE:
+            raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_COMPARE_PAGE_SIZE}")
+        if not 0 <= request.top_k <= MAX_COMPARE_TOP_K:
+            raise HTTPException(status_code=400, detail=f"top_k must be between 0 and {MAX_COMPARE_TOP_K}")
+        
         logger.info(f"Comparing efficiency for {len(request.fields)} fields")
         
-        # Convert request to field data dicts
-        fields_data = []
-        for field_req in request.fields:
-            fields_data.append({
-                'crop_type': field_req.crop_type,
-                'area_acres': field_req.area_acres,
-                'name': field_req.name,
-                'actual_yield': field_req.actual_yield,
-                'water_used_liters': field_req.water_used_liters,
-                'fertilizer_n_kg': field_req.fertilizer_n_kg,
-                'fertilizer_p_kg': field_req.fertilizer_p_kg,
-                'fertilizer_k_kg': field_req.fertilizer_k_kg,
-                'cost_per_acre': field_req.cost_per_acre,
-                'labor_hours': field_req.labor_hours,
-                'fuel_liters': field_req.fuel_liters
-            })
-        
-        # Get comparison
-        comparison = field_efficiency_service.get_field_comparison(fields_data)
+        # Request models are read column by column, without per-field dicts
+        try:
+            comparison = await analytics_executor.run(
+                field_efficiency_service.get_field_comparison,
+                request.fields,
+                offset=request.offset,
+                limit=request.limit,
+                sort_by=request.sort_by,
+                top_k=request.top_k,
+                metrics=request.metrics
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         return FieldComparisonResponse(
             success=True,
@@ -386,6 +1003,8 @@ async def compare_fields(request: FieldComparisonRequest):
             timestamp=datetime.now().isoformat()
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error comparing fields: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to compare fields: {str(e)}")
@@ -397,19 +1016,7 @@ async def get_resource_breakdown(request: FieldEfficiencyRequest):
         logger.info(f"Getting resource breakdown for {request.crop_type} crop")
         
         # Convert request to field data dict
-        field_data = {
-            'crop_type': request.crop_type,
-            'area_acres': request.area_acres,
-            'name': request.name,
-            'actual_yield': request.actual_yield,
-            'water_used_liters': request.water_used_liters,
-            'fertilizer_n_kg': request.fertilizer_n_kg,
-            'fertilizer_p_kg': request.fertilizer_p_kg,
-            'fertilizer_k_kg': request.fertilizer_k_kg,
-            'cost_per_acre': request.cost_per_acre,
-            'labor_hours': request.labor_hours,
-            'fuel_liters': request.fuel_liters
-        }
+        field_data = request.model_dump()
         
         # Get resource breakdown
         breakdown = field_efficiency_service.get_resource_breakdown(field_data)
@@ -424,6 +1031,191 @@ async def get_resource_breakdown(request: FieldEfficiencyRequest):
         logger.error(f"Error getting resource breakdown: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get resource breakdown: {str(e)}")
 
+@app.post("/field-efficiency-report", response_model=FieldEfficiencyReportResponse)
+async def get_field_efficiency_report(request: FieldEfficiencyReportRequest):
+    """
+    Get several efficiency views of one field in one call
+    
+    `views` picks any of scores (as /calculate-field-efficiency, without
+    recommendations), breakdown (as /resource-breakdown), recommendations and
+    comparison (each score against its regional average). The field is scored once
+    and all views share the result.
+    """
+    try:
+        logger.info(f"Building efficiency report for {request.crop_type} crop")
+        
+        field_data = request.model_dump(exclude={'views'})
+        try:
+            report = field_efficiency_service.get_efficiency_report(field_data, request.views)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        return FieldEfficiencyReportResponse(
+            success=True,
+            views=list(report),
+            report=report,
+            timestamp=datetime.now().isoformat()
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error building efficiency report: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to build efficiency report: {str(e)}")
+
+@app.post("/field-baselines", response_model=dict)
+async def submit_field_baselines(request: FieldComparisonRequest):
+    """
+    Submit field results to the regional baselines
+    
+    Every field is scored and its scores, yield, cost, labor and fuel are added to
+    the running aggregates of its `region` and crop. Once a region/crop has
+    FIELD_BASELINE_MIN_SAMPLES results, efficiency calculations for it compare
+    against these peers instead of the built-in averages.
+    """
+    if field_baseline_store is None:
+        raise HTTPException(status_code=503, detail="Regional field baselines are not available")
+    try:
+        if not 1 <= len(request.fields) <= MAX_BASELINE_FIELDS:
+            raise HTTPException(status_code=400, detail=f"Between 1 and {MAX_BASELINE_FIELDS} fields are allowed per request")
+        
+        logger.info(f"Adding {len(request.fields)} fields to regional baselines")
+        
+        result = await analytics_executor.run(field_efficiency_service.record_baselines, request.fields)
+        return {
+            "success": True,
+            **result,
+            "timestamp": datetime.now().isoformat()
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error updating field baselines: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to update field baselines: {str(e)}")
+
+@app.get("/field-baselines", response_model=dict)
+async def get_field_baselines(region: Optional[str] = None, crop: Optional[str] = None):
+    """
+    Get the baseline aggregates of a region and crop
+    
+    Omit `region` or `crop` for the roll-up over all regions or crops. Each metric has
+    its count, mean, standard deviation, extremes and approximate percentiles.
+    """
+    if field_baseline_store is None:
+        raise HTTPException(status_code=503, detail="Regional field baselines are not available")
+    try:
+        return {
+            "success": True,
+            "baselines": field_baseline_store.summary(region, crop),
+            "store": field_baseline_store.get_stats(),
+            "timestamp": datetime.now().isoformat()
+        }
+    except Exception as e:
+        logger.error(f"Error getting field baselines: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get field baselines: {str(e)}")
+
+@app.post("/field-efficiency-history", response_model=FieldHistoryResponse)
+async def record_field_history(request: FieldHistoryRequest):
+    """
+    Record the efficiency scores of fields for a season
+    
+    Every field needs a `field_id` and a `season` (YYYY, or YYYY-kharif/rabi/zaid).
+    Recording a field again for the same season replaces its scores.
+    """
+    if field_history_store is None:
+        raise HTTPException(status_code=503, detail="Field efficiency history is not available")
+    try:
+        if not 1 <= len(request.fields) <= MAX_HISTORY_FIELDS:
+            raise HTTPException(status_code=400, detail=f"Between 1 and {MAX_HISTORY_FIELDS} fields are allowed per request")
+        
+        logger.info(f"Recording efficiency history of {len(request.fields)} fields")
+        
+        history = await analytics_executor.run(field_efficiency_service.record_history, request.fields)
+        return FieldHistoryResponse(
+            success=True,
+            history=history,
+            timestamp=datetime.now().isoformat()
+        )
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error recording field history: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to record field history: {str(e)}")
+
+@app.post("/field-efficiency-history/query", response_model=FieldHistoryResponse)
+async def query_field_history(request: FieldHistoryQueryRequest):
+    """
+    Get rolling averages, trends and anomalies of field efficiency across seasons
+    
+    For each field's latest season: the mean of the last `window` seasons, the
+    least-squares trend per year (over the latest `trend_window` seasons if given)
+    and the z-score against the `window` seasons before it, flagged as an anomaly
+    from `anomaly_threshold`. Fields are paged with `offset`/`limit`, optionally
+    ordered by `trend` or `anomaly`.
+    """
+    if field_history_store is None:
+        raise HTTPException(status_code=503, detail="Field efficiency history is not available")
+    try:
+        if request.offset < 0:
+            raise HTTPException(status_code=400, detail="offset must not be negative")
+        if request.limit is not None and not 1 <= request.limit <= MAX_COMPARE_PAGE_SIZE:
+            raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_COMPARE_PAGE_SIZE}")
+        if not 1 <= request.window <= MAX_HISTORY_WINDOW:
+            raise HTTPException(status_code=400, detail=f"window must be between 1 and {MAX_HISTORY_WINDOW}")
+        if request.field_ids is not None and len(request.field_ids) > MAX_HISTORY_FIELDS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_HISTORY_FIELDS} field IDs are allowed per request")
+        
+        history = await analytics_executor.run(
+            field_efficiency_service.get_efficiency_trends,
+            request.field_ids,
+            metric=request.metric,
+            window=request.window,
+            trend_window=request.trend_window,
+            anomaly_threshold=request.anomaly_threshold,
+            offset=request.offset,
+            limit=request.limit,
+            sort_by=request.sort_by,
+            include_series=request.include_series
+        )
+        return FieldHistoryResponse(
+            success=True,
+            history=history,
+            timestamp=datetime.now().isoformat()
+        )
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error querying field history: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to query field history: {str(e)}")
+
+@app.get("/field-efficiency-history/{field_id}", response_model=FieldHistoryResponse)
+async def get_field_history(field_id: str):
+    """Get every recorded season of one field with its scores"""
+    if field_history_store is None:
+        raise HTTPException(status_code=503, detail="Field efficiency history is not available")
+    try:
+        history = await analytics_executor.run(field_efficiency_service.get_field_history, field_id)
+        if history is None:
+            raise HTTPException(status_code=404, detail=f"No history for field '{field_id}'")
+        return FieldHistoryResponse(
+            success=True,
+            history=history,
+            timestamp=datetime.now().isoformat()
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting field history: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get field history: {str(e)}")
+
 @app.post("/plan-harvest", response_model=HarvestPlanningResponse)
 async def plan_harvest(request: HarvestPlanningRequest):
     """Calculate optimal harvest timing using algorithmic approach"""
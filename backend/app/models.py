@@ -20,6 +20,8 @@ class HealthResponse(BaseModel):
     status: str
     service: str
     timestamp: str
+    ready: bool = True
+    services: Optional[Dict[str, Any]] = None
 
 class ModelInfoResponse(BaseModel):
     """Model information response model"""
@@ -49,11 +51,87 @@ class CropRecommendationRequest(BaseModel):
     humidity: float
     ph: float
     rainfall: float
+    neighbors: Optional[int] = None  # Similar historical samples to return
 
 class CropRecommendationResponse(BaseModel):
     """Response model for crop recommendation"""
     success: bool
     recommendations: list
+    neighbors: Optional[List[Dict[str, Any]]] = None
+    timestamp: str
+
+class CropOutcome(BaseModel):
+    """A soil sample with the crop that was actually grown successfully on it"""
+    N: float
+    P: float
+    K: float
+    temperature: float
+    humidity: float
+    ph: float
+    rainfall: float
+    crop: str
+
+class CropOutcomeRequest(BaseModel):
+    """Request model for reporting crop outcomes"""
+    samples: List[CropOutcome]
+
+class CropOutcomeResponse(BaseModel):
+    """Response model for reported crop outcomes"""
+    success: bool
+    accepted: int
+    rejected: List[Dict[str, Any]]
+    stored: int
+    timestamp: str
+
+class CropRecommendationBatchRequest(BaseModel):
+    """Request model for batch crop recommendation, one array per feature"""
+    N: List[float]
+    P: List[float]
+    K: List[float]
+    temperature: List[float]
+    humidity: List[float]
+    ph: List[float]
+    rainfall: List[float]
+    top_n: int = 3
+    include_details: bool = False
+
+class CropRecommendationBatchResponse(BaseModel):
+    """Response model for batch crop recommendation"""
+    success: bool
+    count: int
+    results: list
+    crop_details: Optional[Dict[str, Any]] = None
+    timestamp: str
+
+class SensitivityRange(BaseModel):
+    """Values a feature takes in a sensitivity grid"""
+    min: float
+    max: float
+    steps: int = 11
+
+class CropSensitivityRequest(BaseModel):
+    """Request model for what-if sensitivity analysis around a soil profile"""
+    N: float
+    P: float
+    K: float
+    temperature: float
+    humidity: float
+    ph: float
+    rainfall: float
+    ranges: Dict[str, SensitivityRange]  # Varied features, by feature name
+    crops: Optional[List[str]] = None  # Defaults to the top_n crops at the base profile
+    target_confidence: float = 50.0  # Percent
+    top_n: int = 3
+
+class CropSensitivityResponse(BaseModel):
+    """Response model for sensitivity analysis"""
+    success: bool
+    features: List[str]
+    axes: Dict[str, List[float]]
+    grid_points: int
+    target_confidence: float
+    model_version: str
+    crops: List[Dict[str, Any]]
     timestamp: str
 
 class FieldEfficiencyRequest(BaseModel):
@@ -69,6 +147,9 @@ class FieldEfficiencyRequest(BaseModel):
     cost_per_acre: Optional[float] = None  # ₹/acre
     labor_hours: Optional[float] = None  # hours/acre
     fuel_liters: Optional[float] = None  # liters/acre
+    region: Optional[str] = None  # Region for peer baselines, e.g. district
+    field_id: Optional[str] = None  # Stable field ID for the season history
+    season: Optional[str] = None  # Season for the history: YYYY or YYYY-kharif/rabi/zaid
 
 class FieldEfficiencyResponse(BaseModel):
     """Response model for field efficiency calculation"""
@@ -76,9 +157,25 @@ class FieldEfficiencyResponse(BaseModel):
     efficiency: dict
     timestamp: str
 
+class FieldEfficiencyReportRequest(FieldEfficiencyRequest):
+    """Request model for a multi-view field efficiency report"""
+    views: Optional[List[str]] = None  # scores, breakdown, recommendations, comparison; all when omitted
+
+class FieldEfficiencyReportResponse(BaseModel):
+    """Response model for a multi-view field efficiency report"""
+    success: bool
+    views: List[str]
+    report: Dict[str, Any]
+    timestamp: str
+
 class FieldComparisonRequest(BaseModel):
     """Request model for field comparison"""
     fields: List[FieldEfficiencyRequest]
+    offset: int = 0  # First field of the returned page
+    limit: Optional[int] = None  # Fields per page, all when omitted
+    sort_by: Optional[str] = None  # Metric the page is ordered by, input order when omitted
+    top_k: int = 5  # Best and worst fields listed per metric
+    metrics: Optional[List[str]] = None  # Metrics summarized, defaults to all scores
 
 class FieldComparisonResponse(BaseModel):
     """Response model for field comparison"""
@@ -86,6 +183,28 @@ class FieldComparisonResponse(BaseModel):
     comparison: dict
     timestamp: str
 
+class FieldHistoryRequest(BaseModel):
+    """Request model for recording field efficiency history"""
+    fields: List[FieldEfficiencyRequest]  # Each with field_id and season
+
+class FieldHistoryQueryRequest(BaseModel):
+    """Request model for field efficiency trends"""
+    field_ids: Optional[List[str]] = None  # All fields when omitted
+    metric: str = 'overall_efficiency'
+    window: int = 3  # Recorded seasons of each field per rolling mean and anomaly baseline
+    trend_window: Optional[int] = None  # Latest seasons the trend is fitted on, all when omitted
+    anomaly_threshold: float = 2.0  # Absolute z-score flagged as an anomaly
+    offset: int = 0  # First field of the returned page
+    limit: Optional[int] = None  # Fields per page, all when omitted
+    sort_by: Optional[str] = None  # trend or anomaly (largest first), field order when omitted
+    include_series: bool = False  # Include each field's season values
+
+class FieldHistoryResponse(BaseModel):
+    """Response model for field efficiency history"""
+    success: bool
+    history: dict
+    timestamp: str
+
 class HarvestPlanningRequest(BaseModel):
     """Request model for harvest planning"""
     planting_date: str  # YYYY-MM-DD
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Field Efficiency Benchmark
+Checks the vectorized field efficiency engine against calculate_efficiency and times both
+
+Usage (from the backend directory):
+    python -m scripts.benchmark_field_efficiency
+    python -m scripts.benchmark_field_efficiency --fields 20000 --seed 1
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.field_efficiency_engine import FieldColumns
+from services.field_efficiency_service import FieldEfficiencyService
+
+# Typical range of each input; values are drawn around it, with missing and edge values mixed in
+INPUT_RANGES = {
+    'actual_yield': (0, 60),
+    'water_used_liters': (0, 8000000),
+    'fertilizer_n_kg': (0, 120),
+    'fertilizer_p_kg': (0, 80),
+    'fertilizer_k_kg': (0, 60),
+    'cost_per_acre': (0, 5000),
+    'labor_hours': (0, 90),
+    'fuel_liters': (0, 30)
+}
+
+
+def random_fields(count: int, seed: int, crops: List[str]) -> List[Dict]:
+    """Field data dicts with missing, zero, negative and non-finite inputs mixed in"""
+    rng = np.random.default_rng(seed)
+    edge_values = [None, 0.0, -1.0, float('nan'), float('inf'), 1e-300]
+    fields = []
+    for index in range(count):
+        field = {
+            'name': f"Field {index}",
+            'crop_type': crops[rng.integers(len(crops))],
+            'area_acres': float(rng.uniform(0.5, 50))
+        }
+        for key, (low, high) in INPUT_RANGES.items():
+            draw = rng.random()
+            if draw < 0.2:
+                field[key] = None
+            elif draw < 0.25:
+                field[key] = edge_values[rng.integers(len(edge_values))]
+            else:
+                field[key] = float(rng.uniform(low, high))
+        fields.append(field)
+    return fields
+
+
+def same(expected, actual) -> bool:
+    """Exact equality, NaN equal to NaN"""
+    if isinstance(expected, float) and isinstance(actual, float) and expected != expected:
+        return actual != actual
+    return expected == actual
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and time the vectorized field efficiency engine")
+    parser.add_argument("--fields", type=int, default=20000, help="Number of random fields")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    service = FieldEfficiencyService()
+    crops = [entry.id for entry in service.catalog.entries] + ["unlisted crop", "Paddy"]
+    fields = random_fields(args.fields, args.seed, crops)
+
+    started = time.perf_counter()
+    expected = [service.calculate_efficiency(field) for field in fields]
+    scalar_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    columns = FieldColumns.from_records(fields)
+    load_seconds = time.perf_counter() - started
+    scores = service.score_fields(columns)
+    score_seconds = time.perf_counter() - started - load_seconds
+    actual = scores.to_dicts()
+    total_seconds = time.perf_counter() - started
+
+    mismatches = [
+        (index, key, expected_result[key], actual_result[key])
+        for index, (expected_result, actual_result) in enumerate(zip(expected, actual))
+        for key in expected_result
+        if not same(expected_result[key], actual_result[key])
+    ]
+
+    print(f"{args.fields} fields")
+    print(f"  scalar calculate_efficiency: {scalar_seconds * 1000:9.1f} ms")
+    print(f"  engine load columns:         {load_seconds * 1000:9.1f} ms")
+    print(f"  engine score:                {score_seconds * 1000:9.1f} ms")
+    print(f"  engine total with dicts:     {total_seconds * 1000:9.1f} ms")
+    print(f"  mismatching values:          {len(mismatches)}")
+    for mismatch in mismatches[:10]:
+        print(f"    field {mismatch[0]} {mismatch[1]}: scalar {mismatch[2]!r}, engine {mismatch[3]!r}")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tree Kernel Benchmark
+Checks the NumPy tree kernel against sklearn's predict_proba and times both per batch size
+
+Usage (from the backend directory):
+    python -m scripts.benchmark_tree_kernel
+    python -m scripts.benchmark_tree_kernel --batch-sizes 1,8,32,128,1024 --repeats 50
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.crop_recommendation_service import CropRecommendationService
+from services.tree_kernel import TreeEnsembleKernel
+
+
+def time_call(fn: Callable[[], object], repeats: int) -> float:
+    """Median wall time of a call in milliseconds"""
+    fn()  # warm-up
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return float(np.median(timings))
+
+
+def check_parity(service: CropRecommendationService, kernel: TreeEnsembleKernel, features: np.ndarray) -> Dict:
+    """Compare kernel and sklearn probabilities on the same rows"""
+    expected = service.model.predict_proba(service.scaler.transform(pd.DataFrame(features, columns=service.FEATURES)))
+    actual = kernel.predict_proba(features)
+    return {
+        'rows': len(features),
+        'max_abs_diff': float(np.abs(actual - expected).max()),
+        'top1_agreement': float(np.mean(actual.argmax(axis=1) == expected.argmax(axis=1)))
+    }
+
+
+def benchmark(service: CropRecommendationService, kernel: TreeEnsembleKernel, features: np.ndarray,
+              batch_sizes: List[int], repeats: int) -> List[Dict]:
+    """Time the previous DataFrame path, sklearn on NumPy-scaled input and the kernel"""
+    rng = np.random.default_rng(0)
+    results = []
+    for batch_size in batch_sizes:
+        batch = features[rng.integers(0, len(features), batch_size)]
+        runs = max(3, repeats if batch_size <= 256 else repeats // 10)
+        frame = lambda: service.model.predict_proba(
+            service.scaler.transform(pd.DataFrame(batch, columns=service.FEATURES))
+        )
+        results.append({
+            'batch_size': batch_size,
+            'sklearn_dataframe_ms': time_call(frame, runs),
+            'sklearn_numpy_ms': time_call(lambda: service.model.predict_proba(service.scale_features(batch)), runs),
+            'kernel_ms': time_call(lambda: kernel.predict_proba(batch), runs)
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and benchmark the crop recommendation tree kernel")
+    parser.add_argument("--batch-sizes", default="1,8,32,64,256,1024,10000")
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    service = CropRecommendationService()
+    try:
+        kernel = service.kernel or TreeEnsembleKernel.from_sklearn(service.model, service.scaler)
+    except TypeError as e:
+        print(f"Served model has no tree kernel: {e}")
+        return
+    print(f"Kernel: {kernel.get_info()}")
+
+    data = pd.read_csv(service.data_path)[service.FEATURES].to_numpy(dtype=np.float64)
+    rng = np.random.default_rng(1)
+    low, high = data.min(axis=0), data.max(axis=0)
+    synthetic = low + rng.random((5000, data.shape[1])) * (high - low)
+
+    for name, features in (('dataset', data), ('synthetic', synthetic)):
+        report = check_parity(service, kernel, features)
+        print(f"Parity on {name}: {report['rows']} rows, max |dp| {report['max_abs_diff']:.3g}, "
+              f"top-1 agreement {report['top1_agreement']:.4f}")
+
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",") if size.strip()]
+    print(f"\n{'batch':>8}{'df+sklearn ms':>16}{'sklearn ms':>13}{'kernel ms':>12}{'speedup':>10}")
+    for row in benchmark(service, kernel, data, batch_sizes, args.repeats):
+        speedup = row['sklearn_dataframe_ms'] / row['kernel_ms']
+        print(f"{row['batch_size']:>8}{row['sklearn_dataframe_ms']:>16.3f}{row['sklearn_numpy_ms']:>13.3f}"
+              f"{row['kernel_ms']:>12.3f}{speedup:>9.1f}x")
+    print(f"\nService uses the kernel up to RECOMMEND_KERNEL_MAX_ROWS={service.kernel_max_rows} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+TFLite Model Builder
+Converts the plant_disease SavedModel to float16 and full-int8 TFLite variants and
+reports their top-1 agreement and latency against the SavedModel
+
+Usage (from the backend directory):
+    python -m scripts.build_tflite --calibration-dir /data/plantvillage/val
+    python -m scripts.build_tflite --calibration-dir /data/val --promote int8
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.image_utils import ImageDecodeError, decode_image
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+VARIANTS = ('float16', 'int8')
+
+
+def find_images(image_dir: str, limit: int, seed: int = 42) -> List[str]:
+    """
+    Find image files under a directory (class sub-folders are fine)
+
+    Args:
+        image_dir: Root directory to search
+        limit: Maximum number of images, sampled at random when there are more
+        seed: Sampling seed
+
+    Returns:
+        List of image paths
+    """
+    paths = []
+    for root, _, names in os.walk(image_dir):
+        paths.extend(os.path.join(root, name) for name in names if name.lower().endswith(IMAGE_EXTENSIONS))
+    paths.sort()
+    if len(paths) > limit:
+        paths = random.Random(seed).sample(paths, limit)
+    return paths
+
+
+def load_images(paths: List[str]) -> np.ndarray:
+    """Decode images with the same preprocessing the service uses"""
+    arrays = []
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                arrays.append(decode_image(f.read()).array)
+        except (OSError, ImageDecodeError) as e:
+            print(f"  skipping {path}: {e}")
+    if not arrays:
+        raise ValueError("No decodable images found")
+    return np.concatenate(arrays, axis=0)
+
+
+def synthetic_images(count: int, seed: int = 42) -> np.ndarray:
+    """Random images, only useful to smoke-test the pipeline"""
+    return np.random.default_rng(seed).random((count, 224, 224, 3), dtype=np.float32)
+
+
+def convert(saved_model_path: str, variant: str, calibration: np.ndarray) -> bytes:
+    """
+    Convert the SavedModel to a TFLite flatbuffer
+
+    Args:
+        saved_model_path: SavedModel directory
+        variant: "float16" (weights in fp16) or "int8" (full integer quantization)
+        calibration: Preprocessed images for the representative dataset
+
+    Returns:
+        Serialized TFLite model
+    """
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_path)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if variant == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    elif variant == 'int8':
+        def representative_dataset() -> Iterator[List[np.ndarray]]:
+            for image in calibration:
+                yield [image[np.newaxis].astype(np.float32)]
+
+        converter.representative_dataset = representative_dataset
+        # Integer-only kernels; float input/output keeps the service preprocessing unchanged
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    else:
+        raise ValueError(f"Unknown variant: {variant}")
+
+    return converter.convert()
+
+
+def saved_model_runner(saved_model_path: str) -> Callable[[np.ndarray], np.ndarray]:
+    """Build a batch prediction function for the reference SavedModel"""
+    import tensorflow as tf
+
+    signature = tf.saved_model.load(saved_model_path).signatures['serving_default']
+
+    def run(batch: np.ndarray) -> np.ndarray:
+        outputs = signature(tf.convert_to_tensor(batch, dtype=tf.float32))
+        return next(iter(outputs.values())).numpy()
+
+    return run
+
+
+def tflite_runner(model_content: bytes) -> Callable[[np.ndarray], np.ndarray]:
+    """Build a batch-of-one prediction function for a TFLite model"""
+    import tensorflow as tf
+
+    interpreter = tf.lite.Interpreter(model_content=model_content)
+    interpreter.allocate_tensors()
+    input_detail = interpreter.get_input_details()[0]
+    output_detail = interpreter.get_output_details()[0]
+
+    def run(batch: np.ndarray) -> np.ndarray:
+        outputs = []
+        for image in batch:
+            interpreter.set_tensor(input_detail['index'], image[np.newaxis].astype(input_detail['dtype']))
+            interpreter.invoke()
+            outputs.append(interpreter.get_tensor(output_detail['index'])[0])
+        return np.stack(outputs)
+
+    return run
+
+
+def measure_latency(run: Callable[[np.ndarray], np.ndarray], images: np.ndarray, repeats: int) -> Dict:
+    """Single-image latency percentiles in milliseconds"""
+    run(images[:1])  # warm-up
+    timings = []
+    for i in range(repeats):
+        image = images[i % len(images)][np.newaxis]
+        started = time.perf_counter()
+        run(image)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        'p50_ms': round(float(np.percentile(timings, 50)), 3),
+        'p95_ms': round(float(np.percentile(timings, 95)), 3),
+        'mean_ms': round(float(np.mean(timings)), 3)
+    }
+
+
+def parity(reference: np.ndarray, candidate: np.ndarray) -> Dict:
+    """Compare class probabilities of a variant against the reference model"""
+    return {
+        'top1_agreement': round(float(np.mean(reference.argmax(axis=1) == candidate.argmax(axis=1))), 4),
+        'mean_abs_prob_diff': round(float(np.mean(np.abs(reference - candidate))), 6),
+        'max_abs_prob_diff': round(float(np.max(np.abs(reference - candidate))), 6)
+    }
+
+
+def build(saved_model_path: str, output_dir: str, variants: List[str],
+          calibration_dir: Optional[str], eval_dir: Optional[str],
+          num_calibration: int, num_eval: int, latency_repeats: int,
+          promote: Optional[str]) -> Dict:
+    """
+    Convert all variants, evaluate them and optionally promote one to models/model.tflite
+
+    Returns:
+        Parity report
+    """
+    if calibration_dir:
+        calibration = load_images(find_images(calibration_dir, num_calibration))
+    else:
+        print("WARNING: no --calibration-dir given, calibrating int8 on random images")
+        calibration = synthetic_images(num_calibration)
+
+    if eval_dir:
+        evaluation = load_images(find_images(eval_dir, num_eval, seed=7))
+    elif calibration_dir:
+        evaluation = load_images(find_images(calibration_dir, num_eval, seed=7))
+    else:
+        evaluation = synthetic_images(num_eval, seed=7)
+
+    print(f"Calibration images: {len(calibration)}, evaluation images: {len(evaluation)}")
+
+    reference_run = saved_model_runner(saved_model_path)
+    reference = np.concatenate([reference_run(evaluation[i:i + 32]) for i in range(0, len(evaluation), 32)])
+
+    report = {
+        'saved_model': saved_model_path,
+        'created_at': datetime.now().isoformat(),
+        'calibration_images': int(len(calibration)),
+        'evaluation_images': int(len(evaluation)),
+        'synthetic_data': calibration_dir is None,
+        'reference': {'latency': measure_latency(reference_run, evaluation, latency_repeats)},
+        'variants': {}
+    }
+
+    os.makedirs(output_dir, exist_ok=True)
+    for variant in variants:
+        print(f"Converting {variant}...")
+        started = time.perf_counter()
+        model_content = convert(saved_model_path, variant, calibration)
+        conversion_seconds = time.perf_counter() - started
+
+        path = os.path.join(output_dir, f"model_{variant}.tflite")
+        with open(path, 'wb') as f:
+            f.write(model_content)
+
+        run = tflite_runner(model_content)
+        report['variants'][variant] = {
+            'path': path,
+            'size_bytes': len(model_content),
+            'conversion_seconds': round(conversion_seconds, 2),
+            'parity': parity(reference, run(evaluation)),
+            'latency': measure_latency(run, evaluation, latency_repeats)
+        }
+
+    if promote:
+        target = os.path.join(output_dir, "model.tflite")
+        shutil.copyfile(report['variants'][promote]['path'], target)
+        report['promoted'] = {'variant': promote, 'path': target}
+
+    report_path = os.path.join(output_dir, "tflite_report.json")
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    report['report_path'] = report_path
+    return report
+
+
+def print_report(report: Dict):
+    """Print a compact summary table"""
+    reference = report['reference']['latency']
+    print(f"\n{'variant':<12}{'size MB':>10}{'top-1 agree':>14}{'mean |dp|':>12}{'p50 ms':>10}{'p95 ms':>10}")
+    print(f"{'savedmodel':<12}{'-':>10}{'1.0000':>14}{'0':>12}{reference['p50_ms']:>10}{reference['p95_ms']:>10}")
+    for name, variant in report['variants'].items():
+        print(f"{name:<12}{variant['size_bytes'] / 1e6:>10.2f}{variant['parity']['top1_agreement']:>14.4f}"
+              f"{variant['parity']['mean_abs_prob_diff']:>12.5f}{variant['latency']['p50_ms']:>10}{variant['latency']['p95_ms']:>10}")
+    if report.get('promoted'):
+        print(f"\nPromoted {report['promoted']['variant']} to {report['promoted']['path']}")
+    print(f"Report written to {report['report_path']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build TFLite variants of the plant disease model")
+    parser.add_argument("--saved-model", default="models/plant_disease", help="SavedModel directory")
+    parser.add_argument("--output-dir", default="models", help="Where to write the .tflite files and report")
+    parser.add_argument("--variants", default=",".join(VARIANTS), help="Comma-separated: float16,int8")
+    parser.add_argument("--calibration-dir", help="Images for int8 calibration (class sub-folders are fine)")
+    parser.add_argument("--eval-dir", help="Images for the parity report (defaults to the calibration images)")
+    parser.add_argument("--num-calibration", type=int, default=200)
+    parser.add_argument("--num-eval", type=int, default=200)
+    parser.add_argument("--latency-repeats", type=int, default=50)
+    parser.add_argument("--promote", choices=VARIANTS, help="Copy this variant to <output-dir>/model.tflite")
+    args = parser.parse_args()
+
+    variants = [v.strip() for v in args.variants.split(",") if v.strip()]
+    unknown = set(variants) - set(VARIANTS)
+    if unknown:
+        parser.error(f"Unknown variants: {', '.join(sorted(unknown))}")
+    if args.promote and args.promote not in variants:
+        parser.error("--promote must be one of the built variants")
+
+    report = build(
+        args.saved_model, args.output_dir, variants,
+        args.calibration_dir, args.eval_dir,
+        args.num_calibration, args.num_eval, args.latency_repeats,
+        args.promote
+    )
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Soil Sample Scorer
+Scores a soil-lab CSV (same columns as models/Crop_recommendation.csv) with the crop
+recommendation model and writes the top crops and confidences of every row
+
+Usage (from the backend directory):
+    python -m scripts.score_soil_samples samples.csv -o recommendations.csv
+    python -m scripts.score_soil_samples samples.csv --top-n 5 --keep-columns sample_id --workers 4
+    python -m scripts.score_soil_samples samples.csv > recommendations.csv
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.bulk_scoring import DEFAULT_CHUNK_SIZE, score_csv
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a soil-sample CSV with the crop recommendation model")
+    parser.add_argument("input", help="CSV with N, P, K, temperature, humidity, ph and rainfall columns")
+    parser.add_argument("-o", "--output", default="-", help="Output CSV (default: stdout)")
+    parser.add_argument("--top-n", type=int, default=3, help="Crops per row")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per chunk")
+    parser.add_argument("--workers", type=int, default=None, help="Scoring processes (default: CPU count)")
+    parser.add_argument("--keep-columns", default="", help="Comma-separated input columns copied to the output")
+    parser.add_argument("--model-dir", default=None, help="Root of versioned recommendation models")
+    args = parser.parse_args()
+
+    if args.top_n < 1 or args.chunk_size < 1:
+        parser.error("--top-n and --chunk-size must be at least 1")
+
+    keep_columns = [name.strip() for name in args.keep_columns.split(",") if name.strip()]
+
+    try:
+        if args.output == "-":
+            stats = score_csv(args.input, sys.stdout, args.top_n, args.chunk_size, args.workers,
+                              keep_columns, args.model_dir)
+        else:
+            with open(args.output, "w", newline="") as f:
+                stats = score_csv(args.input, f, args.top_n, args.chunk_size, args.workers,
+                                  keep_columns, args.model_dir)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Summary (like the service logs) goes to stderr, so stdout can carry the CSV
+    print(f"Scored {stats['rows']} rows ({stats['invalid_rows']} invalid) in {stats['chunks']} chunks, "
+          f"{stats['seconds']}s, {stats['rows_per_second']} rows/s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
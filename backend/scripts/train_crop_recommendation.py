@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Crop Recommendation Trainer
+Trains candidate crop recommendation models offline, selects one by an accuracy-vs-latency
+policy and publishes it as a versioned artifact that CropRecommendationService loads
+
+Candidates are cross-validated in a process pool (one task per candidate and fold), then
+timed one at a time in this process on the same path the service uses to score them.
+
+Usage (from the backend directory):
+    python -m scripts.train_crop_recommendation
+    python -m scripts.train_crop_recommendation --candidates gbc,hgb --policy throughput
+    python -m scripts.train_crop_recommendation --policy accuracy --no-promote
+    python -m scripts.train_crop_recommendation --promote-version 20250101-120000-ab12cd34
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingClassifier, HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.preprocessing import MinMaxScaler
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.crop_recommendation_service import CropRecommendationService
+from services.neighbor_index import NeighborIndex
+from services.recommendation_artifacts import file_sha256, list_versions, promote_version, prune_versions, write_version
+from services.tree_kernel import TreeEnsembleKernel
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATA = os.path.join(BASE_DIR, "models", "Crop_recommendation.csv")
+DEFAULT_OUTPUT = os.path.join(BASE_DIR, "models", "crop_recommendation")
+
+CANDIDATES = {
+    'gbc': 'GradientBoostingClassifier',
+    'hgb': 'HistGradientBoostingClassifier',
+    'rf': 'RandomForestClassifier'
+}
+
+# accuracy: best CV accuracy; latency / throughput: fastest single-row latency / highest
+# batch throughput among candidates within the accuracy tolerance of the best
+POLICIES = ('accuracy', 'latency', 'throughput')
+
+# Default tolerance: one point of CV accuracy. Tighter than the gap between the forest and the
+# boosting candidates (~0.6-0.8 points on the bundled dataset) leaves only the forest eligible,
+# which the tree kernel cannot serve (~8 ms vs ~0.2 ms per row)
+DEFAULT_TOLERANCE = 0.01
+
+THROUGHPUT_ROWS = 10000
+
+
+def build_estimator(name: str, params: Dict, seed: int, n_jobs: int = 1):
+    """
+    Create an unfitted candidate
+
+    Args:
+        name: Candidate key from CANDIDATES
+        params: n_estimators, learning_rate and max_depth
+        seed: Model seed
+        n_jobs: Threads for estimators that fit trees in parallel
+
+    Returns:
+        sklearn classifier
+    """
+    if name == 'gbc':
+        return GradientBoostingClassifier(
+            n_estimators=params['n_estimators'],
+            learning_rate=params['learning_rate'],
+            max_depth=params['max_depth'],
+            random_state=seed
+        )
+    if name == 'hgb':
+        return HistGradientBoostingClassifier(
+            max_iter=params['n_estimators'],
+            learning_rate=params['learning_rate'],
+            random_state=seed
+        )
+    if name == 'rf':
+        return RandomForestClassifier(
+            n_estimators=params['n_estimators'],
+            n_jobs=n_jobs,
+            random_state=seed
+        )
+    raise ValueError(f"Unknown candidate: {name}")
+
+
+def fit_candidate(name: str, params: Dict, seed: int, n_jobs: int, X_train: np.ndarray, y_train: np.ndarray,
+                  X_eval: Optional[np.ndarray] = None, y_eval: Optional[np.ndarray] = None) -> Dict:
+    """
+    Fit one candidate on one fold (process pool task)
+
+    Args:
+        name: Candidate key
+        params: Estimator parameters
+        seed: Model seed
+        n_jobs: Threads for the estimator
+        X_train: Scaled training features
+        y_train: Training labels
+        X_eval: Scaled held-out features, or None to return the fitted model instead of a score
+        y_eval: Held-out labels
+
+    Returns:
+        Dictionary with fit_seconds and either accuracy or model
+    """
+    model = build_estimator(name, params, seed, n_jobs)
+    started = time.perf_counter()
+    model.fit(X_train, y_train)
+    result = {'name': name, 'fit_seconds': time.perf_counter() - started}
+    if X_eval is None:
+        result['model'] = model
+    else:
+        result['accuracy'] = float(model.score(X_eval, y_eval))
+    return result
+
+
+def measure_serving(model, scaler, X_raw: np.ndarray, repeats: int, seed: int) -> Dict:
+    """
+    Time a fitted candidate the way the service scores it
+
+    Single rows go through the NumPy tree kernel when the model can be flattened into one,
+    batches through sklearn on NumPy-scaled input.
+
+    Args:
+        model: Fitted classifier
+        scaler: Fitted MinMaxScaler
+        X_raw: Unscaled rows to sample from
+        repeats: Single-row calls to time
+        seed: Sampling seed
+
+    Returns:
+        Dictionary with latency_ms (median single row), throughput_rows_per_s and kernel
+    """
+    try:
+        kernel = TreeEnsembleKernel.from_sklearn(model, scaler)
+    except (TypeError, ValueError):
+        kernel = None
+
+    def scale(rows):
+        return rows * scaler.scale_ + scaler.min_
+
+    single = kernel.predict_proba if kernel is not None else (lambda rows: model.predict_proba(scale(rows)))
+
+    rng = np.random.default_rng(seed)
+    rows = X_raw[rng.integers(0, len(X_raw), repeats)]
+    single(rows[:1])  # warm-up
+    timings = []
+    for index in range(repeats):
+        started = time.perf_counter()
+        single(rows[index:index + 1])
+        timings.append(time.perf_counter() - started)
+
+    batch = X_raw[rng.integers(0, len(X_raw), THROUGHPUT_ROWS)]
+    started = time.perf_counter()
+    model.predict_proba(scale(batch))
+    batch_seconds = time.perf_counter() - started
+
+    return {
+        'latency_ms': round(float(np.median(timings)) * 1000, 4),
+        'throughput_rows_per_s': round(THROUGHPUT_ROWS / batch_seconds),
+        'kernel': kernel is not None
+    }
+
+
+def select_candidate(results: List[Dict], policy: str, tolerance: float) -> Dict:
+    """
+    Pick the candidate to publish
+
+    Args:
+        results: Candidate reports with cv_accuracy, latency_ms and throughput_rows_per_s
+        policy: One of POLICIES
+        tolerance: Accuracy (fraction) a faster candidate may give up against the best
+
+    Returns:
+        The selected report
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown policy: {policy}")
+    best_accuracy = max(result['cv_accuracy'] for result in results)
+    if policy == 'accuracy':
+        return max(results, key=lambda result: (result['cv_accuracy'], -result['latency_ms']))
+
+    eligible = [result for result in results if result['cv_accuracy'] >= best_accuracy - tolerance]
+    if policy == 'latency':
+        return min(eligible, key=lambda result: result['latency_ms'])
+    return max(eligible, key=lambda result: result['throughput_rows_per_s'])
+
+
+def train(data_path: str, n_estimators: int, learning_rate: float, max_depth: int,
+          test_size: float, seed: int, candidates: List[str] = ('gbc', 'hgb', 'rf'),
+          cv_folds: int = 5, policy: str = 'latency', tolerance: float = DEFAULT_TOLERANCE,
+          workers: Optional[int] = None, latency_repeats: int = 200) -> Dict:
+    """
+    Cross-validate the candidates, time them and select one
+
+    Args:
+        data_path: Crop recommendation CSV with the feature columns and 'label'
+        n_estimators: Boosting stages / forest size
+        learning_rate: Shrinkage of the boosting candidates
+        max_depth: Tree depth of the GBC candidate
+        test_size: Held-out fraction
+        seed: Split and model seed
+        candidates: Candidate keys from CANDIDATES
+        cv_folds: Stratified folds over the training split
+        policy: Selection policy, one of POLICIES
+        tolerance: Accuracy the latency and throughput policies may give up
+        workers: Process pool size (default: CPU count)
+        latency_repeats: Single-row calls timed per candidate
+
+    Returns:
+        Dictionary with model, scaler, class map, neighbor index, metrics and manifest extras
+    """
+    features = CropRecommendationService.FEATURES
+    df = pd.read_csv(data_path)
+    print(f"Loaded dataset with {len(df)} records")
+
+    # Create target mapping
+    c = df['label'].astype('category')
+    reverse_targets = dict(enumerate(c.cat.categories))
+
+    X = df[features].to_numpy(dtype='float64')
+    y = c.cat.codes.to_numpy()
+    X_train, X_test, y_train, y_test = train_test_split(X, y, random_state=seed, test_size=test_size)
+
+    scaler = MinMaxScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+
+    params = {
+        'n_estimators': n_estimators,
+        'learning_rate': learning_rate,
+        'max_depth': max_depth
+    }
+    workers = workers or os.cpu_count() or 1
+    # Forest threads share the cores with the other pool workers
+    n_jobs = max(1, (os.cpu_count() or 1) // workers)
+
+    # One task per (candidate, fold), plus a final fit on the whole training split
+    folds = list(StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=seed).split(X_train_scaled, y_train))
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        cv_futures = {
+            name: [
+                pool.submit(fit_candidate, name, params, seed, n_jobs,
+                            X_train_scaled[train_index], y_train[train_index],
+                            X_train_scaled[eval_index], y_train[eval_index])
+                for train_index, eval_index in folds
+            ]
+            for name in candidates
+        }
+        final_futures = {
+            name: pool.submit(fit_candidate, name, params, seed, n_jobs, X_train_scaled, y_train)
+            for name in candidates
+        }
+        cv_results = {name: [future.result() for future in futures] for name, futures in cv_futures.items()}
+        final_results = {name: future.result() for name, future in final_futures.items()}
+    print(f"Cross-validated {len(candidates)} candidates x {cv_folds} folds "
+          f"on {workers} workers in {time.perf_counter() - started:.1f}s")
+
+    # Timed sequentially so candidates do not compete for the CPU
+    reports = []
+    for name in candidates:
+        model = final_results[name]['model']
+        accuracies = [result['accuracy'] for result in cv_results[name]]
+        report = {
+            'name': name,
+            'model_type': CANDIDATES[name],
+            'cv_accuracy': round(float(np.mean(accuracies)), 4),
+            'cv_accuracy_std': round(float(np.std(accuracies)), 4),
+            'test_accuracy': round(float(model.score(X_test_scaled, y_test)), 4),
+            'fit_seconds': round(final_results[name]['fit_seconds'], 2)
+        }
+        report.update(measure_serving(model, scaler, X_test, latency_repeats, seed))
+        reports.append(report)
+
+    print(f"\n{'candidate':<10}{'cv acc':>9}{'test acc':>10}{'fit s':>8}{'1-row ms':>10}{'rows/s':>10}")
+    for report in reports:
+        print(f"{report['name']:<10}{report['cv_accuracy']:>9.4f}{report['test_accuracy']:>10.4f}"
+              f"{report['fit_seconds']:>8.2f}{report['latency_ms']:>10.3f}{report['throughput_rows_per_s']:>10}")
+
+    selected = select_candidate(reports, policy, tolerance)
+    model = final_results[selected['name']]['model']
+    print(f"\nSelected {selected['name']} ({selected['model_type']}) by policy '{policy}'")
+
+    metrics = {
+        'train_accuracy': round(float(model.score(X_train_scaled, y_train)), 4),
+        'test_accuracy': selected['test_accuracy'],
+        'cv_accuracy': selected['cv_accuracy'],
+        'train_rows': int(len(X_train)),
+        'test_rows': int(len(X_test)),
+        'fit_seconds': selected['fit_seconds'],
+        'latency_ms': selected['latency_ms'],
+        'throughput_rows_per_s': selected['throughput_rows_per_s']
+    }
+
+    # Every labelled row, including the held-out split, is evidence for the recommendations
+    neighbors = NeighborIndex.build(X, df['label'].to_numpy(), scaler)
+
+    return {
+        'model': model,
+        'scaler': scaler,
+        'reverse_targets': reverse_targets,
+        'neighbors': neighbors,
+        'metrics': metrics,
+        'extra': {
+            'params': dict(model.get_params(), test_size=test_size),
+            'selection': {
+                'policy': policy,
+                'tolerance': tolerance,
+                'cv_folds': cv_folds,
+                'selected': selected['name'],
+                'candidates': reports
+            },
+            'data': {
+                'path': os.path.relpath(data_path, BASE_DIR),
+                'sha256': file_sha256(data_path),
+                'rows': int(len(df))
+            }
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and publish the crop recommendation model")
+    parser.add_argument("--data", default=DEFAULT_DATA, help="Training CSV")
+    parser.add_argument("--output-dir", default=os.getenv("CROP_RECOMMENDATION_MODEL_DIR") or DEFAULT_OUTPUT,
+                        help="Root of versioned models")
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--learning-rate", type=float, default=0.1)
+    parser.add_argument("--max-depth", type=int, default=5)
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--candidates", default=",".join(CANDIDATES),
+                        help=f"Comma-separated candidates from {', '.join(CANDIDATES)}")
+    parser.add_argument("--cv-folds", type=int, default=5)
+    parser.add_argument("--policy", choices=POLICIES, default=os.getenv("CROP_RECOMMENDATION_POLICY", "latency"),
+                        help="How the published candidate is selected")
+    parser.add_argument("--accuracy-tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="CV accuracy the latency/throughput policies may give up against the best candidate")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument("--no-promote", action="store_true", help="Publish without pointing LATEST at it")
+    parser.add_argument("--keep", type=int, default=5, help="Versions to keep, older ones are deleted")
+    parser.add_argument("--promote-version", help="Only point LATEST at an existing version")
+    args = parser.parse_args()
+
+    if args.promote_version:
+        promote_version(args.output_dir, args.promote_version)
+        print(f"LATEST -> {args.promote_version}")
+        return
+
+    candidates = [name.strip() for name in args.candidates.split(",") if name.strip()]
+    unknown = [name for name in candidates if name not in CANDIDATES]
+    if not candidates or unknown:
+        parser.error(f"Unknown candidates: {', '.join(unknown) or '(none given)'}")
+
+    result = train(args.data, args.n_estimators, args.learning_rate, args.max_depth, args.test_size, args.seed,
+                   candidates, args.cv_folds, args.policy, args.accuracy_tolerance, args.workers)
+    version_dir = write_version(
+        args.output_dir, result['model'], result['scaler'], result['reverse_targets'],
+        CropRecommendationService.FEATURES, result['metrics'], result['extra'],
+        promote=not args.no_promote, neighbors=result['neighbors']
+    )
+    print(f"Published {version_dir}" + ("" if args.no_promote else " (LATEST)"))
+
+    removed = prune_versions(args.output_dir, args.keep)
+    if removed:
+        print(f"Removed old versions: {', '.join(removed)}")
+    print(f"Versions: {', '.join(list_versions(args.output_dir))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,437 @@
+"""
+Baseline Store
+Running per-region, per-crop aggregates of field efficiency results, persisted in SQLite
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+
+from services.crop_catalog import get_crop_catalog, normalize_crop_name
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Key of the "any region" / "any crop" roll-ups
+ALL = "*"
+
+# Tracked metrics and the value range covered by their histogram bins; values
+# outside it are counted in an underflow / overflow bin
+METRIC_RANGES = {
+    'overall_efficiency': (0.0, 150.0),
+    'water_efficiency': (0.0, 150.0),
+    'fertilizer_efficiency': (0.0, 150.0),
+    'yield_efficiency': (0.0, 150.0),
+    'cost_efficiency': (0.0, 150.0),
+    'labor_efficiency': (0.0, 150.0),
+    'energy_efficiency': (0.0, 150.0),
+    'actual_yield': (0.0, 150.0),  # quintals/acre
+    'cost_per_acre': (0.0, 30000.0),  # ₹/acre
+    'labor_hours': (0.0, 300.0),  # hours/acre
+    'fuel_liters': (0.0, 150.0)  # liters/acre
+}
+HISTOGRAM_BINS = 150
+
+SUMMARY_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS baselines (
+    region TEXT NOT NULL,
+    crop TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    mean REAL NOT NULL,
+    m2 REAL NOT NULL,
+    min REAL NOT NULL,
+    max REAL NOT NULL,
+    histogram BLOB NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (region, crop, metric)
+)
+"""
+
+
+def _bin_indices(metric: str, values: np.ndarray) -> np.ndarray:
+    """Histogram slot per value: 0 underflow, 1..HISTOGRAM_BINS, HISTOGRAM_BINS + 1 overflow"""
+    low, high = METRIC_RANGES[metric]
+    scaled = np.floor((values - low) / (high - low) * HISTOGRAM_BINS)
+    return (np.clip(scaled, -1, HISTOGRAM_BINS) + 1).astype(np.intp)
+
+
+class RunningAggregate:
+    """
+    Count, mean, variance, extremes and fixed-bin histogram of one metric
+
+    Moments are kept as Welford's (count, mean, M2) and merged with Chan's parallel
+    formula, so adding a batch costs O(1) per value and two aggregates (shards,
+    regions) merge exactly. The histogram has fixed bins per metric, so merging is
+    an addition and quantiles are read off its cumulative counts.
+    """
+
+    __slots__ = ('metric', 'count', 'mean', 'm2', 'minimum', 'maximum', 'histogram')
+
+    def __init__(self, metric: str, count: int = 0, mean: float = 0.0, m2: float = 0.0,
+                 minimum: float = float('inf'), maximum: float = float('-inf'),
+                 histogram: Optional[np.ndarray] = None):
+        """
+        Initialize the aggregate, empty by default
+
+        Args:
+            metric: Metric name, a METRIC_RANGES key
+            count: Number of values
+            mean: Mean of the values
+            m2: Sum of squared deviations from the mean
+            minimum: Smallest value
+            maximum: Largest value
+            histogram: Counts per histogram slot (HISTOGRAM_BINS + 2)
+        """
+        self.metric = metric
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.minimum = minimum
+        self.maximum = maximum
+        self.histogram = histogram if histogram is not None else np.zeros(HISTOGRAM_BINS + 2, dtype=np.int64)
+
+    def merge(self, other: "RunningAggregate"):
+        """Fold another aggregate of the same metric into this one"""
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self.histogram += other.histogram
+
+    def merged(self, other: "RunningAggregate") -> "RunningAggregate":
+        """New aggregate of this one and another, leaving both unchanged"""
+        combined = RunningAggregate(self.metric, self.count, self.mean, self.m2, self.minimum, self.maximum,
+                                    self.histogram.copy())
+        combined.merge(other)
+        return combined
+
+    @property
+    def variance(self) -> float:
+        """Sample variance"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Approximate quantile from the histogram
+
+        Args:
+            q: Quantile in [0, 1]
+
+        Returns:
+            Value interpolated linearly within its bin (narrowed to the observed
+            extremes), or None when empty
+        """
+        if self.count == 0:
+            return None
+        cumulative = np.cumsum(self.histogram)
+        target = q * self.count
+        slot = min(int(np.searchsorted(cumulative, target, side='left')), HISTOGRAM_BINS + 1)
+        if slot == 0:
+            return self.minimum
+        if slot == HISTOGRAM_BINS + 1:
+            return self.maximum
+
+        # Interpolate over the part of the bin inside the observed range
+        low, high = METRIC_RANGES[self.metric]
+        width = (high - low) / HISTOGRAM_BINS
+        bin_low = max(low + (slot - 1) * width, self.minimum)
+        bin_high = min(low + slot * width, self.maximum)
+        fraction = (target - cumulative[slot - 1]) / self.histogram[slot] if self.histogram[slot] else 0.0
+        return float(bin_low + fraction * max(bin_high - bin_low, 0.0))
+
+    def summary(self) -> Dict:
+        """Count, mean, standard deviation, extremes and quantiles"""
+        summary = {
+            'count': self.count,
+            'mean': round(self.mean, 4),
+            'std': round(self.variance ** 0.5, 4),
+            'min': self.minimum if self.count else None,
+            'max': self.maximum if self.count else None
+        }
+        for q in SUMMARY_QUANTILES:
+            value = self.quantile(q)
+            summary[f'p{int(q * 100)}'] = round(value, 4) if value is not None else None
+        return summary
+
+
+def batch_aggregates(metric: str, codes: np.ndarray, groups: int, values: np.ndarray) -> List[RunningAggregate]:
+    """
+    Aggregates of one batch per group, in one vectorized pass
+
+    Args:
+        metric: Metric name
+        codes: Group index per value
+        groups: Number of groups
+        values: Finite values
+
+    Returns:
+        One RunningAggregate per group (empty for groups without values)
+    """
+    counts = np.bincount(codes, minlength=groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.bincount(codes, weights=values, minlength=groups) / counts
+    deviations = values - means[codes]
+    m2 = np.bincount(codes, weights=deviations * deviations, minlength=groups)
+    minimums = np.full(groups, np.inf)
+    maximums = np.full(groups, -np.inf)
+    np.minimum.at(minimums, codes, values)
+    np.maximum.at(maximums, codes, values)
+    slots = HISTOGRAM_BINS + 2
+    histograms = np.bincount(codes * slots + _bin_indices(metric, values), minlength=groups * slots)
+    histograms = histograms.reshape(groups, slots).astype(np.int64)
+
+    return [
+        RunningAggregate(metric, int(counts[group]), float(means[group]), float(m2[group]),
+                         float(minimums[group]), float(maximums[group]), histograms[group])
+        if counts[group] else RunningAggregate(metric)
+        for group in range(groups)
+    ]
+
+
+class BaselineStore:
+    """
+    Regional baselines of field efficiency inputs and scores
+
+    Every submitted field updates the aggregates of its (region, crop), and of the
+    (region, any crop), (any region, crop) and overall roll-ups, so lookups never
+    rescan history. All aggregates are held in memory and written through to
+    SQLite, one row per (region, crop, metric), so they survive restarts.
+
+    Writers are serialized by a lock. An aggregate is never changed once it is in
+    the dictionary: updates merge into a copy and swap it in, so lookups on other
+    threads read without the lock and never see a half-merged aggregate.
+    """
+
+    def __init__(self, path: Optional[str] = None, min_samples: Optional[int] = None,
+                 crop_key: Optional[Callable[[Optional[str]], str]] = None):
+        """
+        Initialize the store, creating the database if needed
+
+        Args:
+            path: SQLite file (env FIELD_BASELINE_DB, default var/field_baselines.db)
+            min_samples: Values an aggregate needs before it is used as a baseline
+                         (env FIELD_BASELINE_MIN_SAMPLES)
+            crop_key: Canonical key of a crop name, defaults to the crop catalog ID
+        """
+        self.path = path or os.getenv("FIELD_BASELINE_DB") or os.path.join(BASE_DIR, "var", "field_baselines.db")
+        self.min_samples = min_samples if min_samples is not None else \
+            int(os.getenv("FIELD_BASELINE_MIN_SAMPLES", 20))
+        if crop_key is None:
+            catalog = get_crop_catalog()
+            crop_key = lambda crop: catalog.resolve(crop) or normalize_crop_name(crop) or ALL
+        self.crop_key = crop_key
+
+        self._lock = threading.Lock()
+        self._aggregates: Dict[Tuple[str, str, str], RunningAggregate] = {}
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(SCHEMA)
+        self._connection.commit()
+        self._load()
+
+    def _load(self):
+        """Read every aggregate into memory"""
+        rows = self._connection.execute(
+            "SELECT region, crop, metric, count, mean, m2, min, max, histogram FROM baselines"
+        ).fetchall()
+        for region, crop, metric, count, mean, m2, minimum, maximum, histogram in rows:
+            if metric not in METRIC_RANGES:
+                continue
+            counts = np.frombuffer(histogram, dtype=np.int64).copy()
+            if len(counts) != HISTOGRAM_BINS + 2:
+                logger.warning(f"Dropping histogram of {region}/{crop}/{metric}: bin layout changed")
+                counts = None
+            self._aggregates[(region, crop, metric)] = RunningAggregate(
+                metric, count, mean, m2, minimum, maximum, counts
+            )
+        logger.info(f"Loaded {len(rows)} field baseline aggregates from {self.path}")
+
+    @staticmethod
+    def region_key(region: Optional[str]) -> str:
+        """Canonical key of a region name"""
+        return region.strip().lower() if region and region.strip() else ALL
+
+    def _keys(self, regions: Sequence[Optional[str]], crops: Sequence[Optional[str]]) -> List[Tuple[str, str]]:
+        """Canonical (region, crop) key per field, normalizing each distinct pair once"""
+        cache: Dict = {}
+        keys = []
+        for pair in zip(regions, crops):
+            key = cache.get(pair)
+            if key is None:
+                key = cache[pair] = (self.region_key(pair[0]), self.crop_key(pair[1]))
+            keys.append(key)
+        return keys
+
+    def record(self, regions: Sequence[Optional[str]], crops: Sequence[Optional[str]],
+               values: Dict[str, np.ndarray]) -> int:
+        """
+        Fold a batch of field results into the aggregates
+
+        Args:
+            regions: Region per field (None for no region)
+            crops: Crop type per field
+            values: Value arrays by metric; NaN marks a field without the metric
+
+        Returns:
+            Number of aggregate rows written
+        """
+        keys = self._keys(regions, crops)
+        # Each field counts towards its own key and the three roll-ups
+        levels = [
+            keys,
+            [(region, ALL) for region, _ in keys],
+            [(ALL, crop) for _, crop in keys],
+            [(ALL, ALL)] * len(keys)
+        ]
+
+        # A key can occur on several levels (fields without a region or crop); the
+        # later level always covers a superset of the fields, so it wins
+        batch: Dict[Tuple[str, str, str], RunningAggregate] = {}
+        for level_keys in levels:
+            index: Dict = {}
+            codes = np.fromiter((index.setdefault(key, len(index)) for key in level_keys),
+                                dtype=np.intp, count=len(level_keys))
+            distinct = list(index)
+            for metric, metric_values in values.items():
+                if metric not in METRIC_RANGES:
+                    continue
+                metric_values = np.asarray(metric_values, dtype=np.float64)
+                finite = np.isfinite(metric_values)
+                if not finite.any():
+                    continue
+                for key, aggregate in zip(distinct, batch_aggregates(metric, codes[finite], len(distinct),
+                                                                     metric_values[finite])):
+                    if aggregate.count:
+                        batch[(*key, metric)] = aggregate
+
+        updated_at = time.time()
+        with self._lock:
+            rows = []
+            for key, aggregate in batch.items():
+                current = (self._aggregates.get(key) or RunningAggregate(key[2])).merged(aggregate)
+                # Copy-on-write: readers hold either the old or the new aggregate
+                self._aggregates[key] = current
+                rows.append((*key, current.count, current.mean, current.m2, current.minimum, current.maximum,
+                             current.histogram.tobytes(), updated_at))
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO baselines "
+                    "(region, crop, metric, count, mean, m2, min, max, histogram, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+        return len(rows)
+
+    def _lookup(self, key: Tuple[str, str], metric: str) -> Optional[RunningAggregate]:
+        """Most specific aggregate of a key with enough values"""
+        region, crop = key
+        for candidate in ((region, crop), (region, ALL), (ALL, crop), (ALL, ALL)):
+            aggregate = self._aggregates.get((*candidate, metric))
+            if aggregate is not None and aggregate.count >= max(1, self.min_samples):
+                return aggregate
+        return None
+
+    def baselines(self, region: Optional[str], crop: Optional[str], defaults: Dict[str, float]) -> Dict[str, float]:
+        """
+        Baseline means of one field
+
+        Args:
+            region: Field region
+            crop: Field crop type
+            defaults: Value per metric used when no aggregate has enough values
+
+        Returns:
+            Dictionary with the same keys as defaults
+        """
+        key = self._keys([region], [crop])[0]
+        result = {}
+        for metric, default in defaults.items():
+            aggregate = self._lookup(key, metric) if metric in METRIC_RANGES else None
+            result[metric] = aggregate.mean if aggregate is not None else default
+        return result
+
+    def baselines_many(self, regions: Sequence[Optional[str]], crops: Sequence[Optional[str]],
+                       defaults: Dict[str, float]) -> Dict[str, np.ndarray]:
+        """
+        Baseline means of many fields, looked up once per distinct (region, crop)
+
+        Args:
+            regions: Region per field
+            crops: Crop type per field
+            defaults: Value per metric used when no aggregate has enough values
+
+        Returns:
+            Array per metric of defaults
+        """
+        index: Dict = {}
+        codes = np.fromiter((index.setdefault(key, len(index)) for key in self._keys(regions, crops)),
+                            dtype=np.intp, count=len(regions))
+        result = {}
+        for metric, default in defaults.items():
+            table = np.empty(len(index), dtype=np.float64)
+            for position, key in enumerate(index):
+                aggregate = self._lookup(key, metric) if metric in METRIC_RANGES else None
+                table[position] = aggregate.mean if aggregate is not None else default
+            result[metric] = table[codes]
+        return result
+
+    def summary(self, region: Optional[str] = None, crop: Optional[str] = None,
+                metrics: Optional[Iterable[str]] = None) -> Dict:
+        """
+        Aggregates stored for exactly one (region, crop), roll-ups included
+
+        Args:
+            region: Region, None for all regions
+            crop: Crop type, None for all crops
+            metrics: Metrics to summarize, defaults to all
+
+        Returns:
+            Dictionary with the canonical keys and a summary per metric with data
+        """
+        region_key = self.region_key(region)
+        crop_key = self.crop_key(crop) if crop else ALL
+        with self._lock:
+            stats = {
+                metric: self._aggregates[(region_key, crop_key, metric)].summary()
+                for metric in (metrics or METRIC_RANGES)
+                if (region_key, crop_key, metric) in self._aggregates
+            }
+        return {
+            'region': region_key,
+            'crop': crop_key,
+            'min_samples': self.min_samples,
+            'metrics': stats
+        }
+
+    def get_stats(self) -> Dict:
+        """Get store size"""
+        with self._lock:
+            keys = {(region, crop) for region, crop, _ in self._aggregates}
+        return {
+            'path': self.path,
+            'aggregates': len(self._aggregates),
+            'keys': len(keys),
+            'regions': len({region for region, _ in keys if region != ALL}),
+            'min_samples': self.min_samples,
+            'histogram_bins': HISTOGRAM_BINS
+        }
+
+    def close(self):
+        """Close the database"""
+        self._connection.close()
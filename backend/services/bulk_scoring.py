@@ -0,0 +1,147 @@
+"""
+Bulk Scoring
+Streams soil-sample CSVs through the crop recommendation model in fixed-size chunks
+"""
+
+import collections
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, TextIO
+import logging
+
+import numpy as np
+import pandas as pd
+
+from services.crop_recommendation_service import CropRecommendationService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 50000
+
+# Service of a pool worker, loaded once by _init_worker
+_worker_service: Optional[CropRecommendationService] = None
+
+
+def _init_worker(model_dir: Optional[str]):
+    """Load the model once per pool worker; versioned arrays are memory-mapped and shared"""
+    global _worker_service
+    _worker_service = CropRecommendationService(model_dir=model_dir)
+
+
+def score_chunk(features: np.ndarray, top_n: int,
+                service: Optional[CropRecommendationService] = None) -> Dict[str, np.ndarray]:
+    """
+    Score one chunk of soil samples
+
+    Rows with a missing or non-numeric feature are not scored.
+
+    Args:
+        features: Array of shape (rows, 7) in FEATURES order, NaN where a value is invalid
+        top_n: Crops per row
+        service: Service to score with, defaults to the pool worker's
+
+    Returns:
+        Dictionary with 'valid' (rows,), 'crops' (rows, top_n) display names ('' for
+        invalid rows) and 'confidence' (rows, top_n) in percent (NaN for invalid rows)
+    """
+    service = service or _worker_service
+    bundle = service.bundle
+    valid = ~np.isnan(features).any(axis=1)
+
+    n = max(1, min(top_n, len(bundle.class_labels)))
+    crops = np.full((len(features), n), '', dtype=object)
+    confidence = np.full((len(features), n), np.nan)
+    if valid.any():
+        indices, probabilities = service.predict_top_n_batch(features[valid], n, bundle=bundle)
+        labels = np.array([service.catalog.display_name(label) for label in bundle.class_labels], dtype=object)
+        crops[valid] = labels[indices]
+        confidence[valid] = np.round(probabilities * 100, 2)
+    return {'valid': valid, 'crops': crops, 'confidence': confidence}
+
+
+def _read_features(chunk: pd.DataFrame, features: Sequence[str]) -> np.ndarray:
+    """Feature columns of a chunk as float64, NaN where a value is missing or not a number"""
+    return np.column_stack([
+        pd.to_numeric(chunk[name], errors='coerce').to_numpy(dtype=np.float64) for name in features
+    ])
+
+
+def _format_chunk(chunk: pd.DataFrame, scored: Dict[str, np.ndarray], keep_columns: Sequence[str]) -> pd.DataFrame:
+    """Output rows of a chunk: kept input columns, then crop_i / confidence_i pairs"""
+    output = chunk[list(keep_columns)].reset_index(drop=True)
+    for rank in range(scored['crops'].shape[1]):
+        output[f"crop_{rank + 1}"] = scored['crops'][:, rank]
+        output[f"confidence_{rank + 1}"] = scored['confidence'][:, rank]
+    return output
+
+
+def score_csv(input_path: str, output: TextIO, top_n: int = 3, chunk_size: int = DEFAULT_CHUNK_SIZE,
+              workers: Optional[int] = None, keep_columns: Sequence[str] = (),
+              model_dir: Optional[str] = None) -> Dict:
+    """
+    Score a soil-sample CSV and write the top crops of every row
+
+    The file is read `chunk_size` rows at a time and chunks are scored on a process
+    pool. At most two chunks per worker are in flight and results are written in input
+    order as soon as they are ready, so memory stays flat whatever the file size.
+
+    Args:
+        input_path: CSV with the FEATURES columns (other columns are ignored unless kept)
+        output: Text stream the result CSV is written to
+        top_n: Crops per row
+        chunk_size: Rows per chunk
+        workers: Pool size (default: CPU count); 1 scores in this process
+        keep_columns: Input columns copied to the output (e.g. a sample ID)
+        model_dir: Root of versioned recommendation models
+
+    Returns:
+        Dictionary with rows, invalid_rows, chunks, seconds and rows_per_second
+
+    Raises:
+        ValueError: If a feature or kept column is missing from the file
+    """
+    features = CropRecommendationService.FEATURES
+    keep_columns = list(keep_columns)
+    header = pd.read_csv(input_path, nrows=0).columns
+    missing = [name for name in [*features, *keep_columns] if name not in header]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    workers = workers or os.cpu_count() or 1
+    reader = pd.read_csv(input_path, usecols=list(dict.fromkeys([*features, *keep_columns])),
+                         chunksize=chunk_size, dtype=str, keep_default_na=False, na_values=[''])
+
+    stats = {'rows': 0, 'invalid_rows': 0, 'chunks': 0}
+    started = time.perf_counter()
+
+    def write(chunk: pd.DataFrame, scored: Dict[str, np.ndarray]):
+        _format_chunk(chunk, scored, keep_columns).to_csv(output, header=stats['chunks'] == 0, index=False)
+        stats['rows'] += len(chunk)
+        stats['invalid_rows'] += int((~scored['valid']).sum())
+        stats['chunks'] += 1
+
+    if workers == 1:
+        service = CropRecommendationService(model_dir=model_dir)
+        for chunk in reader:
+            write(chunk, score_chunk(_read_features(chunk, features), top_n, service))
+    else:
+        # Spawned workers import only the recommendation service, never TensorFlow
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(model_dir,)) as pool:
+            pending = collections.deque()
+            for chunk in reader:
+                pending.append((chunk[keep_columns], pool.submit(score_chunk, _read_features(chunk, features), top_n)))
+                if len(pending) >= 2 * workers:
+                    kept, future = pending.popleft()
+                    write(kept, future.result())
+            while pending:
+                kept, future = pending.popleft()
+                write(kept, future.result())
+
+    output.flush()
+    stats['seconds'] = round(time.perf_counter() - started, 2)
+    stats['rows_per_second'] = round(stats['rows'] / stats['seconds']) if stats['seconds'] else None
+    logger.info(f"Scored {stats['rows']} rows in {stats['chunks']} chunks ({stats['seconds']}s)")
+    return stats
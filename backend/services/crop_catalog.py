@@ -0,0 +1,213 @@
+"""
+Crop Catalog
+Crop facts shared by the recommendation, field efficiency and harvest planning services
+
+The catalog is read once from data/crop_catalog.json. Every crop has an interned
+canonical ID (the recommendation model's label, e.g. 'kidneybeans'), a display name
+and aliases; any spelling of a name ('KidneyBeans', 'kidney beans', 'Rajma') resolves
+to the same ID with one normalization and one dict lookup.
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CATALOG_PATH = os.path.join(BASE_DIR, "data", "crop_catalog.json")
+
+_NON_ALPHANUMERIC = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_crop_name(name: Optional[str]) -> str:
+    """Lookup key of a crop name: lowercase with spaces, dashes and punctuation removed"""
+    return _NON_ALPHANUMERIC.sub("", name.lower()) if name else ""
+
+
+class CropEntry:
+    """One crop of the catalog, read-only"""
+
+    __slots__ = ('id', 'name', 'aliases', 'details', 'standards', 'maturity_days')
+
+    def __init__(self, crop_id: str, name: str, aliases: Iterable[str] = (),
+                 details: Optional[Mapping] = None, standards: Optional[Mapping] = None,
+                 maturity_days: Optional[int] = None):
+        """
+        Initialize the entry
+
+        Args:
+            crop_id: Canonical crop ID
+            name: Display name
+            aliases: Other names of the crop
+            details: Recommendation details (yield, market, season, ...)
+            standards: Field efficiency standards (water, fertilizer, ideal yield, ...)
+            maturity_days: Days from planting to harvest
+        """
+        self.id = sys.intern(crop_id)
+        self.name = sys.intern(name)
+        self.aliases = tuple(aliases)
+        self.details = MappingProxyType(dict(details)) if details is not None else None
+        self.standards = MappingProxyType(dict(standards)) if standards is not None else None
+        self.maturity_days = maturity_days
+
+
+class CropCatalog:
+    """
+    Indexed crop catalog
+
+    Lookups accept any name or alias and fall back to the catalog defaults for
+    crops (or facts) it does not know, like the literals it replaces.
+    """
+
+    def __init__(self, entries: List[CropEntry], default_details: Mapping, default_standards: Mapping,
+                 default_maturity_days: int, version: Optional[int] = None):
+        """
+        Initialize the catalog and build the lookup index
+
+        Args:
+            entries: Catalog crops
+            default_details: Details of crops without their own
+            default_standards: Standards of crops without their own
+            default_maturity_days: Maturity of crops without their own
+            version: Catalog file version
+
+        Raises:
+            ValueError: If two crops claim the same name or alias
+        """
+        self.version = version
+        self.entries = tuple(entries)
+        self.default_details = MappingProxyType(dict(default_details))
+        self.default_standards = MappingProxyType(dict(default_standards))
+        self.default_maturity_days = int(default_maturity_days)
+
+        self._index: Dict[str, CropEntry] = {}
+        for entry in self.entries:
+            for name in (entry.id, entry.name, *entry.aliases):
+                key = sys.intern(normalize_crop_name(name))
+                owner = self._index.setdefault(key, entry)
+                if owner is not entry:
+                    raise ValueError(f"'{name}' names both {owner.id} and {entry.id}")
+            # Exact spellings skip normalization
+            self._index.setdefault(entry.name, entry)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_CATALOG_PATH) -> "CropCatalog":
+        """
+        Load a catalog file
+
+        Args:
+            path: JSON file with 'defaults' and 'crops'
+
+        Returns:
+            CropCatalog
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        defaults = data['defaults']
+        entries = [
+            CropEntry(
+                crop['id'],
+                crop.get('name') or crop['id'].capitalize(),
+                crop.get('aliases', ()),
+                crop.get('details'),
+                crop.get('standards'),
+                crop.get('maturity_days')
+            )
+            for crop in data['crops']
+        ]
+        catalog = cls(entries, defaults['details'], defaults['standards'], defaults['maturity_days'],
+                      data.get('version'))
+        logger.info(f"Loaded crop catalog with {len(entries)} crops from {path}")
+        return catalog
+
+    def get(self, name: Optional[str]) -> Optional[CropEntry]:
+        """
+        Look up a crop by ID, display name or alias
+
+        Args:
+            name: Crop name in any case or spacing
+
+        Returns:
+            CropEntry, or None for an unknown crop
+        """
+        if not name:
+            return None
+        entry = self._index.get(name)
+        if entry is None:
+            entry = self._index.get(normalize_crop_name(name))
+        return entry
+
+    def resolve(self, name: Optional[str]) -> Optional[str]:
+        """Canonical (interned) crop ID of a name, or None for an unknown crop"""
+        entry = self.get(name)
+        return entry.id if entry is not None else None
+
+    def display_name(self, name: Optional[str]) -> str:
+        """Display name of a crop; unknown names are capitalized"""
+        entry = self.get(name)
+        if entry is not None:
+            return entry.name
+        return name.capitalize() if name else ""
+
+    def get_details(self, name: Optional[str]) -> Mapping:
+        """Recommendation details of a crop, or the default details"""
+        entry = self.get(name)
+        if entry is not None and entry.details is not None:
+            return entry.details
+        return self.default_details
+
+    def get_standards(self, name: Optional[str]) -> Mapping:
+        """Field efficiency standards of a crop, or the default standards"""
+        entry = self.get(name)
+        if entry is not None and entry.standards is not None:
+            return entry.standards
+        return self.default_standards
+
+    def get_maturity_days(self, name: Optional[str]) -> int:
+        """Days from planting to harvest of a crop, or the default"""
+        entry = self.get(name)
+        if entry is not None and entry.maturity_days is not None:
+            return entry.maturity_days
+        return self.default_maturity_days
+
+    def __contains__(self, name: Optional[str]) -> bool:
+        return self.get(name) is not None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get_info(self) -> Dict:
+        """Get catalog size and version"""
+        return {
+            'version': self.version,
+            'crops': len(self.entries),
+            'names': len(self._index)
+        }
+
+
+_catalog: Optional[CropCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_crop_catalog() -> CropCatalog:
+    """
+    Get the process-wide catalog, loading it on first use
+
+    CROP_CATALOG_PATH overrides the bundled data/crop_catalog.json.
+
+    Returns:
+        CropCatalog
+    """
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = CropCatalog.load(os.getenv("CROP_CATALOG_PATH") or DEFAULT_CATALOG_PATH)
+    return _catalog
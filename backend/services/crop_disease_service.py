@@ -1,12 +1,21 @@
 import tensorflow as tf
 import numpy as np
+import asyncio
+import hashlib
 import json
 import os
-from PIL import Image
-import io
-from typing import Dict, List, Tuple, Optional
+import uuid
+from typing import AsyncIterable, AsyncIterator, BinaryIO, Dict, Iterable, List, Tuple, Optional, Union
 import logging
 
+from services.inference_batcher import InferenceBatcher
+from services.prediction_cache import PredictionCache
+from services.tflite_pool import TFLiteInterpreterPool
+from utils.executors import InferenceExecutor
+from utils.image_utils import (
+    ImageDecodeError, TileGrid, decode_image, decode_image_tiles, preprocess_image_bytes, tile_views
+)
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,13 +27,17 @@ class CropDiseaseService:
     """
     
     def __init__(self, model_path: str = "models/plant_disease", 
-                 class_indices_path: str = "models/class_indices.json"):
+                 class_indices_path: str = "models/class_indices.json",
+                 max_batch_size: Optional[int] = None,
+                 max_wait_ms: Optional[float] = None):
         """
         Initialize the crop disease predictor
         
         Args:
             model_path: Path to the saved TensorFlow model
             class_indices_path: Path to the class indices JSON file
+            max_batch_size: Maximum images per forward pass (env INFERENCE_MAX_BATCH_SIZE)
+            max_wait_ms: Maximum time a request waits for a batch to fill (env INFERENCE_MAX_WAIT_MS)
         """
         self.model_path = model_path
         self.class_indices_path = class_indices_path
@@ -32,11 +45,28 @@ class CropDiseaseService:
         self.class_indices = None
         self.reverse_class_indices = None
         self.use_tflite = False
+        self.model_files = []
+        self.max_batch_size = max_batch_size or int(os.getenv("INFERENCE_MAX_BATCH_SIZE", 16))
         
         # Load model and class indices
         self._load_model()
         self._load_class_indices()
         
+        # Repeat uploads of the same photo are served from the cache
+        self.model_version = self._compute_model_version()
+        self.cache = PredictionCache(self.model_version)
+        
+        # Requests arriving close together share one forward pass. TensorFlow already
+        # parallelizes inside an op, while TFLite interpreters scale by running side by side
+        default_workers = (os.cpu_count() or 1) // self.model.num_threads if self.use_tflite else 1
+        self.batcher = InferenceBatcher(
+            self._run_model,
+            max_batch_size=self.max_batch_size,
+            max_wait_ms=max_wait_ms if max_wait_ms is not None else float(os.getenv("INFERENCE_MAX_WAIT_MS", 5)),
+            name="crop-disease",
+            num_workers=int(os.getenv("INFERENCE_BATCH_WORKERS", 0)) or max(1, default_workers)
+        )
+        
     def _load_model(self):
         """Load the TensorFlow model"""
         try:
@@ -45,6 +75,7 @@ class CropDiseaseService:
             if os.path.exists(tflite_path):
                 self.model = self._load_tflite_model(tflite_path)
                 self.use_tflite = True
+                self.model_files = [tflite_path]
                 logger.info(f"TFLite model loaded successfully from {tflite_path}")
                 return
             
@@ -56,12 +87,14 @@ class CropDiseaseService:
                         self.model_path, 
                         call_endpoint='serving_default'
                     )
+                    self.model_files = self._list_model_files(self.model_path)
                     logger.info(f"SavedModel loaded as TFSMLayer from {self.model_path}")
                     return
                 except Exception as e:
                     logger.warning(f"Failed to load as TFSMLayer: {e}")
                     # Try loading with tf.saved_model
                     self.model = tf.saved_model.load(self.model_path)
+                    self.model_files = self._list_model_files(self.model_path)
                     logger.info(f"SavedModel loaded with tf.saved_model.load from {self.model_path}")
                     return
             
@@ -73,11 +106,39 @@ class CropDiseaseService:
             self.model = self._create_dummy_model()
             logger.warning("Using dummy model for testing")
     
+    def _list_model_files(self, model_dir: str) -> List[str]:
+        """List the files making up a SavedModel directory"""
+        files = []
+        for root, _, names in os.walk(model_dir):
+            files.extend(os.path.join(root, name) for name in names)
+        return sorted(files)
+    
+    def _compute_model_version(self) -> str:
+        """
+        Fingerprint the loaded model so cached predictions never outlive it
+        
+        Returns:
+            Short hash of the model files (content for small files, size and mtime
+            for large weight shards), or a random id for the dummy model
+        """
+        if not self.model_files:
+            return f"dummy-{uuid.uuid4().hex[:12]}"
+        
+        digest = hashlib.sha256()
+        for path in self.model_files:
+            stat = os.stat(path)
+            digest.update(os.path.basename(path).encode('utf-8'))
+            if stat.st_size <= 64 * 1024 * 1024:
+                with open(path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                        digest.update(chunk)
+            else:
+                digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8'))
+        return digest.hexdigest()[:16]
+    
     def _load_tflite_model(self, tflite_path):
-        """Load TFLite model"""
-        interpreter = tf.lite.Interpreter(model_path=tflite_path)
-        interpreter.allocate_tensors()
-        return interpreter
+        """Load TFLite model as a pool of per-thread interpreters"""
+        return TFLiteInterpreterPool(tflite_path, max_batch_size=self.max_batch_size)
     
     def _create_dummy_model(self):
         """Create a dummy model for testing when real model fails to load"""
@@ -116,23 +177,7 @@ class CropDiseaseService:
             Preprocessed image array
         """
         try:
-            # Load image from bytes
-            image = Image.open(io.BytesIO(image_data))
-            
-            # Convert to RGB if necessary
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Resize image
-            image = image.resize(target_size)
-            
-            # Convert to array and normalize
-            image_array = np.array(image) / 255.0
-            
-            # Add batch dimension
-            image_array = np.expand_dims(image_array, axis=0)
-            
-            return image_array
+            return preprocess_image_bytes(image_data, target_size)
             
         except Exception as e:
             logger.error(f"Error preprocessing image: {e}")
@@ -149,69 +194,313 @@ class CropDiseaseService:
             Prediction results with confidence scores
         """
         try:
+            key, cached = self._cache_lookup(image_data)
+            if cached is not None:
+                cached.pop('image_info', None)
+                return cached
+            
             # Preprocess image
-            processed_image = self.preprocess_image(image_data)
+            decoded = decode_image(image_data)
             
-            # Make prediction based on model type
-            if isinstance(self.model, tf.lite.Interpreter):
-                predictions = self._predict_tflite(processed_image)
-            else:
-                predictions = self.model.predict(processed_image)
+            # Queue for the next micro-batch and wait for our row
+            predictions = self.batcher.predict(decoded.array)
             
-            # Get top 3 predictions
-            top_3_indices = np.argsort(predictions[0])[-3:][::-1]
+            result = self._build_result(predictions[0])
+            if key is not None:
+                self.cache.put(key, dict(result, image_info=decoded.get_info()))
+            return result
             
-            results = []
-            for idx in top_3_indices:
-                class_name = self.reverse_class_indices[idx]
-                confidence = float(predictions[0][idx])
-                
-                # Parse class name to get crop and disease
-                crop, disease = self._parse_class_name(class_name)
-                
-                results.append({
-                    'crop': crop,
-                    'disease': disease,
-                    'confidence': confidence,
-                    'class_name': class_name
-                })
+        except Exception as e:
+            logger.error(f"Error in prediction: {e}")
+            # Return dummy prediction for testing
+            return self._get_dummy_prediction()
+    
+    async def predict_async(self, image_data: Union[bytes, BinaryIO], executor: InferenceExecutor,
+                            cache_key: Optional[str] = None) -> Dict:
+        """
+        Predict crop disease without blocking the event loop
+        
+        Repeat uploads are answered from the prediction cache. Otherwise the upload is
+        validated and preprocessed in a single decode on the executor, and the forward
+        pass runs on the batcher thread, so the caller only awaits.
+        
+        Args:
+            image_data: Image data as bytes or a seekable binary file object
+            executor: Executor used for hashing and image decoding
+            cache_key: Precomputed cache key (see PredictionCache.new_hasher); required
+                for the cache to be used when image_data is a file object
             
-            # Determine severity and recommendations
-            top_prediction = results[0]
-            severity = self._determine_severity(top_prediction['disease'], top_prediction['confidence'])
-            recommendations = self._get_recommendations(top_prediction['crop'], top_prediction['disease'])
+        Returns:
+            Prediction results with confidence scores, plus 'image_info' with the
+            original size, format and mode of the upload
             
-            return {
-                'predictions': results,
-                'top_prediction': top_prediction,
-                'severity': severity,
-                'recommendations': recommendations,
-                'model_info': {
-                    'model_name': 'PlantVillage MobileNet',
-                    'total_classes': len(self.class_indices),
-                    'confidence_threshold': 0.5
-                }
-            }
+        Raises:
+            ImageDecodeError: If the data is not a supported image
+        """
+        if cache_key is not None:
+            key, cached = cache_key, await executor.run(self.cache.get, cache_key)
+        elif isinstance(image_data, (bytes, bytearray, memoryview)):
+            key, cached = await executor.run(self._cache_lookup, image_data)
+        else:
+            key, cached = None, None
+        if cached is not None:
+            return cached
+        
+        decoded = await executor.run_cpu(decode_image, image_data)
+        
+        try:
+            predictions = await asyncio.wrap_future(self.batcher.submit(decoded.array))
+            result = self._build_result(predictions[0])
+            result['image_info'] = decoded.get_info()
             
         except Exception as e:
             logger.error(f"Error in prediction: {e}")
-            # Return dummy prediction for testing
-            return self._get_dummy_prediction()
+            # Return dummy prediction for testing, never cached
+            result = self._get_dummy_prediction()
+            result['image_info'] = decoded.get_info()
+            return result
+        
+        if key is not None:
+            await executor.run(self.cache.put, key, result)
+        return result
+    
+    def _cache_lookup(self, image_data: bytes) -> Tuple[Optional[str], Optional[Dict]]:
+        """
+        Hash an image and look it up in the prediction cache
+        
+        Args:
+            image_data: Image data as bytes
+            
+        Returns:
+            Tuple of (cache key or None when caching is disabled, cached result or None)
+        """
+        if not self.cache.enabled:
+            return None, None
+        key = self.cache.make_key(image_data)
+        return key, self.cache.get(key)
+    
+    async def predict_many_async(self, images: Union[Iterable[bytes], AsyncIterable[bytes]],
+                                 executor: InferenceExecutor, max_in_flight: Optional[int] = None
+                                 ) -> AsyncIterator[Tuple[int, Union[Dict, Exception]]]:
+        """
+        Predict crop disease for many images, yielding each result as it finishes
+        
+        Images are decoded in parallel on the executor and scored in micro-batches.
+        Only `max_in_flight` images are held at once, so the input can be a lazy
+        iterable. Inputs that block while producing an image (e.g. members of a zip
+        archive) should be async iterables that read on an executor, since a plain
+        iterable is consumed on the event loop.
+        
+        Args:
+            images: Iterable or async iterable of image data as bytes
+            executor: Executor used for image decoding
+            max_in_flight: Maximum images decoded or queued at once
+            
+        Yields:
+            Tuples of (index, result), where result is an ImageDecodeError for invalid images
+        """
+        limit = max_in_flight or max(executor.max_workers, self.batcher.max_batch_size) * 2
+        
+        async def analyze(index: int, image_data: bytes):
+            try:
+                return index, await self.predict_async(image_data, executor)
+            except ImageDecodeError as e:
+                return index, e
+        
+        async def read_images():
+            if isinstance(images, AsyncIterable):
+                async for image_data in images:
+                    yield image_data
+            else:
+                for image_data in images:
+                    yield image_data
+        
+        pending = set()
+        try:
+            index = 0
+            async for image_data in read_images():
+                pending.add(asyncio.ensure_future(analyze(index, image_data)))
+                index += 1
+                if len(pending) >= limit:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield task.result()
+            
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            # Client went away mid-stream
+            for task in pending:
+                task.cancel()
+    
+    async def predict_tiled_async(self, image_data: Union[bytes, BinaryIO], executor: InferenceExecutor,
+                                  overlap: float = 0.25, max_tiles: int = 64) -> Dict:
+        """
+        Predict crop disease on overlapping tiles of a large image
+        
+        The image is decoded once at the resolution of its tile grid and cut into
+        tiles as views of that array. Tile rows go through the micro-batcher, which
+        copies them straight into the batch tensor.
+        
+        Args:
+            image_data: Image data as bytes or a seekable binary file object
+            executor: Executor used for image decoding
+            overlap: Fraction of a tile shared with its neighbour
+            max_tiles: Maximum number of tiles
+            
+        Returns:
+            Field-level verdict, per-tile predictions, disease probability heatmap,
+            grid layout and 'image_info'
+            
+        Raises:
+            ImageDecodeError: If the data is not a supported image
+        """
+        decoded, grid = await executor.run_cpu(decode_image_tiles, image_data, 224, overlap, max_tiles)
+        tiles = tile_views(decoded.array, grid)
+        
+        futures = []
+        for row in range(grid.rows):
+            for start in range(0, grid.cols, self.max_batch_size):
+                futures.append(asyncio.wrap_future(
+                    self.batcher.submit(tiles[row, start:start + self.max_batch_size])
+                ))
+        probabilities = np.concatenate(await asyncio.gather(*futures), axis=0)
+        
+        result = self._build_tiled_result(probabilities, grid)
+        result['grid']['overlap'] = overlap
+        result['image_info'] = decoded.get_info()
+        return result
+    
+    def _build_tiled_result(self, probabilities: np.ndarray, grid: TileGrid) -> Dict:
+        """
+        Aggregate tile predictions into a field-level result
+        
+        Args:
+            probabilities: Class probabilities of shape (rows * cols, num_classes), row-major
+            grid: Tile grid the probabilities belong to
+            
+        Returns:
+            Field verdict, per-tile predictions, heatmap and grid layout
+        """
+        healthy = np.array([
+            'healthy' in self.reverse_class_indices[i].lower() for i in range(probabilities.shape[1])
+        ])
+        disease_probability = 1.0 - probabilities[:, healthy].sum(axis=1)
+        top_indices = probabilities.argmax(axis=1)
+        affected = disease_probability >= 0.5
+        
+        tiles = []
+        for i, idx in enumerate(top_indices):
+            row, col = divmod(i, grid.cols)
+            x, y, width, height = grid.tile_box(row, col)
+            crop, disease = self._parse_class_name(self.reverse_class_indices[idx])
+            tiles.append({
+                'row': row,
+                'col': col,
+                'x': x,
+                'y': y,
+                'width': width,
+                'height': height,
+                'crop': crop,
+                'disease': disease,
+                'confidence': round(float(probabilities[i, idx]), 4),
+                'disease_probability': round(float(disease_probability[i]), 4)
+            })
+        
+        # Diagnose from the affected tiles only, so a small lesion is not averaged away
+        affected_count = int(affected.sum())
+        field = self._build_result(probabilities[affected].mean(axis=0) if affected_count else probabilities.mean(axis=0))
+        affected_fraction = affected_count / len(probabilities)
+        if affected_count and affected_fraction >= 0.25:
+            # Widespread infection is one level worse than a single tile suggests
+            field['severity'] = {'low': 'medium', 'medium': 'high'}.get(field['severity'], field['severity'])
+        field.update({
+            'status': 'diseased' if affected_count else 'healthy',
+            'affected_tiles': affected_count,
+            'total_tiles': len(probabilities),
+            'affected_fraction': round(affected_fraction, 4),
+            'max_disease_probability': round(float(disease_probability.max()), 4)
+        })
+        
+        return {
+            'field': field,
+            'tiles': tiles,
+            'heatmap': {
+                'metric': 'disease_probability',
+                'rows': grid.rows,
+                'cols': grid.cols,
+                'values': np.round(disease_probability, 3).reshape(grid.rows, grid.cols).tolist()
+            },
+            'grid': grid.get_info()
+        }
+    
+    def _run_model(self, batch: np.ndarray) -> np.ndarray:
+        """
+        Run one forward pass over a batch
+        
+        Args:
+            batch: Preprocessed images of shape (B, 224, 224, 3)
+            
+        Returns:
+            Class probabilities of shape (B, num_classes)
+        """
+        if isinstance(self.model, TFLiteInterpreterPool):
+            return self.model.predict(batch)
+        if hasattr(self.model, 'predict'):
+            return self.model.predict(batch, verbose=0)
+        
+        # TFSMLayer returns a dict of output tensors keyed by signature name
+        outputs = self.model(tf.convert_to_tensor(batch, dtype=tf.float32))
+        if isinstance(outputs, dict):
+            outputs = next(iter(outputs.values()))
+        return np.asarray(outputs)
     
-    def _predict_tflite(self, processed_image):
-        """Make prediction using TFLite model"""
-        input_details = self.model.get_input_details()
-        output_details = self.model.get_output_details()
+    def _build_result(self, probabilities: np.ndarray) -> Dict:
+        """
+        Build the analysis result for one image
+        
+        Args:
+            probabilities: Class probabilities for a single image
+            
+        Returns:
+            Prediction results with severity and recommendations
+        """
+        # Get top 3 predictions
+        top_3_indices = np.argsort(probabilities)[-3:][::-1]
         
-        # Convert to float32 if needed
-        if input_details[0]['dtype'] == np.float32:
-            processed_image = processed_image.astype(np.float32)
+        results = []
+        for idx in top_3_indices:
+            class_name = self.reverse_class_indices[idx]
+            confidence = float(probabilities[idx])
+            
+            # Parse class name to get crop and disease
+            crop, disease = self._parse_class_name(class_name)
+            
+            results.append({
+                'crop': crop,
+                'disease': disease,
+                'confidence': confidence,
+                'class_name': class_name
+            })
         
-        self.model.set_tensor(input_details[0]['index'], processed_image)
-        self.model.invoke()
+        # Determine severity and recommendations
+        top_prediction = results[0]
+        severity = self._determine_severity(top_prediction['disease'], top_prediction['confidence'])
+        recommendations = self._get_recommendations(top_prediction['crop'], top_prediction['disease'])
         
-        predictions = self.model.get_tensor(output_details[0]['index'])
-        return predictions
+        return {
+            'predictions': results,
+            'top_prediction': top_prediction,
+            'severity': severity,
+            'recommendations': recommendations,
+            'model_info': {
+                'model_name': 'PlantVillage MobileNet',
+                'total_classes': len(self.class_indices),
+                'confidence_threshold': 0.5
+            }
+        }
     
     def _get_dummy_prediction(self):
         """Return dummy prediction for testing"""
@@ -364,9 +653,41 @@ class CropDiseaseService:
             'total_classes': len(self.class_indices),
             'input_shape': (224, 224, 3),
             'classes': list(self.class_indices.keys()),
-            'model_path': self.model_path
+            'model_path': self.model_path,
+            'model_version': self.model_version,
+            'runtime': 'tflite' if self.use_tflite else 'tensorflow',
+            'tflite_pool': self.model.get_info() if self.use_tflite else None
         }
     
+    def warm_up(self):
+        """
+        Run blank batches through the full inference path
+        
+        Traces the TF graph (or allocates TFLite tensors) for the single-image and
+        full-batch shapes so the first real request does not pay for it.
+        """
+        for batch_size in sorted({1, self.max_batch_size}):
+            self.batcher.predict(np.zeros((batch_size, 224, 224, 3), dtype=np.float32))
+        logger.info(f"Crop disease model warmed up for batch sizes 1 and {self.max_batch_size}")
+    
+    def get_cache_stats(self) -> Dict:
+        """
+        Get prediction cache statistics
+        
+        Returns:
+            Hit/miss counters and usage of the memory and disk tiers
+        """
+        return self.cache.get_stats()
+    
+    def get_batching_stats(self) -> Dict:
+        """
+        Get micro-batching statistics
+        
+        Returns:
+            Batch size and queue wait histograms with counters
+        """
+        return self.batcher.get_stats()
+    
     def get_classes(self) -> List[Dict]:
         """
         Get all available disease classes
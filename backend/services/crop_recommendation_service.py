@@ -1,14 +1,20 @@
 import pickle
 import os
 import json
+import uuid
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import GradientBoostingClassifier
 from sklearn.preprocessing import MinMaxScaler
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 import logging
 import joblib
 
+from services.crop_catalog import CropCatalog, get_crop_catalog
+from services.neighbor_index import NeighborIndex
+from services.recommendation_artifacts import ModelBundle, file_sha256, latest_version, load_bundle
+from services.tree_kernel import TreeEnsembleKernel
+from utils.lru_cache import LRUCache
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -30,50 +36,146 @@ class CropRecommendationService:
     22 Crop Classes: Rice, Wheat, Maize, Chickpea, Cotton, etc.
     """
     
-    def __init__(self, model_path: str = None, scaler_path: str = None):
+    FEATURES = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+    
+    # Input resolution that matters agronomically: kg/ha for nutrients, 0.1 °C,
+    # 0.5 % humidity, 0.05 pH and 1 mm rainfall
+    RESOLUTION = np.array([1.0, 1.0, 1.0, 0.1, 0.5, 0.05, 1.0])
+    
+    def __init__(self, model_path: str = None, scaler_path: str = None, model_dir: str = None):
         """
         Initialize the crop recommendation service
         
+        Models are trained offline with `python -m scripts.train_crop_recommendation`;
+        the service only loads them.
+        
         Args:
-            model_path: Path to saved model file
-            scaler_path: Path to saved scaler file
+            model_path: Path to a legacy model pickle, used when no versioned model exists
+            scaler_path: Path to the legacy scaler pickle
+            model_dir: Root of versioned models (env CROP_RECOMMENDATION_MODEL_DIR)
         """
         # Get absolute paths relative to this file
         base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         
+        self.model_dir = model_dir or os.getenv("CROP_RECOMMENDATION_MODEL_DIR") or \
+            os.path.join(base_dir, "models", "crop_recommendation")
         self.model_path = model_path or os.path.join(base_dir, "models", "crop_recommendation_model.pkl")
         self.scaler_path = scaler_path or os.path.join(base_dir, "models", "crop_scaler.pkl")
         self.data_path = os.path.join(base_dir, "models", "Crop_recommendation.csv")
         self.targets_path = os.path.join(base_dir, "models", "crop_targets.json")
         
-        self.model = None
-        self.scaler = None
-        self.crop_targets = None
-        self.reverse_targets = None
+        # Crop names, details and aliases
+        self.catalog: CropCatalog = get_crop_catalog()
+        
+        # Small batches use the NumPy tree kernel, larger ones sklearn's compiled traversal
+        self.kernel_max_rows = int(os.getenv("RECOMMEND_KERNEL_MAX_ROWS", 32))
+        
+        # Model, scaler, kernel and class map are swapped together as one bundle
+        self.bundle = self._load_bundle()
+        
+        # Repeat soil tests are answered from a cache keyed on quantized inputs
+        self.cache = LRUCache(
+            max_entries=int(os.getenv("RECOMMEND_CACHE_SIZE", 4096)),
+            ttl_seconds=float(os.getenv("RECOMMEND_CACHE_TTL_SECONDS", 3600)) or None
+        )
+    
+    @property
+    def model(self):
+        return self.bundle.model
+    
+    @property
+    def scaler(self):
+        return self.bundle.scaler
+    
+    @property
+    def kernel(self) -> Optional[TreeEnsembleKernel]:
+        return self.bundle.kernel
+    
+    @property
+    def model_version(self) -> str:
+        return self.bundle.version
+    
+    @property
+    def class_labels(self) -> np.ndarray:
+        return self.bundle.class_labels
+    
+    @property
+    def reverse_targets(self) -> Dict[int, str]:
+        return self.bundle.reverse_targets
+    
+    @property
+    def crop_targets(self) -> Dict[str, int]:
+        return self.bundle.crop_targets
+    
+    def swap_bundle(self, bundle: ModelBundle):
+        """
+        Serve a new model bundle
+        
+        The swap is a single reference assignment: requests in flight finish with the
+        bundle they started with, later ones use the new one. Cached answers are keyed
+        by version, so none of the old model's is served again.
         
-        # Load or create model
-        self._load_or_create_model()
+        Args:
+            bundle: Bundle of the new model version
+        """
+        previous, self.bundle = self.bundle, bundle
+        self.cache.clear()
+        logger.info(f"Crop recommendation model swapped from {previous.version} to {bundle.version}")
+    
+    def _load_bundle(self) -> ModelBundle:
+        """Load the pinned or latest versioned model, else a legacy pickle, else a dummy model"""
+        version = os.getenv("CROP_RECOMMENDATION_MODEL_VERSION") or latest_version(self.model_dir)
+        if version:
+            try:
+                bundle = load_bundle(os.path.join(self.model_dir, version), self.FEATURES)
+                logger.info(f"Model {version} loaded from {self.model_dir}")
+                if bundle.neighbors is None:
+                    bundle.neighbors = self._build_neighbors(bundle.scaler)
+                return bundle
+            except Exception as e:
+                logger.error(f"Could not load model {version} from {self.model_dir}: {e}")
         
-    def _load_or_create_model(self):
-        """Load existing model or create new one from dataset"""
         try:
-            # Try to load existing model
             if os.path.exists(self.model_path) and os.path.exists(self.scaler_path):
-                self.model = joblib.load(self.model_path)
-                self.scaler = joblib.load(self.scaler_path)
+                bundle = self._load_legacy_bundle()
                 logger.info(f"Model loaded successfully from {self.model_path}")
-                
-                # Load targets mapping
-                self._load_targets_from_csv()
-                return
+                return bundle
         except Exception as e:
             logger.warning(f"Could not load existing model: {e}")
         
-        # Create new model from dataset
-        logger.info("Creating new model from dataset...")
-        self._train_model()
+        logger.error(
+            "No crop recommendation model found, train one with "
+            "`python -m scripts.train_crop_recommendation`"
+        )
+        return self._create_dummy_model()
+    
+    def _load_legacy_bundle(self) -> ModelBundle:
+        """Load a model and scaler pickled directly under models/ (e.g. exported from Colab)"""
+        model = joblib.load(self.model_path, mmap_mode='r')
+        scaler = joblib.load(self.scaler_path, mmap_mode='r')
+        
+        try:
+            kernel = TreeEnsembleKernel.from_sklearn(model, scaler)
+        except Exception as e:
+            logger.warning(f"Tree kernel unavailable, using sklearn: {e}")
+            kernel = None
         
-    def _load_targets_from_csv(self):
+        version = f"legacy-{file_sha256(self.model_path)[:12]}"
+        return ModelBundle(version, model, scaler, self._load_targets_from_csv(), kernel, path=self.model_path,
+                           neighbors=self._build_neighbors(scaler))
+    
+    def _build_neighbors(self, scaler) -> Optional[NeighborIndex]:
+        """Index the dataset once at load time for models published without a neighbor index"""
+        try:
+            df = pd.read_csv(self.data_path)
+            neighbors = NeighborIndex.build(df[self.FEATURES].to_numpy(dtype=np.float64), df['label'].to_numpy(), scaler)
+            logger.info(f"Indexed {len(neighbors)} samples for neighbor lookups")
+            return neighbors
+        except Exception as e:
+            logger.warning(f"Neighbor index unavailable: {e}")
+            return None
+        
+    def _load_targets_from_csv(self) -> Dict[int, str]:
         """Load crop target mappings from JSON or CSV"""
         try:
             # Try to load from JSON first (faster)
@@ -82,25 +184,21 @@ class CropRecommendationService:
                     targets_json = json.load(f)
                 # Convert string keys to integers
                 targets = {int(k): v for k, v in targets_json.items()}
-                self.reverse_targets = targets
-                self.crop_targets = {v: k for k, v in targets.items()}
                 logger.info(f"Loaded {len(targets)} crop categories from JSON")
-                return
+                return targets
             
             # Fallback to CSV
             if os.path.exists(self.data_path):
                 df = pd.read_csv(self.data_path)
                 c = df['label'].astype('category')
                 targets = dict(enumerate(c.cat.categories))
-                self.crop_targets = {v: k for k, v in targets.items()}
-                self.reverse_targets = targets
                 logger.info(f"Loaded {len(targets)} crop categories from CSV")
-                return
+                return targets
         except Exception as e:
             logger.error(f"Error loading targets: {e}")
         
         # Create default targets as fallback
-        self.crop_targets = {
+        crop_targets = {
             'rice': 0, 'maize': 1, 'jute': 2, 'cotton': 3,
             'coconut': 4, 'papaya': 5, 'orange': 6, 'apple': 7,
             'muskmelon': 8, 'watermelon': 9, 'grapes': 10,
@@ -109,91 +207,35 @@ class CropRecommendationService:
             'mothbeans': 17, 'pigeonpeas': 18, 'kidneybeans': 19,
             'chickpea': 20, 'coffee': 21
         }
-        self.reverse_targets = {v: k for k, v in self.crop_targets.items()}
         logger.warning("Using default crop targets")
+        return {v: k for k, v in crop_targets.items()}
     
-    def _train_model(self):
-        """Train the model on the dataset"""
-        try:
-            # Load dataset
-            if not os.path.exists(self.data_path):
-                logger.error(f"Dataset not found at {self.data_path}")
-                self._create_dummy_model()
-                return
-            
-            df = pd.read_csv(self.data_path)
-            logger.info(f"Loaded dataset with {len(df)} records")
-            
-            # Create target mapping
-            c = df['label'].astype('category')
-            targets = dict(enumerate(c.cat.categories))
-            df['target'] = c.cat.codes
-            self.crop_targets = {v: k for k, v in targets.items()}
-            self.reverse_targets = targets
-            
-            # Prepare features and target
-            X = df[['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']]
-            y = df['target']
-            
-            # Split data
-            from sklearn.model_selection import train_test_split
-            X_train, X_test, y_train, y_test = train_test_split(X, y, random_state=42, test_size=0.2)
-            
-            # Scale features
-            self.scaler = MinMaxScaler()
-            X_train_scaled = self.scaler.fit_transform(X_train)
-            X_test_scaled = self.scaler.transform(X_test)
-            
-            # Train model - Using Gradient Boosting (best accuracy ~99.6%)
-            self.model = GradientBoostingClassifier(
-                n_estimators=100,
-                learning_rate=0.1,
-                max_depth=5,
-                random_state=42
-            )
-            
-            self.model.fit(X_train_scaled, y_train)
-            
-            # Evaluate
-            train_score = self.model.score(X_train_scaled, y_train)
-            test_score = self.model.score(X_test_scaled, y_test)
-            logger.info(f"Model trained - Train accuracy: {train_score:.4f}, Test accuracy: {test_score:.4f}")
-            
-            # Save model and scaler
-            os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
-            joblib.dump(self.model, self.model_path)
-            joblib.dump(self.scaler, self.scaler_path)
-            logger.info(f"Model saved to {self.model_path}")
-            
-        except Exception as e:
-            logger.error(f"Error training model: {e}")
-            self._create_dummy_model()
-    
-    def _create_dummy_model(self):
+    def _create_dummy_model(self) -> ModelBundle:
         """Create a dummy model for testing"""
         from sklearn.ensemble import RandomForestClassifier
         
-        self.model = RandomForestClassifier(n_estimators=10, random_state=42)
-        self.scaler = MinMaxScaler()
+        model = RandomForestClassifier(n_estimators=10, random_state=42)
+        scaler = MinMaxScaler()
         
         # Create dummy training data
         X_dummy = np.random.rand(100, 7) * 100
         y_dummy = np.random.randint(0, 22, 100)
         
-        self.scaler.fit(X_dummy)
-        self.model.fit(X_dummy, y_dummy)
-        
-        # Default targets
-        self.crop_targets = {'rice': 0, 'maize': 1, 'cotton': 2, 'chickpea': 3}
-        self.reverse_targets = {0: 'rice', 1: 'maize', 2: 'cotton', 3: 'chickpea'}
+        scaler.fit(X_dummy)
+        model.fit(scaler.transform(X_dummy), y_dummy)
         
         logger.warning("Using dummy model for testing")
+        # Default targets
+        return ModelBundle(
+            f"dummy-{uuid.uuid4().hex[:12]}", model, scaler,
+            {0: 'rice', 1: 'maize', 2: 'cotton', 3: 'chickpea'}
+        )
     
-    def preprocess_input(self, N: float, P: float, K: float, 
-                        temperature: float, humidity: float, 
-                        ph: float, rainfall: float) -> np.ndarray:
+    def predict_top_n(self, N: float, P: float, K: float,
+                     temperature: float, humidity: float,
+                     ph: float, rainfall: float, n: int = 5) -> List[Dict]:
         """
-        Preprocess input features for prediction
+        Predict top N crop recommendations
         
         Args:
             N: Nitrogen level
@@ -203,27 +245,57 @@ class CropRecommendationService:
             humidity: Humidity percentage
             ph: Soil pH
             rainfall: Rainfall in mm
+            n: Number of top predictions to return
         
         Returns:
-            Preprocessed numpy array
+            List of dictionaries with crop predictions
         """
-        # Convert to DataFrame with proper column names (fixes sklearn warning)
-        input_df = pd.DataFrame([[N, P, K, temperature, humidity, ph, rainfall]], 
-                               columns=['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall'])
+        try:
+            return self._predict_top_n([N, P, K, temperature, humidity, ph, rainfall], n)
+            
+        except Exception as e:
+            logger.error(f"Error in prediction: {e}")
+            return self._get_dummy_predictions()
+    
+    def _predict_top_n(self, values: List[float], n: int, bundle: Optional[ModelBundle] = None) -> List[Dict]:
+        """Top N predictions for one sample in FEATURES order, raising on failure"""
+        bundle = bundle or self.bundle
+        features = np.array([values], dtype=np.float64)
+        top_indices, top_probabilities = self.predict_top_n_batch(features, n, bundle)
         
-        # Scale features
-        if self.scaler:
-            input_array = self.scaler.transform(input_df)
-        else:
-            input_array = input_df.values
+        results = []
+        for crop_name, probability in zip(bundle.class_labels[top_indices[0]], top_probabilities[0]):
+            confidence = float(probability * 100)
+            
+            results.append({
+                'crop': str(crop_name),
+                'confidence': round(confidence, 2),
+                'suitability': round(confidence, 2),
+                'probability': float(probability)
+            })
         
-        return input_array
+        return results
     
-    def predict_top_n(self, N: float, P: float, K: float,
-                     temperature: float, humidity: float,
-                     ph: float, rainfall: float, n: int = 5) -> List[Dict]:
+    def quantize(self, features: np.ndarray) -> np.ndarray:
         """
-        Predict top N crop recommendations
+        Snap features to RESOLUTION steps
+        
+        Args:
+            features: Array of shape (..., 7) in FEATURES order
+        
+        Returns:
+            Integer steps of the same shape
+        """
+        return np.rint(np.asarray(features, dtype=np.float64) / self.RESOLUTION).astype(np.int64)
+    
+    def recommend(self, N: float, P: float, K: float,
+                  temperature: float, humidity: float,
+                  ph: float, rainfall: float, n: int = 5) -> List[Dict]:
+        """
+        Get the top N crop recommendations with crop details, memoized
+        
+        Inputs are snapped to RESOLUTION before scoring, so every sample in the same
+        quantization cell gets the same, cacheable answer.
         
         Args:
             N: Nitrogen level
@@ -233,38 +305,301 @@ class CropRecommendationService:
             humidity: Humidity percentage
             ph: Soil pH
             rainfall: Rainfall in mm
-            n: Number of top predictions to return
+            n: Number of recommendations
         
         Returns:
-            List of dictionaries with crop predictions
+            List of recommendations with confidence, suitability, yield, market and reasons
+        """
+        features = [N, P, K, temperature, humidity, ph, rainfall]
+        recommendations = self.cached_recommendations(features, n)
+        if recommendations is None:
+            recommendations = self.score_recommendations(features, n)
+        return recommendations
+    
+    def cached_recommendations(self, features: List[float], n: int = 5) -> Optional[List[Dict]]:
+        """
+        Get memoized recommendations without scoring (cheap enough for the event loop)
+        
+        Args:
+            features: Feature values in FEATURES order
+            n: Number of recommendations
+        
+        Returns:
+            Copies of the cached recommendations, None on a cache miss
+        """
+        recommendations = self.cache.get(self._recommendation_key(self.bundle, features, n))
+        if recommendations is None:
+            return None
+        # Copies, so callers never mutate a cached entry
+        return [dict(rec, reasons=list(rec['reasons'])) for rec in recommendations]
+    
+    def score_recommendations(self, features: List[float], n: int = 5) -> List[Dict]:
+        """
+        Score quantized features and memoize the recommendations (no cache lookup)
+        
+        Args:
+            features: Feature values in FEATURES order
+            n: Number of recommendations
+        
+        Returns:
+            List of recommendations as returned by recommend
         """
+        # One bundle for key and prediction, even if an update swaps it meanwhile
+        bundle = self.bundle
+        key = self._recommendation_key(bundle, features, n)
         try:
-            # Preprocess input
-            input_array = self.preprocess_input(N, P, K, temperature, humidity, ph, rainfall)
-            
-            # Get predictions
-            predictions = self.model.predict_proba(input_array)[0]
-            
-            # Get top N predictions
-            top_n_indices = np.argsort(predictions)[-n:][::-1]
-            
-            results = []
-            for idx in top_n_indices:
-                crop_name = self.reverse_targets.get(idx, f"Crop_{idx}")
-                confidence = float(predictions[idx] * 100)
-                
-                results.append({
-                    'crop': crop_name,
-                    'confidence': round(confidence, 2),
-                    'suitability': round(confidence, 2),
-                    'probability': float(predictions[idx])
-                })
-            
-            return results
-            
+            predictions = self._predict_top_n((np.array(key[2:]) * self.RESOLUTION).tolist(), n, bundle)
         except Exception as e:
             logger.error(f"Error in prediction: {e}")
-            return self._get_dummy_predictions()
+            # Dummy predictions are never cached
+            return [self._build_recommendation(pred) for pred in self._get_dummy_predictions()]
+        
+        recommendations = [self._build_recommendation(pred) for pred in predictions]
+        self.cache.put(key, recommendations)
+        return [dict(rec, reasons=list(rec['reasons'])) for rec in recommendations]
+    
+    def _recommendation_key(self, bundle: ModelBundle, features: List[float], n: int) -> Tuple:
+        """Cache key: model version, n and the quantized feature steps"""
+        return (bundle.version, n) + tuple(self.quantize(features).tolist())
+    
+    def find_neighbors(self, N: float, P: float, K: float,
+                       temperature: float, humidity: float,
+                       ph: float, rainfall: float, k: int = 5) -> Optional[List[Dict]]:
+        """
+        Find the most similar historical soil samples
+        
+        Args:
+            N: Nitrogen level
+            P: Phosphorus level
+            K: Potassium level
+            temperature: Temperature in Celsius
+            humidity: Humidity percentage
+            ph: Soil pH
+            rainfall: Rainfall in mm
+            k: Number of samples
+        
+        Returns:
+            Samples nearest first, each with its crop, distance in scaled feature space,
+            dataset row and feature values; None when no index is loaded
+        """
+        neighbors = self.bundle.neighbors
+        if neighbors is None:
+            return None
+        
+        distances, rows = neighbors.query(np.array([[N, P, K, temperature, humidity, ph, rainfall]]), k)
+        samples = []
+        for distance, row in zip(distances[0].tolist(), rows[0].tolist()):
+            sample = {
+                'crop': self.catalog.display_name(neighbors.labels[row]),
+                'distance': round(distance, 4),
+                'row': row
+            }
+            sample.update(zip(self.FEATURES, neighbors.features[row].tolist()))
+            samples.append(sample)
+        return samples
+    
+    def _build_recommendation(self, prediction: Dict) -> Dict:
+        """
+        Enrich a prediction with crop details
+        
+        Args:
+            prediction: Prediction from predict_top_n
+        
+        Returns:
+            Recommendation dictionary
+        """
+        crop_name = prediction['crop']
+        details = self.get_crop_details(crop_name)
+        
+        return {
+            "crop": self.catalog.display_name(crop_name),
+            "confidence": prediction['confidence'],
+            "suitability": prediction['suitability'],
+            "expected_yield": details['expected_yield'],
+            "profit_potential": details['profit_potential'],
+            "market_demand": details['market_demand'],
+            "reasons": [
+                f"{details['description']}",
+                f"Ideal for {details['season']} season",
+                f"Water requirement: {details['water_requirement']}",
+                f"Expected yield: {details['expected_yield']} quintals per acre"
+            ]
+        }
+    
+    def get_cache_stats(self) -> Dict:
+        """
+        Get recommendation cache statistics
+        
+        Returns:
+            Hit/miss counters and usage, plus the model version in the keys
+        """
+        stats = self.cache.get_stats()
+        stats['model_version'] = self.model_version
+        return stats
+    
+    def scale_features(self, features: np.ndarray, scaler=None) -> np.ndarray:
+        """
+        Scale a feature matrix with the fitted scaler
+        
+        Args:
+            features: Array of shape (rows, 7) in FEATURES order
+            scaler: Scaler to use, defaults to the current bundle's
+        
+        Returns:
+            Scaled float64 array of shape (rows, 7)
+        """
+        scaler = scaler if scaler is not None else self.scaler
+        if isinstance(scaler, MinMaxScaler):
+            # Same arithmetic as MinMaxScaler.transform, without the DataFrame round trip
+            return features * scaler.scale_ + scaler.min_
+        if scaler:
+            return scaler.transform(pd.DataFrame(features, columns=self.FEATURES))
+        return features
+    
+    def predict_proba_batch(self, features: np.ndarray, bundle: Optional[ModelBundle] = None) -> np.ndarray:
+        """
+        Class probabilities for many soil samples in one pass
+        
+        Batches up to kernel_max_rows rows go through the NumPy tree kernel, which
+        skips sklearn's per-call validation; larger ones through sklearn's traversal.
+        
+        Args:
+            features: Array of shape (rows, 7) in FEATURES order
+            bundle: Model bundle to score with, defaults to the current one
+        
+        Returns:
+            Probabilities of shape (rows, classes), columns in the bundle's class_labels order
+        """
+        bundle = bundle or self.bundle
+        if bundle.kernel is not None and len(features) <= self.kernel_max_rows:
+            return bundle.kernel.predict_proba(features)
+        return bundle.model.predict_proba(self.scale_features(features, bundle.scaler))
+    
+    def predict_top_n_batch(self, features: np.ndarray, n: int = 5,
+                            bundle: Optional[ModelBundle] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score many soil samples in one pass
+        
+        Args:
+            features: Array of shape (rows, 7) in FEATURES order
+            n: Number of top predictions per row
+            bundle: Model bundle to score with, defaults to the current one
+        
+        Returns:
+            Tuple of (class column indices, probabilities), both of shape (rows, n) and
+            sorted by descending probability; map indices with the bundle's class_labels
+        """
+        probabilities = self.predict_proba_batch(features, bundle)
+        n = max(1, min(n, probabilities.shape[1]))
+        
+        # Partial sort: only the n best columns of each row are ordered
+        top = np.argpartition(-probabilities, n - 1, axis=1)[:, :n]
+        top_probabilities = np.take_along_axis(probabilities, top, axis=1)
+        order = np.argsort(-top_probabilities, axis=1, kind='stable')
+        return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_probabilities, order, axis=1)
+    
+    def sensitivity_grid(self, base: Dict[str, float], ranges: Dict[str, Tuple[float, float, int]],
+                         crops: Optional[List[str]] = None, target_confidence: float = 50.0,
+                         top_n: int = 3) -> Dict:
+        """
+        What-if analysis: score a grid of inputs around a soil profile
+        
+        The grid over the varied features is built as one array (with the base profile
+        as its first row) and scored in a single predict_proba pass. For each crop the
+        cheapest grid point reaching the target confidence is reported, where the cost
+        of a change is its size in scaled units (a fraction of the feature's range in
+        the training data) summed over the varied features.
+        
+        Args:
+            base: Soil profile, one value per FEATURES name
+            ranges: Varied features, name -> (min, max, steps)
+            crops: Crop names or aliases to report, defaults to the top_n crops at the base
+            target_confidence: Confidence in percent a crop should reach
+            top_n: Crops reported when none are given
+        
+        Returns:
+            Dictionary with the varied features, their axes and per-crop base confidence,
+            suitability surface (confidence in percent, one axis per varied feature) and
+            minimal change
+        
+        Raises:
+            ValueError: If a feature or crop is unknown
+        """
+        unknown = [name for name in ranges if name not in self.FEATURES]
+        if unknown:
+            raise ValueError(f"Unknown features: {', '.join(unknown)}")
+        
+        bundle = self.bundle
+        varied = [self.FEATURES.index(name) for name in self.FEATURES if name in ranges]
+        names = [self.FEATURES[column] for column in varied]
+        axes = [np.linspace(*ranges[name][:2], int(ranges[name][2])) for name in names]
+        shape = tuple(len(axis) for axis in axes)
+        
+        base_row = np.array([base[name] for name in self.FEATURES], dtype=np.float64)
+        grid = np.tile(base_row, (int(np.prod(shape)) + 1, 1))
+        for column, values in zip(varied, np.meshgrid(*axes, indexing='ij')):
+            grid[1:, column] = values.ravel()
+        
+        probabilities = self.predict_proba_batch(grid, bundle)
+        base_probabilities, grid_probabilities = probabilities[0], probabilities[1:]
+        
+        if crops:
+            columns = []
+            for crop in crops:
+                crop_id = self.catalog.resolve(crop) or crop.lower()
+                matches = np.flatnonzero(bundle.class_labels == crop_id)
+                if len(matches) == 0:
+                    raise ValueError(f"Unknown crop: {crop}")
+                columns.append(int(matches[0]))
+            # Aliases of one crop are reported once
+            columns = list(dict.fromkeys(columns))
+        else:
+            columns = np.argsort(-base_probabilities, kind='stable')[:max(1, top_n)].tolist()
+        
+        # Change cost in scaled units, so kg/ha of nutrients and mm of rainfall compare
+        deltas = grid[1:, varied] - base_row[varied]
+        unit = np.asarray(bundle.scaler.scale_)[varied] if isinstance(bundle.scaler, MinMaxScaler) else 1.0
+        costs = np.abs(deltas * unit).sum(axis=1)
+        target = target_confidence / 100
+        
+        results = []
+        for column in columns:
+            confidence = grid_probabilities[:, column]
+            minimal_change = None
+            if base_probabilities[column] >= target:
+                minimal_change = {
+                    'changes': {name: 0.0 for name in names},
+                    'values': {name: float(base_row[index]) for name, index in zip(names, varied)},
+                    'confidence': round(float(base_probabilities[column] * 100), 2),
+                    'cost': 0.0
+                }
+            else:
+                reaching = np.flatnonzero(confidence >= target)
+                if len(reaching):
+                    # Cheapest point first, the more confident one on ties
+                    point = reaching[np.lexsort((-confidence[reaching], costs[reaching]))[0]]
+                    minimal_change = {
+                        'changes': {name: round(float(delta), 4) for name, delta in zip(names, deltas[point])},
+                        'values': {name: float(grid[point + 1, index]) for name, index in zip(names, varied)},
+                        'confidence': round(float(confidence[point] * 100), 2),
+                        'cost': round(float(costs[point]), 4)
+                    }
+            
+            results.append({
+                'crop': self.catalog.display_name(bundle.class_labels[column]),
+                'base_confidence': round(float(base_probabilities[column] * 100), 2),
+                'surface': np.round(confidence * 100, 2).reshape(shape).tolist(),
+                'minimal_change': minimal_change
+            })
+        
+        return {
+            'features': names,
+            'axes': {name: np.round(axis, 6).tolist() for name, axis in zip(names, axes)},
+            'grid_points': int(np.prod(shape)),
+            'target_confidence': target_confidence,
+            'model_version': bundle.version,
+            'crops': results
+        }
     
     def _get_dummy_predictions(self):
         """Return dummy predictions for testing"""
@@ -279,210 +614,35 @@ class CropRecommendationService:
         Get additional details for a crop recommendation
         
         Args:
-            crop_name: Name of the crop
+            crop_name: Name or alias of the crop
         
         Returns:
             Dictionary with crop details including expected yield, profit potential, etc.
         """
-        # Crop-specific details based on typical Indian agriculture values
-        crop_details = {
-            'apple': {
-                'expected_yield': 180,
-                'profit_potential': 'High',
-                'market_demand': 'Medium',
-                'season': 'Year-round (Himalayan regions)',
-                'water_requirement': 'Moderate',
-                'description': 'Premium fruit crop, temperate climate'
-            },
-            'banana': {
-                'expected_yield': 400,
-                'profit_potential': 'High',
-                'market_demand': 'High',
-                'season': 'Year-round',
-                'water_requirement': 'High',
-                'description': 'Tropical fruit, very popular, high yield'
-            },
-            'blackgram': {
-                'expected_yield': 10,
-                'profit_potential': 'Medium',
-                'market_demand': 'Medium',
-                'season': 'Kharif',
-                'water_requirement': 'Low',
-                'description': 'Protein-rich pulse, good for soil health'
-            },
-            'chickpea': {
-                'expected_yield': 15,
-                'profit_potential': 'Medium',
-                'market_demand': 'High',
-                'season': 'Rabi',
-                'water_requirement': 'Low',
-                'description': 'High protein pulse, popular in India'
-            },
-            'coconut': {
-                'expected_yield': 80,
-                'profit_potential': 'Medium',
-                'market_demand': 'Medium',
-                'season': 'Year-round (Coastal)',
-                'water_requirement': 'Moderate',
-                'description': 'Multi-purpose crop, coastal regions'
-            },
-            'coffee': {
-                'expected_yield': 8,
-                'profit_potential': 'High',
-                'market_demand': 'High',
-                'season': 'Year-round (Hill stations)',
-                'water_requirement': 'Moderate',
-                'description': 'Premium cash crop, hill cultivation'
-            },
-            'cotton': {
-                'expected_yield': 5,
-                'profit_potential': 'Medium',
-                'market_demand': 'High',
-                'season': 'Kharif',
-                'water_requirement': 'Moderate',
-                'description': 'Important cash crop, high demand'
-            },
-            'grapes': {
-                'expected_yield': 45,
-                'profit_potential': 'High',
-                'market_demand': 'High',
-                'season': 'Year-round',
-                'water_requirement': 'Moderate',
-                'description': 'Premium fruit, excellent market value'
-            },
-            'jute': {
-                'expected_yield': 25,
-                'profit_potential': 'Low',
-                'market_demand': 'Low',
-                'season': 'Kharif',
-                'water_requirement': 'High',
-                'description': 'Fiber crop, traditional cultivation'
-            },
-            'kidneybeans': {
-                'expected_yield': 18,
-                'profit_potential': 'Medium',
-                'market_demand': 'Medium',
-                'season': 'Year-round',
-                'water_requirement': 'Moderate',
-                'description': 'Protein-rich legume, versatile use'
-            },
-            'lentil': {
-                'expected_yield': 12,
-                'profit_potential': 'Medium',
-                'market_demand': 'High',
-                'season': 'Rabi',
-                'water_requirement': 'Low',
-                'description': 'Essential pulse, staple food'
-            },
-            'maize': {
-                'expected_yield': 35,
-                'profit_potential': 'High',
-                'market_demand': 'High',
-                'season': 'Kharif/Rabi',
-                'water_requirement': 'Moderate',
-                'description': 'Staple cereal, versatile uses'
-            },
-            'mango': {
-                'expected_yield': 150,
-                'profit_potential': 'High',
-                'market_demand': 'High',
-                'season': 'Kharif (March-July)',
-                'water_requirement': 'Moderate',
-                'description': 'King of fruits, high commercial value'
-            },
-            'mothbeans': {
-                'expected_yield': 8,
-                'profit_potential': 'Low',
-                'market_demand': 'Low',
-                'season': 'Kharif',
-                'water_requirement': 'Low',
-                'description': 'Minor pulse, drought resistant'
-            },
-            'mungbean': {
-                'expected_yield': 15,
-                'profit_potential': 'Medium',
-                'market_demand': 'Medium',
-                'season': 'Kharif',
-                'water_requirement': 'Low',
-                'description': 'Quick-growing pulse, crop rotation'
-            },
-            'muskmelon': {
-                'expected_yield': 100,
-                'profit_potential': 'Medium',
-                'market_demand': 'Medium',
-                'season': 'Kharif',
-                'water_requirement': 'Moderate',
-                'description': 'Summer fruit, good market price'
-            },
-            'orange': {
-                'expected_yield': 100,
-                'profit_potential': 'Medium',
-                'market_demand': 'Medium',
-                'season': 'Year-round',
-                'water_requirement': 'Moderate',
-                'description': 'Citrus fruit, rich in vitamin C'
-            },
-            'papaya': {
-                'expected_yield': 200,
-                'profit_potential': 'Medium',
-                'market_demand': 'Medium',
-                'season': 'Year-round',
-                'water_requirement': 'Moderate',
-                'description': 'Tropical fruit, year-round harvest'
-            },
-            'pigeonpeas': {
-                'expected_yield': 20,
-                'profit_potential': 'Medium',
-                'market_demand': 'Medium',
-                'season': 'Kharif',
-                'water_requirement': 'Low',
-                'description': 'Important pulse, dal production'
-            },
-            'pomegranate': {
-                'expected_yield': 80,
-                'profit_potential': 'High',
-                'market_demand': 'Medium',
-                'season': 'Year-round',
-                'water_requirement': 'Moderate',
-                'description': 'Superfruit, medicinal properties'
-            },
-            'rice': {
-                'expected_yield': 50,
-                'profit_potential': 'Medium',
-                'market_demand': 'Very High',
-                'season': 'Kharif',
-                'water_requirement': 'Very High',
-                'description': 'Staple food, highest demand in India'
-            },
-            'watermelon': {
-                'expected_yield': 250,
-                'profit_potential': 'Medium',
-                'market_demand': 'Medium',
-                'season': 'Kharif',
-                'water_requirement': 'High',
-                'description': 'Summer fruit, good yield per acre'
-            }
-        }
-        
-        return crop_details.get(crop_name.lower(), {
-            'expected_yield': 20,
-            'profit_potential': 'Medium',
-            'market_demand': 'Medium',
-            'season': 'Year-round',
-            'water_requirement': 'Moderate',
-            'description': 'Good crop for general cultivation'
-        })
+        # Copy, so callers never mutate the shared catalog entry
+        return dict(self.catalog.get_details(crop_name))
+    
+    def warm_up(self):
+        """Run a typical soil sample through the model so the first request is not slower"""
+        self.predict_top_n(N=90, P=42, K=43, temperature=21.0, humidity=82.0, ph=6.5, rainfall=203.0)
+        logger.info("Crop recommendation model warmed up")
     
     def get_model_info(self) -> Dict:
         """
         Get model information
         """
+        metrics = (self.bundle.manifest or {}).get('metrics') or {}
         return {
-            'model_type': 'GradientBoostingClassifier',
-            'accuracy': '~99.6%',
+            'model_type': type(self.model).__name__,
+            'accuracy': f"{metrics['test_accuracy'] * 100:.1f}%" if 'test_accuracy' in metrics else '~99.6%',
             'total_classes': len(self.reverse_targets) if self.reverse_targets else 22,
             'features': ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall'],
-            'input_shape': '(1, 7)'
+            'input_shape': '(1, 7)',
+            'model_version': self.model_version,
+            'artifact': self.bundle.get_info(),
+            'inference_kernel': self.kernel.get_info() if self.kernel is not None else None,
+            'neighbor_index': self.bundle.neighbors.get_info() if self.bundle.neighbors is not None else None,
+            'kernel_max_rows': self.kernel_max_rows
         }
     
     def get_all_crops(self) -> List[str]:
@@ -0,0 +1,363 @@
+"""
+Efficiency History
+Per-field, per-season field efficiency scores with vectorized rolling-window trend analytics
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Scores stored per field and season, in blob order
+HISTORY_METRICS = ('overall_efficiency', 'water_efficiency', 'fertilizer_efficiency', 'yield_efficiency',
+                   'cost_efficiency', 'labor_efficiency', 'energy_efficiency')
+SCORE_DTYPE = np.dtype('<f4')
+
+# Cropping seasons in calendar order within an agricultural year
+SEASONS = ('kharif', 'rabi', 'zaid')
+_SEASON_LABEL = re.compile(r"^\s*(\d{4})(?:\s*[-_/ ]\s*([a-z]+))?\s*$", re.IGNORECASE)
+
+# Largest number of field IDs bound in one SQL statement
+_QUERY_CHUNK = 900
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS efficiency_history (
+    field_id TEXT NOT NULL,
+    season_index INTEGER NOT NULL,
+    season TEXT NOT NULL,
+    scores BLOB NOT NULL,
+    recorded_at REAL NOT NULL,
+    PRIMARY KEY (field_id, season_index)
+)
+"""
+
+
+def parse_season(label: str) -> Tuple[int, str]:
+    """
+    Position of a season label on the season axis
+
+    Args:
+        label: 'YYYY' for a field with one season a year, or 'YYYY-<season>' with a
+               season of SEASONS (e.g. '2024-kharif', '2024 Rabi')
+
+    Returns:
+        Tuple of (season index, normalized label); consecutive seasons have
+        consecutive indices and a bare year shares the index of its first season
+
+    Raises:
+        ValueError: If the label cannot be parsed
+    """
+    match = _SEASON_LABEL.match(label or "")
+    if match is None:
+        raise ValueError(f"Invalid season '{label}', expected YYYY or YYYY-<{'|'.join(SEASONS)}>")
+    year, season = int(match.group(1)), (match.group(2) or "").lower()
+    if not season:
+        return year * len(SEASONS), str(year)
+    if season not in SEASONS:
+        raise ValueError(f"Unknown season '{season}', expected one of {', '.join(SEASONS)}")
+    return year * len(SEASONS) + SEASONS.index(season), f"{year}-{season}"
+
+
+def season_label(index: int) -> str:
+    """Normalized label of a season index (see parse_season)"""
+    year, position = divmod(int(index), len(SEASONS))
+    return f"{year}-{SEASONS[position]}"
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Trailing mean over the last `window` seasons of every row, ignoring missing seasons
+
+    Computed for all rows and seasons at once from cumulative sums.
+
+    Args:
+        values: Array of shape (rows, seasons), NaN where missing
+        window: Seasons per window
+
+    Returns:
+        Array shaped like values, NaN where the window has no value
+    """
+    present = ~np.isnan(values)
+    zeros = np.zeros((len(values), 1))
+    sums = np.concatenate([zeros, np.cumsum(np.where(present, values, 0.0), axis=1)], axis=1)
+    counts = np.concatenate([zeros, np.cumsum(present, axis=1)], axis=1)
+
+    end = np.arange(1, values.shape[1] + 1)
+    start = np.clip(end - window, 0, None)
+    window_sums, window_counts = sums[:, end] - sums[:, start], counts[:, end] - counts[:, start]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(window_counts > 0, window_sums / window_counts, np.nan)
+
+
+def window_zscores(values: np.ndarray, window: int, min_points: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    How far each season lies from the `window` seasons before it
+
+    The preceding windows of all rows and seasons are accumulated one lag at a time
+    (`window` whole-matrix passes), with a two-pass mean and standard deviation that
+    stays stable for flat histories.
+
+    Args:
+        values: Array of shape (rows, seasons), NaN where missing
+        window: Preceding seasons the expectation is computed from
+        min_points: Preceding values needed for a z-score
+
+    Returns:
+        Tuple of (z-scores, expected values), shaped like values; NaN where there is
+        no value, too little history or no variation in it
+    """
+    rows, seasons = values.shape
+    padded = np.concatenate([np.full((rows, window), np.nan), values], axis=1)
+    # lagged(k) holds, for every season t, the value of season t - k
+    lagged = lambda lag: padded[:, window - lag:window - lag + seasons]
+
+    sums, counts = np.zeros(values.shape), np.zeros(values.shape)
+    for lag in range(1, window + 1):
+        previous = lagged(lag)
+        present = ~np.isnan(previous)
+        sums += np.where(present, previous, 0.0)
+        counts += present
+    with np.errstate(invalid='ignore', divide='ignore'):
+        expected = sums / counts
+        squares = np.zeros(values.shape)
+        for lag in range(1, window + 1):
+            deviations = lagged(lag) - expected
+            squares += np.where(np.isnan(deviations), 0.0, deviations * deviations)
+        std = np.sqrt(squares / (counts - 1))
+        valid = (counts >= max(2, min_points)) & (std > 1e-9)
+        zscores = np.where(valid, (values - expected) / std, np.nan)
+    return zscores, np.where(counts > 0, expected, np.nan)
+
+
+def recorded_window_stats(values: np.ndarray, window: int,
+                          min_points: int = 3) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Rolling means and z-scores over each row's last `window` recorded seasons
+
+    Each row's recorded seasons are packed to the front (in season order), the window
+    operations run on the packed matrix and the results are put back on the season
+    axis. A field recorded once a year thus has `window` years in its window, and
+    one recording three seasons a year `window` seasons.
+
+    Args:
+        values: Array of shape (rows, seasons), NaN where missing
+        window: Recorded seasons per rolling mean and anomaly baseline
+        min_points: Preceding values needed for a z-score
+
+    Returns:
+        Tuple of (rolling means, z-scores, expected values), shaped like values and
+        NaN where a row has no record
+    """
+    order = np.argsort(np.isnan(values), axis=1, kind='stable')
+    packed = np.take_along_axis(values, order, axis=1)
+    recorded = ~np.isnan(packed)
+    zscores, expected = window_zscores(packed, window, min_points)
+    results = []
+    for result in (rolling_mean(packed, window), zscores, expected):
+        unpacked = np.full(values.shape, np.nan)
+        np.put_along_axis(unpacked, order, np.where(recorded, result, np.nan), axis=1)
+        results.append(unpacked)
+    return tuple(results)
+
+
+def trend_slopes(values: np.ndarray, positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Least-squares slope of every row against the season positions, ignoring missing seasons
+
+    Args:
+        values: Array of shape (rows, seasons), NaN where missing
+        positions: Position of each season column (e.g. in years)
+
+    Returns:
+        Tuple of (slopes, points used per row); NaN slope for rows with fewer than two points
+    """
+    present = ~np.isnan(values)
+    points = present.sum(axis=1)
+    x = np.where(present, positions[np.newaxis, :], 0.0)
+    y = np.where(present, values, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x_mean = x.sum(axis=1) / points
+        y_mean = y.sum(axis=1) / points
+        dx = np.where(present, positions[np.newaxis, :] - x_mean[:, np.newaxis], 0.0)
+        dy = np.where(present, values - y_mean[:, np.newaxis], 0.0)
+        sxx = (dx * dx).sum(axis=1)
+        slopes = np.where((points >= 2) & (sxx > 0), (dx * dy).sum(axis=1) / sxx, np.nan)
+    return slopes, points
+
+
+class EfficiencyHistory:
+    """
+    Field efficiency scores per field and season, stored in SQLite
+
+    Each (field, season) is one row whose scores are a 28-byte float32 blob in
+    HISTORY_METRICS order. Queries load the requested fields into a dense
+    (fields, seasons) matrix per metric, NaN for seasons a field did not report,
+    and every analytic is a whole-matrix window operation.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialize the history, creating the database if needed
+
+        Args:
+            path: SQLite file (env FIELD_HISTORY_DB, default var/field_history.db)
+        """
+        self.path = path or os.getenv("FIELD_HISTORY_DB") or os.path.join(BASE_DIR, "var", "field_history.db")
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(SCHEMA)
+        self._connection.commit()
+
+    def record(self, field_ids: Sequence[str], seasons: Sequence[str], scores: np.ndarray) -> int:
+        """
+        Store or replace the scores of fields for a season
+
+        A bare year and the first season of that year ('2024' and '2024-kharif')
+        share a season index, so one field cannot have both.
+
+        Args:
+            field_ids: Field ID per row
+            seasons: Season label per row (see parse_season)
+            scores: Array of shape (rows, len(HISTORY_METRICS))
+
+        Returns:
+            Number of rows written
+
+        Raises:
+            ValueError: If a season label is invalid, or collides with another label
+                        of the same field and season index
+        """
+        parsed: Dict[str, Tuple[int, str]] = {}
+        for season in seasons:
+            if season not in parsed:
+                parsed[season] = parse_season(season)
+        blobs = np.ascontiguousarray(scores, dtype=SCORE_DTYPE).reshape(len(field_ids), len(HISTORY_METRICS))
+
+        recorded_at = time.time()
+        rows = [
+            (str(field_id), *parsed[season], blob.tobytes(), recorded_at)
+            for field_id, season, blob in zip(field_ids, seasons, blobs)
+        ]
+        labels: Dict[Tuple[str, int], str] = {}
+        for field_id, season_index, label, _, _ in rows:
+            self._check_label(labels, field_id, season_index, label)
+
+        with self._lock, self._connection:
+            stored = self._select("field_id, season_index, season",
+                                  list(dict.fromkeys(field_id for field_id, _ in labels)),
+                                  sorted({season_index for _, season_index in labels}))
+            for field_id, season_index, label in stored:
+                new_label = labels.get((field_id, season_index), label)
+                if new_label != label:
+                    raise ValueError(f"Field '{field_id}': season '{new_label}' collides with recorded "
+                                     f"'{label}'; record a field either by year or by season")
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO efficiency_history (field_id, season_index, season, scores, recorded_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    @staticmethod
+    def _check_label(labels: Dict[Tuple[str, int], str], field_id: str, season_index: int, label: str):
+        """Remember the label of a field's season, rejecting a different label for the same index"""
+        known = labels.setdefault((field_id, season_index), label)
+        if known != label:
+            raise ValueError(f"Field '{field_id}': season '{label}' collides with '{known}'; "
+                             f"record a field either by year or by season")
+
+    def _select(self, columns: str, field_ids: Optional[Sequence[str]],
+                season_indices: Optional[Sequence[int]] = None) -> List[Tuple]:
+        """Rows of some fields (all when None), optionally of some seasons; the caller holds the lock"""
+        query = f"SELECT {columns} FROM efficiency_history"
+        if field_ids is None:
+            return self._connection.execute(query).fetchall()
+        season_filter, season_args = "", []
+        if season_indices is not None and len(season_indices) <= _QUERY_CHUNK:
+            season_filter = f" AND season_index IN ({', '.join('?' * len(season_indices))})"
+            season_args = list(season_indices)
+        rows = []
+        field_ids = list(dict.fromkeys(str(field_id) for field_id in field_ids))
+        for start in range(0, len(field_ids), _QUERY_CHUNK):
+            chunk = field_ids[start:start + _QUERY_CHUNK]
+            rows.extend(self._connection.execute(
+                f"{query} WHERE field_id IN ({', '.join('?' * len(chunk))}){season_filter}", chunk + season_args
+            ).fetchall())
+        return rows
+
+    def _fetch(self, field_ids: Optional[Sequence[str]]) -> List[Tuple]:
+        """Rows of some fields (all when None)"""
+        with self._lock:
+            return self._select("field_id, season_index, season, scores", field_ids)
+
+    def load(self, field_ids: Optional[Sequence[str]] = None,
+             metrics: Sequence[str] = HISTORY_METRICS) -> Dict:
+        """
+        Load history as dense matrices
+
+        Args:
+            field_ids: Fields to load, all when None
+            metrics: Metrics to return
+
+        Returns:
+            Dictionary with 'field_ids', 'seasons' (labels of every season from the
+            first recorded to the last), 'season_index' and a float64 (fields, seasons)
+            matrix per metric under 'values', NaN where a field has no record
+        """
+        rows = self._fetch(field_ids)
+        if not rows:
+            return {'field_ids': [], 'seasons': [], 'season_index': np.zeros(0, dtype=np.int64),
+                    'values': {metric: np.zeros((0, 0)) for metric in metrics}}
+
+        index: Dict[str, int] = {}
+        field_codes = np.fromiter((index.setdefault(row[0], len(index)) for row in rows),
+                                  dtype=np.intp, count=len(rows))
+        season_index = np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows))
+        # Every season from the first to the last, gaps included, so that a window of
+        # k columns is k seasons whichever fields are loaded together
+        first = int(season_index.min())
+        columns = np.arange(first, int(season_index.max()) + 1)
+        labels = {row[1]: row[2] for row in rows}
+        scores = np.frombuffer(b"".join(row[3] for row in rows), dtype=SCORE_DTYPE).reshape(len(rows), -1)
+
+        values = {}
+        for metric in metrics:
+            matrix = np.full((len(index), len(columns)), np.nan)
+            matrix[field_codes, season_index - first] = scores[:, HISTORY_METRICS.index(metric)]
+            values[metric] = matrix
+        return {
+            'field_ids': list(index),
+            'seasons': [labels.get(season) or season_label(season) for season in columns.tolist()],
+            'season_index': columns,
+            'values': values
+        }
+
+    def get_stats(self) -> Dict:
+        """Get history size"""
+        with self._lock:
+            rows, fields, seasons = self._connection.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT field_id), COUNT(DISTINCT season_index) FROM efficiency_history"
+            ).fetchone()
+        return {
+            'path': self.path,
+            'records': rows,
+            'fields': fields,
+            'seasons': seasons,
+            'record_bytes': SCORE_DTYPE.itemsize * len(HISTORY_METRICS)
+        }
+
+    def close(self):
+        """Close the database"""
+        self._connection.close()
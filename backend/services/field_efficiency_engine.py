@@ -0,0 +1,415 @@
+"""
+Field Efficiency Engine
+Columnar, vectorized FieldEfficiencyService scoring for whole farm portfolios
+"""
+
+from collections.abc import Mapping
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Crop standards used by the scores, in table column order
+STANDARD_KEYS = ('water', 'fertilizer_n', 'fertilizer_p', 'fertilizer_k', 'ideal_yield')
+
+
+def _builtin_min(limit: float, values: np.ndarray) -> np.ndarray:
+    """Elementwise builtin min(limit, value), which keeps limit for NaN values"""
+    return np.where(values < limit, values, limit)
+
+
+def _builtin_max(limit: float, values: np.ndarray) -> np.ndarray:
+    """Elementwise builtin max(limit, value), which keeps limit for NaN values"""
+    return np.where(values > limit, values, limit)
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray, positive: np.ndarray, fallback: float) -> np.ndarray:
+    """numerator / denominator where positive, fallback elsewhere (without division warnings)"""
+    out = np.full(np.broadcast(numerator, denominator).shape, fallback, dtype=np.float64)
+    np.divide(numerator, denominator, out=out, where=positive)
+    return out
+
+
+def factorize(values: Sequence) -> Tuple[np.ndarray, List]:
+    """
+    Encode values as codes into their distinct values
+
+    Args:
+        values: Hashable values
+
+    Returns:
+        Tuple of (code per value, distinct values in first-seen order)
+    """
+    index: Dict = {}
+    codes = np.fromiter((index.setdefault(value, len(index)) for value in values), dtype=np.intp, count=len(values))
+    return codes, list(index)
+
+
+def ordered_slice(values: np.ndarray, start: int, stop: int, descending: bool = True) -> np.ndarray:
+    """
+    Positions start..stop of values in sorted order, without sorting all of them
+
+    The order is total (ties by position), so consecutive slices never overlap or
+    skip an element. Only the first `stop` elements are selected with a partition
+    and sorted, which keeps small pages and top-k lists linear in len(values).
+
+    Args:
+        values: Values to order
+        start: First position of the slice
+        stop: Position after the last one
+        descending: Largest first
+
+    Returns:
+        Indices into values
+    """
+    n = len(values)
+    stop = min(stop, n)
+    if start >= stop:
+        return np.zeros(0, dtype=np.intp)
+    keys = -values if descending else values
+    if stop == n:
+        return np.lexsort((np.arange(n), keys))[start:stop]
+
+    kth = np.partition(keys, stop - 1)[stop - 1]
+    before = np.flatnonzero(keys < kth)
+    ties = np.flatnonzero(keys == kth)[:stop - len(before)]
+    chosen = np.concatenate([before, ties])
+    return chosen[np.lexsort((chosen, keys[chosen]))][start:stop]
+
+
+def group_stats(codes: np.ndarray, groups: int, values: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Per-group count, mean, min and max in one pass over the values
+
+    Args:
+        codes: Group index per value
+        groups: Number of groups
+        values: Values to aggregate
+
+    Returns:
+        Dictionary of arrays of length groups
+    """
+    counts = np.bincount(codes, minlength=groups)
+    sums = np.bincount(codes, weights=values, minlength=groups)
+    minimums = np.full(groups, np.inf)
+    maximums = np.full(groups, -np.inf)
+    np.minimum.at(minimums, codes, values)
+    np.maximum.at(maximums, codes, values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+    return {'count': counts, 'mean': means, 'min': minimums, 'max': maximums}
+
+
+class FieldColumns:
+    """
+    Fields as NumPy columns
+
+    Each numeric input is a float64 column with NaN where the field did not report
+    it, plus a `present` mask, so a reported NaN and a missing value stay distinct
+    like None and NaN do in the dict-based path.
+    """
+
+    INPUTS = ('actual_yield', 'water_used_liters', 'fertilizer_n_kg', 'fertilizer_p_kg', 'fertilizer_k_kg',
+              'cost_per_acre', 'labor_hours', 'fuel_liters')
+
+    __slots__ = ('names', 'crop_types', 'area_acres', 'values', 'present', 'regions')
+
+    def __init__(self, names: List, crop_types: List, area_acres: np.ndarray,
+                 values: Dict[str, np.ndarray], present: Dict[str, np.ndarray],
+                 regions: Optional[List] = None):
+        """
+        Initialize the columns
+
+        Args:
+            names: Field name per field
+            crop_types: Crop type per field
+            area_acres: Area per field (NaN when missing)
+            values: One float64 column per INPUTS name
+            present: One bool column per INPUTS name, False where the input is missing
+            regions: Region per field (None when not given)
+        """
+        self.names = names
+        self.crop_types = crop_types
+        self.area_acres = area_acres
+        self.values = values
+        self.present = present
+        self.regions = regions if regions is not None else [None] * len(names)
+
+    @classmethod
+    def from_records(cls, records: Sequence) -> "FieldColumns":
+        """
+        Load fields given as dicts or as request models
+
+        Args:
+            records: Field data dicts (keys as in FieldEfficiencyService.calculate_efficiency)
+                     or objects with the same attributes, such as FieldEfficiencyRequest
+
+        Returns:
+            FieldColumns
+        """
+        records = list(records)
+        if records and isinstance(records[0], Mapping):
+            get = lambda record, key, default=None: record.get(key, default)
+        else:
+            get = getattr
+
+        values, present = {}, {}
+        for key in cls.INPUTS:
+            raw = [get(record, key, None) for record in records]
+            present[key] = np.fromiter((value is not None for value in raw), dtype=bool, count=len(raw))
+            values[key] = np.array(raw, dtype=np.float64).reshape(len(raw))
+
+        return cls(
+            [get(record, 'name', 'Unknown') for record in records],
+            [get(record, 'crop_type', 'Unknown') for record in records],
+            np.array([get(record, 'area_acres', None) for record in records], dtype=np.float64).reshape(len(records)),
+            values,
+            present,
+            [get(record, 'region', None) for record in records]
+        )
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+class FieldScores:
+    """
+    Scores of many fields, one array per metric
+
+    `scores` holds the unrounded component scores and 'overall_efficiency'; rounding
+    happens when results are materialized, with Python's round like the scalar path.
+    """
+
+    __slots__ = ('columns', 'scores', 'rating_codes', 'ratings', 'recommendation_codes',
+                 'recommendation_patterns', 'regional_avg')
+
+    def __init__(self, columns: FieldColumns, scores: Dict[str, np.ndarray], rating_codes: np.ndarray,
+                 ratings: Sequence[str], recommendation_codes: np.ndarray,
+                 recommendation_patterns: List[List[str]], regional_avg: np.ndarray):
+        """
+        Initialize the scores
+
+        Args:
+            columns: Scored fields
+            scores: Unrounded score arrays by metric name
+            rating_codes: Index into ratings per field
+            ratings: Rating labels
+            recommendation_codes: Index into recommendation_patterns per field
+            recommendation_patterns: Distinct recommendation lists
+            regional_avg: Regional overall efficiency per field
+        """
+        self.columns = columns
+        self.scores = scores
+        self.rating_codes = rating_codes
+        self.ratings = ratings
+        self.recommendation_codes = recommendation_codes
+        self.recommendation_patterns = recommendation_patterns
+        self.regional_avg = regional_avg
+
+    def __len__(self) -> int:
+        return len(self.rating_codes)
+
+    def rounded(self, metric: str) -> List[float]:
+        """Scores of a metric rounded to 2 decimals, as Python floats"""
+        return [round(value, 2) for value in self.scores[metric].tolist()]
+
+    def rating(self, index: int) -> str:
+        """Rating of one field"""
+        return self.ratings[self.rating_codes[index]]
+
+    def recommendations(self, index: int) -> List[str]:
+        """Recommendations of one field"""
+        return list(self.recommendation_patterns[self.recommendation_codes[index]])
+
+    def to_dicts(self) -> List[Dict]:
+        """
+        Per-field results
+
+        Returns:
+            One dictionary per field, as returned by FieldEfficiencyService.calculate_efficiency
+        """
+        metrics = list(self.scores)
+        rounded = [self.rounded(metric) for metric in metrics]
+        regional_avg = [round(value, 2) for value in self.regional_avg.tolist()]
+        improvement = [round(value, 2) for value in (self.scores['overall_efficiency'] - self.regional_avg).tolist()]
+        ratings = [self.ratings[code] for code in self.rating_codes.tolist()]
+        patterns = self.recommendation_patterns
+
+        results = []
+        for index, codes in enumerate(self.recommendation_codes.tolist()):
+            result = {metric: values[index] for metric, values in zip(metrics, rounded)}
+            result['rating'] = ratings[index]
+            result['regional_avg'] = regional_avg[index]
+            result['improvement_potential'] = improvement[index]
+            result['recommendations'] = list(patterns[codes])
+            results.append(result)
+        return results
+
+
+class FieldEfficiencyEngine:
+    """
+    Vectorized scoring with the standards, constants and rules of a FieldEfficiencyService
+
+    Every formula of the scalar `_calculate_*` helpers is applied to whole columns,
+    with the same operation order and the builtin min/max semantics, so each field
+    gets bit-for-bit the score calculate_efficiency gives it. Crop standards are
+    looked up once per distinct crop, and recommendation lists once per distinct
+    combination of applicable rules.
+    """
+
+    def __init__(self, service):
+        """
+        Initialize the engine
+
+        Args:
+            service: FieldEfficiencyService whose catalog, constants and rules are used
+        """
+        self.service = service
+
+    def _standards(self, crop_types: List) -> Dict[str, np.ndarray]:
+        """Crop standards per field, from one catalog lookup per distinct crop"""
+        codes, crops = factorize(crop_types)
+        table = np.array([[standards[key] for key in STANDARD_KEYS]
+                          for standards in map(self.service.catalog.get_standards, crops)],
+                         dtype=np.float64).reshape(len(crops), len(STANDARD_KEYS))
+        rows = table[codes]
+        return {key: rows[:, column] for column, key in enumerate(STANDARD_KEYS)}
+
+    def score(self, columns: FieldColumns, baselines: Optional[Dict[str, np.ndarray]] = None) -> FieldScores:
+        """
+        Score every field
+
+        Args:
+            columns: Fields to score
+            baselines: Per-field reference inputs ('cost_per_acre', 'labor_hours',
+                       'fuel_liters') and regional 'overall_efficiency', defaulting
+                       to the service's built-in values
+
+        Returns:
+            FieldScores
+        """
+        service = self.service
+        defaults = service.DEFAULT_SCORES
+        values, present = columns.values, columns.present
+        standards = self._standards(columns.crop_types)
+        acres_per_hectare = service.ACRES_PER_HECTARE
+        baselines = baselines or {}
+
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            components = {
+                'water_efficiency': self._water(values, present, standards, acres_per_hectare, defaults),
+                'fertilizer_efficiency': self._fertilizer(values, present, standards, acres_per_hectare, defaults),
+                'yield_efficiency': self._capped_ratio(
+                    values['actual_yield'], standards['ideal_yield'], present['actual_yield'],
+                    120, defaults['yield_efficiency'], inverse=False
+                ),
+                'cost_efficiency': self._capped_ratio(
+                    values['cost_per_acre'], baselines.get('cost_per_acre', service.REGIONAL_COST), present['cost_per_acre'],
+                    150, defaults['cost_efficiency']
+                ),
+                'labor_efficiency': self._capped_ratio(
+                    values['labor_hours'], baselines.get('labor_hours', service.STANDARD_LABOR_HOURS), present['labor_hours'],
+                    120, defaults['labor_efficiency']
+                ),
+                'energy_efficiency': self._capped_ratio(
+                    values['fuel_liters'], baselines.get('fuel_liters', service.STANDARD_FUEL_LITERS), present['fuel_liters'],
+                    120, defaults['energy_efficiency']
+                )
+            }
+
+            # Same summation order as calculate_efficiency
+            overall = np.zeros(len(columns))
+            for name, weight in service.COMPONENT_WEIGHTS.items():
+                overall = overall + components[name] * weight
+
+        regional_avg = baselines.get('overall_efficiency')
+        if regional_avg is None:
+            regional_avg = np.full(len(columns), service.REGIONAL_AVERAGES['overall_efficiency'])
+
+        rating_codes, ratings = self._ratings(overall)
+        recommendation_codes, patterns = self._recommendations(components)
+        scores = dict(overall_efficiency=overall, **components)
+        return FieldScores(columns, scores, rating_codes, ratings, recommendation_codes, patterns, regional_avg)
+
+    @staticmethod
+    def _water(values, present, standards, acres_per_hectare, defaults) -> np.ndarray:
+        """Vectorized _calculate_water_efficiency"""
+        water = values['water_used_liters']
+        ideal_water_liters = (standards['water'] / acres_per_hectare) * 10000
+        positive = water > 0
+        efficiency = np.where(positive, _builtin_min(100, _ratio(ideal_water_liters, water, positive, 0.0) * 100), 0)
+        return np.where(present['water_used_liters'], _builtin_max(0, efficiency), defaults['water_efficiency'])
+
+    @staticmethod
+    def _fertilizer(values, present, standards, acres_per_hectare, defaults) -> np.ndarray:
+        """Vectorized _calculate_fertilizer_efficiency"""
+        nutrient_scores = []
+        no_data = np.ones(len(values['fertilizer_n_kg']), dtype=bool)
+        for nutrient in ('n', 'p', 'k'):
+            # `value or 0`: missing inputs count as 0, reported NaN stays NaN
+            applied = np.where(present[f'fertilizer_{nutrient}_kg'], values[f'fertilizer_{nutrient}_kg'], 0.0)
+            no_data &= applied == 0
+            standard = standards[f'fertilizer_{nutrient}'] / acres_per_hectare
+            ratio = _ratio(standard, applied, applied > 0, 1.0)
+            nutrient_scores.append(np.where(
+                ratio <= 1,
+                _builtin_min(100, ratio * 100 * 1.2),
+                _builtin_min(100, (1 / ratio) * 100)
+            ))
+
+        efficiency = (nutrient_scores[0] + nutrient_scores[1] + nutrient_scores[2]) / 3
+        return np.where(no_data, defaults['fertilizer_efficiency'], _builtin_max(0, _builtin_min(100, efficiency)))
+
+    @staticmethod
+    def _capped_ratio(values: np.ndarray, reference, present: np.ndarray, cap: float, default: float,
+                      inverse: bool = True) -> np.ndarray:
+        """
+        Vectorized yield, cost, labor and energy efficiency
+
+        Args:
+            values: Reported input per field
+            reference: Standard (scalar or per field)
+            present: False where the input is missing
+            cap: Upper bound of the score
+            default: Score of fields without the input
+            inverse: Score reference / value (less is better) instead of value / reference
+
+        Returns:
+            Score per field
+        """
+        reference = np.broadcast_to(np.asarray(reference, dtype=np.float64), values.shape)
+        if inverse:
+            positive = values > 0
+            ratio = _ratio(reference, values, positive, 0.0)
+        else:
+            positive = reference > 0
+            ratio = _ratio(values, reference, positive, 0.0)
+        efficiency = np.where(positive, _builtin_min(cap, ratio * 100), 0)
+        return np.where(present, _builtin_max(0, efficiency), default)
+
+    def _ratings(self, overall: np.ndarray):
+        """Rating index per field, and the rating labels"""
+        ratings = [rating for _, rating in self.service.RATINGS] + [self.service.LOWEST_RATING]
+        codes = np.full(len(overall), len(ratings) - 1, dtype=np.intp)
+        # Lowest threshold first, so the best matching rating is written last
+        for code in range(len(self.service.RATINGS) - 1, -1, -1):
+            codes[overall >= self.service.RATINGS[code][0]] = code
+        return codes, ratings
+
+    def _recommendations(self, components: Dict[str, np.ndarray]):
+        """Recommendation pattern index per field, and the distinct recommendation lists"""
+        rules = self.service.RECOMMENDATION_RULES
+        n = len(next(iter(components.values())))
+        applies = np.zeros(n, dtype=np.int64)
+        for bit, (component, lower, upper, _) in enumerate(rules):
+            scores = components[component]
+            applies |= ((lower <= scores) & (scores < upper)).astype(np.int64) << bit
+
+        masks, codes = np.unique(applies, return_inverse=True)
+        patterns = [
+            [message for bit, (_, _, _, message) in enumerate(rules) if mask >> bit & 1][:self.service.MAX_RECOMMENDATIONS]
+            for mask in masks.tolist()
+        ]
+        return codes.reshape(n), patterns
@@ -3,81 +3,45 @@ Field Efficiency Service
 Calculates field efficiency metrics using proven agricultural algorithms
 """
 
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Sequence, Union
 import logging
 
+import numpy as np
+
+from services.baseline_store import BaselineStore
+from services.crop_catalog import get_crop_catalog
+from services.efficiency_history import (
+    HISTORY_METRICS, SEASONS, EfficiencyHistory, recorded_window_stats, trend_slopes
+)
+from services.field_efficiency_engine import (
+    FieldColumns, FieldEfficiencyEngine, FieldScores, factorize, group_stats, ordered_slice
+)
+
 logger = logging.getLogger(__name__)
 
+def _rounded(value: float, digits: int = 2) -> Optional[float]:
+    """Rounded float, None for NaN"""
+    return None if np.isnan(value) else round(float(value), digits)
+
 class FieldEfficiencyService:
     """Service for calculating field efficiency metrics"""
     
-    # Crop-specific standards (water in mm/season, fertilizer in kg/hectare, ideal yield in q/acre)
-    CROP_STANDARDS = {
-        'Rice': {
-            'water': 1350,  # mm/season (average of 1200-1500)
-            'fertilizer_n': 120,  # kg/hectare
-            'fertilizer_p': 60,
-            'fertilizer_k': 40,
-            'ideal_yield': 45,  # quintals/acre
-            'growing_days': 120
-        },
-        'Wheat': {
-            'water': 500,  # mm/season (average of 400-600)
-            'fertilizer_n': 120,
-            'fertilizer_p': 60,
-            'fertilizer_k': 40,
-            'ideal_yield': 40,  # quintals/acre
-            'growing_days': 140
-        },
-        'Cotton': {
-            'water': 800,  # mm/season (average of 600-1000)
-            'fertilizer_n': 100,
-            'fertilizer_p': 50,
-            'fertilizer_k': 50,
-            'ideal_yield': 5,  # quintals/acre
-            'growing_days': 150
-        },
-        'Maize': {
-            'water': 650,  # mm/season (average of 500-800)
-            'fertilizer_n': 100,
-            'fertilizer_p': 50,
-            'fertilizer_k': 50,
-            'ideal_yield': 35,  # quintals/acre
-            'growing_days': 90
-        },
-        'Tomato': {
-            'water': 700,
-            'fertilizer_n': 100,
-            'fertilizer_p': 60,
-            'fertilizer_k': 120,
-            'ideal_yield': 30,
-            'growing_days': 90
-        },
-        'Potato': {
-            'water': 550,
-            'fertilizer_n': 120,
-            'fertilizer_p': 80,
-            'fertilizer_k': 150,
-            'ideal_yield': 25,
-            'growing_days': 100
-        },
-        'Sugarcane': {
-            'water': 1200,
-            'fertilizer_n': 150,
-            'fertilizer_p': 80,
-            'fertilizer_k': 100,
-            'ideal_yield': 60,
-            'growing_days': 365
-        },
-        'Soybean': {
-            'water': 600,
-            'fertilizer_n': 80,
-            'fertilizer_p': 60,
-            'fertilizer_k': 40,
-            'ideal_yield': 20,
-            'growing_days': 100
-        }
-    }
+    def __init__(self, baseline_store: Optional[BaselineStore] = None,
+                 history_store: Optional[EfficiencyHistory] = None):
+        """
+        Initialize the service with the shared crop catalog
+        
+        Args:
+            baseline_store: Regional baselines replacing the built-in averages and
+                            cost/labor/fuel standards where enough peers reported
+            history_store: Per-season field scores for trend analytics
+        """
+        # Crop-specific standards (water in mm/season, fertilizer in kg/hectare, ideal yield in q/acre)
+        self.catalog = get_crop_catalog()
+        self.baseline_store = baseline_store
+        self.history_store = history_store
+        # Vectorized scoring of many fields with the same standards and rules
+        self.engine = FieldEfficiencyEngine(self)
     
     # Regional averages
     REGIONAL_AVERAGES = {
@@ -90,6 +54,70 @@ class FieldEfficiencyService:
         'yield_per_cost': 71
     }
     
+    # Component weights of the overall efficiency, summed in this order
+    COMPONENT_WEIGHTS = {
+        'water_efficiency': 0.25,
+        'fertilizer_efficiency': 0.25,
+        'yield_efficiency': 0.20,
+        'cost_efficiency': 0.15,
+        'labor_efficiency': 0.10,
+        'energy_efficiency': 0.05
+    }
+    
+    # Component scores of fields that did not report the inputs
+    DEFAULT_SCORES = {
+        'water_efficiency': 87.0,
+        'fertilizer_efficiency': 85.0,
+        'yield_efficiency': 89.0,
+        'cost_efficiency': 92.0,
+        'labor_efficiency': 78.0,
+        'energy_efficiency': 82.0
+    }
+    
+    ACRES_PER_HECTARE = 2.471
+    REGIONAL_COST = 968 * 2.471  # Assuming ₹968/acre from field data
+    STANDARD_LABOR_HOURS = 45  # hours per acre
+    STANDARD_FUEL_LITERS = 15  # liters per acre
+    
+    # Lowest overall efficiency of each rating, best first
+    RATINGS = (
+        (90, "Excellent"),
+        (80, "Very Good"),
+        (70, "Good"),
+        (60, "Fair")
+    )
+    LOWEST_RATING = "Needs Improvement"
+    
+    # (component, lower bound, upper bound, message): a recommendation applies when
+    # lower <= score < upper; the first MAX_RECOMMENDATIONS that apply are returned
+    RECOMMENDATION_RULES = (
+        ('water_efficiency', float('-inf'), 70, "Water usage is inefficient. Consider installing drip irrigation or using soil moisture sensors."),
+        ('water_efficiency', 70, 85, "Water usage could be improved. Monitor soil moisture levels more closely."),
+        ('fertilizer_efficiency', float('-inf'), 70, "Fertilizer efficiency is low. Consider soil testing and precision application."),
+        ('fertilizer_efficiency', 70, 85, "Fertilizer usage is good but could be optimized with split applications."),
+        ('yield_efficiency', float('-inf'), 70, "Yield is below expectations. Review planting density, pest management, and soil health."),
+        ('yield_efficiency', 70, 85, "Yield has room for improvement. Consider crop rotation and soil amendments."),
+        ('cost_efficiency', float('-inf'), 90, "Cost efficiency can be improved. Focus on reducing input costs through bulk purchasing."),
+        ('labor_efficiency', float('-inf'), 70, "Labor efficiency is low. Consider mechanization or better planning."),
+        ('labor_efficiency', 70, 85, "Labor usage is good but could be optimized with better task scheduling."),
+        ('energy_efficiency', float('-inf'), 80, "Energy efficiency needs attention. Consider equipment maintenance and route optimization."),
+        # Positive feedback
+        ('water_efficiency', 90, float('inf'), "Excellent water management! Your irrigation practices are optimal."),
+        ('fertilizer_efficiency', 90, float('inf'), "Outstanding fertilizer efficiency! Keep up the precision approach."),
+        ('yield_efficiency', 90, float('inf'), "Excellent yield results! Your farming practices are highly effective.")
+    )
+    MAX_RECOMMENDATIONS = 5
+    
+    # Views get_efficiency_report can return
+    REPORT_VIEWS = ('scores', 'breakdown', 'recommendations', 'comparison')
+    
+    # Percentiles of each metric reported by get_field_comparison
+    DISTRIBUTION_PERCENTILES = (10, 25, 50, 75, 90)
+    
+    # Orders get_efficiency_trends can page fields by, and anomalies it lists
+    TREND_SORTS = ('trend', 'anomaly')
+    MAX_LISTED_ANOMALIES = 20
+    
     def calculate_efficiency(self, field_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Calculate comprehensive field efficiency metrics
@@ -110,58 +138,59 @@ class FieldEfficiencyService:
         Returns:
             Dictionary with efficiency scores and recommendations
         """
-        crop_type = field_data.get('crop_type', '')
-        if not crop_type:
-            crop_type = ''
-        crop_type = crop_type.capitalize()
-        
+        baselines = self._baselines(field_data)
+        scores = self._component_scores(field_data, baselines)
+        return dict(self._score_summary(scores, baselines), recommendations=self._recommendations(scores))
+    
+    def _default_baselines(self) -> Dict[str, float]:
+        """Built-in reference inputs and regional averages"""
+        return {
+            'cost_per_acre': self.REGIONAL_COST,
+            'labor_hours': self.STANDARD_LABOR_HOURS,
+            'fuel_liters': self.STANDARD_FUEL_LITERS,
+            **self.REGIONAL_AVERAGES
+        }
+    
+    def _baselines(self, field_data: Dict[str, Any]) -> Dict[str, float]:
+        """Reference inputs and regional averages of a field's region and crop"""
+        defaults = self._default_baselines()
+        if self.baseline_store is None:
+            return defaults
+        return self.baseline_store.baselines(field_data.get('region'), field_data.get('crop_type'), defaults)
+    
+    def _component_scores(self, field_data: Dict[str, Any], baselines: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+        """Unrounded overall and component scores of one field"""
         # Get crop standards (with fallback to generic values)
-        standards = self.CROP_STANDARDS.get(crop_type, {
-            'water': 700,
-            'fertilizer_n': 100,
-            'fertilizer_p': 60,
-            'fertilizer_k': 50,
-            'ideal_yield': 30,
-            'growing_days': 120
-        })
+        standards = self.catalog.get_standards(field_data.get('crop_type'))
         
         # Calculate individual efficiency components
-        water_efficiency = self._calculate_water_efficiency(field_data, standards)
-        fertilizer_efficiency = self._calculate_fertilizer_efficiency(field_data, standards)
-        yield_efficiency = self._calculate_yield_efficiency(field_data, standards)
-        cost_efficiency = self._calculate_cost_efficiency(field_data)
-        labor_efficiency = self._calculate_labor_efficiency(field_data)
-        energy_efficiency = self._calculate_energy_efficiency(field_data)
+        components = {
+            'water_efficiency': self._calculate_water_efficiency(field_data, standards),
+            'fertilizer_efficiency': self._calculate_fertilizer_efficiency(field_data, standards),
+            'yield_efficiency': self._calculate_yield_efficiency(field_data, standards),
+            'cost_efficiency': self._calculate_cost_efficiency(field_data, baselines),
+            'labor_efficiency': self._calculate_labor_efficiency(field_data, baselines),
+            'energy_efficiency': self._calculate_energy_efficiency(field_data, baselines)
+        }
         
         # Calculate overall weighted efficiency
-        overall_efficiency = (
-            water_efficiency * 0.25 +
-            fertilizer_efficiency * 0.25 +
-            yield_efficiency * 0.20 +
-            cost_efficiency * 0.15 +
-            labor_efficiency * 0.10 +
-            energy_efficiency * 0.05
+        overall_efficiency = sum(
+            components[name] * weight for name, weight in self.COMPONENT_WEIGHTS.items()
         )
-        
-        # Determine efficiency rating
-        rating = self._get_rating(overall_efficiency)
-        
-        return {
-            'overall_efficiency': round(overall_efficiency, 2),
-            'water_efficiency': round(water_efficiency, 2),
-            'fertilizer_efficiency': round(fertilizer_efficiency, 2),
-            'yield_efficiency': round(yield_efficiency, 2),
-            'cost_efficiency': round(cost_efficiency, 2),
-            'labor_efficiency': round(labor_efficiency, 2),
-            'energy_efficiency': round(energy_efficiency, 2),
-            'rating': rating,
-            'regional_avg': self.REGIONAL_AVERAGES['overall_efficiency'],
-            'improvement_potential': round(overall_efficiency - self.REGIONAL_AVERAGES['overall_efficiency'], 2),
-            'recommendations': self._generate_recommendations(
-                water_efficiency, fertilizer_efficiency, yield_efficiency, 
-                cost_efficiency, labor_efficiency, energy_efficiency
-            )
-        }
+        return dict(overall_efficiency=overall_efficiency, **components)
+    
+    def _score_summary(self, scores: Dict[str, float], baselines: Dict[str, float]) -> Dict[str, Any]:
+        """Rounded scores, rating and position against the regional average"""
+        overall_efficiency = scores['overall_efficiency']
+        summary = {name: round(value, 2) for name, value in scores.items()}
+        summary['rating'] = self._get_rating(overall_efficiency)
+        summary['regional_avg'] = round(baselines['overall_efficiency'], 2)
+        summary['improvement_potential'] = round(overall_efficiency - baselines['overall_efficiency'], 2)
+        return summary
+    
+    def _recommendations(self, scores: Dict[str, float]) -> List[str]:
+        """Recommendations for the component scores of one field"""
+        return self._generate_recommendations(*(scores[name] for name in self.COMPONENT_WEIGHTS))
     
     def _calculate_water_efficiency(self, field_data: Dict, standards: Dict) -> float:
         """Calculate water efficiency (25% weight)"""
@@ -169,12 +198,12 @@ class FieldEfficiencyService:
         
         if water_used_liters is None:
             # Return default value if no data
-            return 87.0
+            return self.DEFAULT_SCORES['water_efficiency']
         
         # Convert crop water requirement from mm to liters
         # 1 mm = 10,000 liters per hectare
         # 1 hectare = 2.471 acres
-        water_per_acre_mm = standards['water'] / 2.471
+        water_per_acre_mm = standards['water'] / self.ACRES_PER_HECTARE
         ideal_water_liters = water_per_acre_mm * 10000
         
         # Calculate efficiency (cap at 100%)
@@ -190,12 +219,12 @@ class FieldEfficiencyService:
         
         if fertilizer_n == 0 and fertilizer_p == 0 and fertilizer_k == 0:
             # Return default value if no data
-            return 85.0
+            return self.DEFAULT_SCORES['fertilizer_efficiency']
         
         # Convert standards from kg/hectare to kg/acre
-        standards_n = standards['fertilizer_n'] / 2.471
-        standards_p = standards['fertilizer_p'] / 2.471
-        standards_k = standards['fertilizer_k'] / 2.471
+        standards_n = standards['fertilizer_n'] / self.ACRES_PER_HECTARE
+        standards_p = standards['fertilizer_p'] / self.ACRES_PER_HECTARE
+        standards_k = standards['fertilizer_k'] / self.ACRES_PER_HECTARE
         
         # Calculate efficiency (optimal if within ±20% of standard)
         if fertilizer_n > 0:
@@ -228,7 +257,7 @@ class FieldEfficiencyService:
         
         if actual_yield is None:
             # Return default value if no data
-            return 89.0
+            return self.DEFAULT_SCORES['yield_efficiency']
         
         ideal_yield = standards['ideal_yield']
         
@@ -237,48 +266,48 @@ class FieldEfficiencyService:
         
         return max(0, efficiency)
     
-    def _calculate_cost_efficiency(self, field_data: Dict) -> float:
+    def _calculate_cost_efficiency(self, field_data: Dict, baselines: Optional[Dict] = None) -> float:
         """Calculate cost efficiency (15% weight)"""
         cost_per_acre = field_data.get('cost_per_acre')
         
         if cost_per_acre is None:
             # Return default value if no data
-            return 92.0
+            return self.DEFAULT_SCORES['cost_efficiency']
         
         # Regional average cost per acre (₹)
-        regional_cost = 968 * 2.471  # Assuming ₹968/acre from field data
+        regional_cost = baselines['cost_per_acre'] if baselines else self.REGIONAL_COST
         
         # Higher efficiency = lower cost relative to regional average
         efficiency = min(150, (regional_cost / cost_per_acre) * 100) if cost_per_acre > 0 else 0
         
         return max(0, efficiency)
     
-    def _calculate_labor_efficiency(self, field_data: Dict) -> float:
+    def _calculate_labor_efficiency(self, field_data: Dict, baselines: Optional[Dict] = None) -> float:
         """Calculate labor efficiency (10% weight)"""
         labor_hours = field_data.get('labor_hours')
         
         if labor_hours is None:
             # Return default value if no data
-            return 78.0
+            return self.DEFAULT_SCORES['labor_efficiency']
         
         # Standard labor hours per acre (varies by crop, use average)
-        standard_hours = 45  # hours per acre
+        standard_hours = baselines['labor_hours'] if baselines else self.STANDARD_LABOR_HOURS
         
         # Higher efficiency = fewer hours than standard
         efficiency = min(120, (standard_hours / labor_hours) * 100) if labor_hours > 0 else 0
         
         return max(0, efficiency)
     
-    def _calculate_energy_efficiency(self, field_data: Dict) -> float:
+    def _calculate_energy_efficiency(self, field_data: Dict, baselines: Optional[Dict] = None) -> float:
         """Calculate energy efficiency (5% weight)"""
         fuel_liters = field_data.get('fuel_liters')
         
         if fuel_liters is None:
             # Return default value if no data
-            return 82.0
+            return self.DEFAULT_SCORES['energy_efficiency']
         
         # Standard fuel usage per acre (liters)
-        standard_fuel = 15  # liters per acre
+        standard_fuel = baselines['fuel_liters'] if baselines else self.STANDARD_FUEL_LITERS
         
         # Higher efficiency = less fuel than standard
         efficiency = min(120, (standard_fuel / fuel_liters) * 100) if fuel_liters > 0 else 0
@@ -287,96 +316,197 @@ class FieldEfficiencyService:
     
     def _get_rating(self, efficiency: float) -> str:
         """Get efficiency rating"""
-        if efficiency >= 90:
-            return "Excellent"
-        elif efficiency >= 80:
-            return "Very Good"
-        elif efficiency >= 70:
-            return "Good"
-        elif efficiency >= 60:
-            return "Fair"
-        else:
-            return "Needs Improvement"
+        for threshold, rating in self.RATINGS:
+            if efficiency >= threshold:
+                return rating
+        return self.LOWEST_RATING
     
     def _generate_recommendations(self, water_eff: float, fert_eff: float, 
                                  yield_eff: float, cost_eff: float, 
                                  labor_eff: float, energy_eff: float) -> List[str]:
         """Generate actionable recommendations based on efficiency scores"""
-        recommendations = []
-        
-        if water_eff < 70:
-            recommendations.append("Water usage is inefficient. Consider installing drip irrigation or using soil moisture sensors.")
-        elif water_eff < 85:
-            recommendations.append("Water usage could be improved. Monitor soil moisture levels more closely.")
-        
-        if fert_eff < 70:
-            recommendations.append("Fertilizer efficiency is low. Consider soil testing and precision application.")
-        elif fert_eff < 85:
-            recommendations.append("Fertilizer usage is good but could be optimized with split applications.")
-        
-        if yield_eff < 70:
-            recommendations.append("Yield is below expectations. Review planting density, pest management, and soil health.")
-        elif yield_eff < 85:
-            recommendations.append("Yield has room for improvement. Consider crop rotation and soil amendments.")
-        
-        if cost_eff < 90:
-            recommendations.append("Cost efficiency can be improved. Focus on reducing input costs through bulk purchasing.")
+        scores = dict(zip(self.COMPONENT_WEIGHTS, (water_eff, fert_eff, yield_eff, cost_eff, labor_eff, energy_eff)))
+        recommendations = [
+            message for component, lower, upper, message in self.RECOMMENDATION_RULES
+            if lower <= scores[component] < upper
+        ]
+        return recommendations[:self.MAX_RECOMMENDATIONS]
+    
+    def score_fields(self, fields: Union[FieldColumns, Sequence]) -> FieldScores:
+        """
+        Score many fields at once with the vectorized engine
         
-        if labor_eff < 70:
-            recommendations.append("Labor efficiency is low. Consider mechanization or better planning.")
-        elif labor_eff < 85:
-            recommendations.append("Labor usage is good but could be optimized with better task scheduling.")
+        Args:
+            fields: FieldColumns, or field data dicts / request models
         
-        if energy_eff < 80:
-            recommendations.append("Energy efficiency needs attention. Consider equipment maintenance and route optimization.")
+        Returns:
+            FieldScores with the same scores calculate_efficiency gives each field
+        """
+        columns = fields if isinstance(fields, FieldColumns) else FieldColumns.from_records(fields)
+        baselines = None
+        if self.baseline_store is not None:
+            baselines = self.baseline_store.baselines_many(columns.regions, columns.crop_types,
+                                                           self._default_baselines())
+        return self.engine.score(columns, baselines)
+    
+    def calculate_efficiency_batch(self, fields: Union[FieldColumns, Sequence]) -> List[Dict[str, Any]]:
+        """
+        Calculate efficiency metrics of many fields
         
-        # Positive feedback
-        if water_eff >= 90:
-            recommendations.append("Excellent water management! Your irrigation practices are optimal.")
-        if fert_eff >= 90:
-            recommendations.append("Outstanding fertilizer efficiency! Keep up the precision approach.")
-        if yield_eff >= 90:
-            recommendations.append("Excellent yield results! Your farming practices are highly effective.")
+        Args:
+            fields: FieldColumns, or field data dicts / request models
         
-        return recommendations[:5]  # Limit to 5 recommendations
+        Returns:
+            One calculate_efficiency result per field
+        """
+        return self.score_fields(fields).to_dicts()
     
-    def get_field_comparison(self, fields_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def get_field_comparison(self, fields_data: Sequence, offset: int = 0, limit: Optional[int] = None,
+                             sort_by: Optional[str] = None, top_k: int = 5,
+                             metrics: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         Get efficiency comparison across multiple fields
         
+        Besides the averages, the portfolio is ranked by overall efficiency, each
+        metric is summarized (mean, extremes, percentiles, top and bottom fields) and
+        aggregated per crop. Only one page of fields is returned. Rankings use partial
+        sorts and aggregates grouped reductions, so the cost stays near-linear in the
+        number of fields.
+        
         Args:
-            fields_data: List of field data dictionaries
+            fields_data: List of field data dictionaries (or FieldEfficiencyRequest models)
+            offset: First field of the returned page
+            limit: Fields in the returned page, all when None
+            sort_by: Metric the page is ordered by (best first), input order when None
+            top_k: Best and worst fields listed per metric
+            metrics: Metrics summarized, ranked and aggregated, defaults to all scores
         
         Returns:
             Dictionary with comparison metrics
+        
+        Raises:
+            ValueError: If a metric is unknown
         """
+        known_metrics = ['overall_efficiency', *self.COMPONENT_WEIGHTS]
+        metrics = list(metrics) if metrics else known_metrics
+        unknown = [metric for metric in [*metrics, sort_by] if metric is not None and metric not in known_metrics]
+        if unknown:
+            raise ValueError(f"Unknown metrics: {', '.join(unknown)}; expected some of {', '.join(known_metrics)}")
+        
         if not fields_data:
             return {
                 'fields': [],
                 'average_efficiency': 0,
-                'comparison': []
+                'comparison': [],
+                'total_fields': 0,
+                'pagination': {'offset': offset, 'limit': limit, 'returned': 0, 'sort_by': sort_by},
+                'distribution': {},
+                'top': {},
+                'bottom': {},
+                'groups': []
             }
         
-        field_efficiencies = []
-        for field in fields_data:
-            efficiency = self.calculate_efficiency(field)
-            field_efficiencies.append({
-                'field_name': field.get('name', 'Unknown'),
-                'crop_type': field.get('crop_type', 'Unknown'),
-                'efficiency': efficiency['overall_efficiency'],
-                'water_efficiency': efficiency['water_efficiency'],
-                'fertilizer_efficiency': efficiency['fertilizer_efficiency']
-            })
+        scores = self.score_fields(fields_data)
+        columns = scores.columns
+        total = len(columns)
+        overall = scores.scores['overall_efficiency']
         
-        avg_efficiency = sum(f['efficiency'] for f in field_efficiencies) / len(field_efficiencies)
+        # Page: input order, or a partial sort of only the fields up to the page end
+        stop = total if limit is None else offset + limit
+        if sort_by is None:
+            page = np.arange(offset, min(stop, total))
+        else:
+            page = ordered_slice(scores.scores[sort_by], offset, stop)
+        
+        # Rank (1 = best, ties share a rank) and percentile rank of the page fields only
+        sorted_overall = np.sort(overall)
+        page_overall = overall[page]
+        below = np.searchsorted(sorted_overall, page_overall, side='left')
+        not_above = np.searchsorted(sorted_overall, page_overall, side='right')
+        ranks = (total - not_above + 1).tolist()
+        percentiles = ((below + not_above) / 2 / total * 100).tolist()
+        
+        field_efficiencies = [
+            self._field_summary(scores, index, rank=rank, percentile=round(percentile, 2))
+            for index, rank, percentile in zip(page.tolist(), ranks, percentiles)
+        ]
+        
+        avg_efficiency = sum(scores.rounded('overall_efficiency')) / total
         regional_avg = self.REGIONAL_AVERAGES['overall_efficiency']
+        if self.baseline_store is not None:
+            # Fields may belong to different regions and crops: average their baselines
+            regional_avg = round(float(scores.regional_avg.mean()), 2)
+        
+        distribution, top, bottom = {}, {}, {}
+        for metric in metrics:
+            values = scores.scores[metric]
+            quantiles = np.percentile(values, self.DISTRIBUTION_PERCENTILES).tolist()
+            distribution[metric] = {
+                'mean': round(float(values.mean()), 2),
+                'min': round(float(values.min()), 2),
+                'max': round(float(values.max()), 2),
+                **{f'p{q}': round(value, 2) for q, value in zip(self.DISTRIBUTION_PERCENTILES, quantiles)}
+            }
+            top[metric] = [self._field_summary(scores, index, metric)
+                           for index in ordered_slice(values, 0, top_k).tolist()]
+            bottom[metric] = [self._field_summary(scores, index, metric)
+                              for index in ordered_slice(values, 0, top_k, descending=False).tolist()]
         
         return {
             'fields': field_efficiencies,
             'average_efficiency': round(avg_efficiency, 2),
             'regional_avg': regional_avg,
-            'improvement': round(avg_efficiency - regional_avg, 2)
+            'improvement': round(avg_efficiency - regional_avg, 2),
+            'total_fields': total,
+            'pagination': {'offset': offset, 'limit': limit, 'returned': len(field_efficiencies), 'sort_by': sort_by},
+            'distribution': distribution,
+            'top': top,
+            'bottom': bottom,
+            'groups': self._crop_groups(scores, metrics)
+        }
+    
+    def _field_summary(self, scores: FieldScores, index: int, metric: Optional[str] = None, **extra) -> Dict[str, Any]:
+        """Comparison entry of one field: its headline scores, or one metric"""
+        columns = scores.columns
+        summary = {
+            'index': index,
+            'field_name': columns.names[index],
+            'crop_type': columns.crop_types[index]
         }
+        if metric is not None:
+            summary['value'] = round(float(scores.scores[metric][index]), 2)
+        else:
+            summary['efficiency'] = round(float(scores.scores['overall_efficiency'][index]), 2)
+            summary['water_efficiency'] = round(float(scores.scores['water_efficiency'][index]), 2)
+            summary['fertilizer_efficiency'] = round(float(scores.scores['fertilizer_efficiency'][index]), 2)
+        summary.update(extra)
+        return summary
+    
+    def _crop_groups(self, scores: FieldScores, metrics: List[str]) -> List[Dict[str, Any]]:
+        """Per-crop field count, area and metric aggregates, largest group first"""
+        columns = scores.columns
+        codes, crop_types = factorize(columns.crop_types)
+        # Spellings and aliases of one crop form one group
+        group_codes, crops = factorize([self.catalog.resolve(crop) or crop for crop in crop_types])
+        codes = np.asarray(group_codes, dtype=np.intp)[codes]
+        
+        counts = np.bincount(codes, minlength=len(crops))
+        areas = np.bincount(codes, weights=np.nan_to_num(columns.area_acres), minlength=len(crops))
+        stats = {metric: group_stats(codes, len(crops), scores.scores[metric]) for metric in metrics}
+        
+        groups = []
+        for group in sorted(range(len(crops)), key=lambda group: (-counts[group], str(crops[group]))):
+            groups.append({
+                'crop': self.catalog.display_name(crops[group]) if isinstance(crops[group], str) else crops[group],
+                'count': int(counts[group]),
+                'area_acres': round(float(areas[group]), 2),
+                'metrics': {
+                    metric: {name: round(float(values[group]), 2) for name, values in stats[metric].items()
+                             if name != 'count'}
+                    for metric in metrics
+                }
+            })
+        return groups
     
     def get_resource_breakdown(self, field_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -388,31 +518,299 @@ class FieldEfficiencyService:
         Returns:
             Dictionary with resource metrics
         """
-        efficiency = self.calculate_efficiency(field_data)
-        
+        baselines = self._baselines(field_data)
+        summary = self._score_summary(self._component_scores(field_data, baselines), baselines)
+        return self._resource_breakdown(summary, baselines)
+    
+    def _resource_breakdown(self, efficiency: Dict[str, Any], baselines: Dict[str, float]) -> Dict[str, Any]:
+        """Resource breakdown from rounded scores"""
         return {
             'water_use': {
                 'your_field': efficiency['water_efficiency'],
-                'regional': self.REGIONAL_AVERAGES['water_efficiency']
+                'regional': round(baselines['water_efficiency'], 2)
             },
             'fertilizer': {
                 'your_field': efficiency['fertilizer_efficiency'],
-                'regional': self.REGIONAL_AVERAGES['fertilizer_efficiency']
+                'regional': round(baselines['fertilizer_efficiency'], 2)
             },
             'labor': {
                 'your_field': efficiency['labor_efficiency'],
-                'regional': self.REGIONAL_AVERAGES['labor_efficiency']
+                'regional': round(baselines['labor_efficiency'], 2)
             },
             'energy': {
                 'your_field': efficiency['energy_efficiency'],
-                'regional': self.REGIONAL_AVERAGES['energy_efficiency']
+                'regional': round(baselines['energy_efficiency'], 2)
             },
             'pest_control': {
                 'your_field': efficiency['fertilizer_efficiency'] * 0.95,  # Proxy calculation
-                'regional': self.REGIONAL_AVERAGES['pest_control_efficiency']
+                'regional': round(baselines['pest_control_efficiency'], 2)
             },
             'yield_per_cost': {
                 'your_field': efficiency['yield_efficiency'] / efficiency['cost_efficiency'] * 100 if efficiency['cost_efficiency'] > 0 else 0,
-                'regional': self.REGIONAL_AVERAGES['yield_per_cost']
+                'regional': round(baselines['yield_per_cost'], 2)
             }
         }
+    
+    def _regional_comparison(self, summary: Dict[str, Any], baselines: Dict[str, float]) -> Dict[str, Any]:
+        """Rounded scores against the regional average of each metric that has one"""
+        return {
+            metric: {
+                'your_field': summary[metric],
+                'regional': round(baselines[metric], 2),
+                'difference': round(summary[metric] - baselines[metric], 2),
+                'above_average': summary[metric] >= baselines[metric]
+            }
+            for metric in self.REGIONAL_AVERAGES
+            if metric in summary
+        }
+    
+    def get_efficiency_report(self, field_data: Dict[str, Any],
+                              views: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        Get several views of one field's efficiency in a single pass
+        
+        The component scores are computed once and every requested view is derived
+        from them, instead of each view re-running calculate_efficiency.
+        
+        Args:
+            field_data: Dictionary containing field information
+            views: Views to return, some of REPORT_VIEWS, defaults to all
+        
+        Returns:
+            Dictionary with one entry per requested view
+        
+        Raises:
+            ValueError: If a view is unknown
+        """
+        views = list(dict.fromkeys(views)) if views else list(self.REPORT_VIEWS)
+        unknown = [view for view in views if view not in self.REPORT_VIEWS]
+        if unknown:
+            raise ValueError(f"Unknown views: {', '.join(unknown)}; expected some of {', '.join(self.REPORT_VIEWS)}")
+        
+        baselines = self._baselines(field_data)
+        scores = self._component_scores(field_data, baselines)
+        summary = self._score_summary(scores, baselines)
+        
+        report = {}
+        for view in views:
+            if view == 'scores':
+                report['scores'] = summary
+            elif view == 'breakdown':
+                report['breakdown'] = self._resource_breakdown(summary, baselines)
+            elif view == 'recommendations':
+                report['recommendations'] = self._recommendations(scores)
+            elif view == 'comparison':
+                report['comparison'] = self._regional_comparison(summary, baselines)
+        return report
+    
+    def record_baselines(self, fields: Union[FieldColumns, Sequence]) -> Dict[str, Any]:
+        """
+        Add field results to the regional baselines
+        
+        Each field's scores (against the current baselines) and its reported yield,
+        cost, labor and fuel are folded into the aggregates of its region and crop.
+        
+        Args:
+            fields: FieldColumns, or field data dicts / request models (with `region`)
+        
+        Returns:
+            Dictionary with the number of fields and aggregates updated
+        
+        Raises:
+            RuntimeError: If the service has no baseline store
+        """
+        if self.baseline_store is None:
+            raise RuntimeError("Regional baselines are not enabled")
+        
+        scores = self.score_fields(fields)
+        columns = scores.columns
+        values = dict(scores.scores)
+        for name in ('actual_yield', 'cost_per_acre', 'labor_hours', 'fuel_liters'):
+            values[name] = np.where(columns.present[name], columns.values[name], np.nan)
+        
+        updated = self.baseline_store.record(columns.regions, columns.crop_types, values)
+        return {'fields': len(columns), 'aggregates_updated': updated}
+    
+    def record_history(self, fields: Sequence) -> Dict[str, Any]:
+        """
+        Score fields and store the scores in their season's history
+        
+        Recording a field again for the same season replaces its earlier scores.
+        
+        Args:
+            fields: Field data dicts / request models, each with `field_id` and `season`
+        
+        Returns:
+            Dictionary with the number of records written and the seasons covered
+        
+        Raises:
+            RuntimeError: If the service has no history store
+            ValueError: If a field has no field_id or season, or a season is invalid
+        """
+        if self.history_store is None:
+            raise RuntimeError("Field efficiency history is not enabled")
+        
+        fields = list(fields)
+        get = (lambda field, key: field.get(key)) if fields and isinstance(fields[0], dict) else getattr
+        field_ids = [get(field, 'field_id') for field in fields]
+        seasons = [get(field, 'season') for field in fields]
+        missing = [index for index, (field_id, season) in enumerate(zip(field_ids, seasons))
+                   if not field_id or not season]
+        if missing:
+            raise ValueError(f"Fields without field_id or season: {', '.join(map(str, missing[:20]))}")
+        
+        scores = self.score_fields(fields)
+        written = self.history_store.record(
+            field_ids, seasons, np.column_stack([scores.scores[metric] for metric in HISTORY_METRICS])
+        )
+        return {'records_written': written, 'fields': len(set(field_ids)), 'seasons': sorted(set(seasons))}
+    
+    def get_efficiency_trends(self, field_ids: Optional[Sequence[str]] = None, metric: str = 'overall_efficiency',
+                              window: int = 3, trend_window: Optional[int] = None,
+                              anomaly_threshold: float = 2.0, offset: int = 0, limit: Optional[int] = None,
+                              sort_by: Optional[str] = None, include_series: bool = False) -> Dict[str, Any]:
+        """
+        Get rolling averages, trends and anomalies of fields across seasons
+        
+        The history of all requested fields is loaded as one (fields, seasons) matrix
+        and every statistic is a whole-matrix window operation; only the returned
+        page is turned into dicts. For each field's latest season it reports the
+        rolling mean of its last `window` recorded seasons, the least-squares trend
+        per year and the z-score against the `window` recorded seasons before it.
+        
+        Args:
+            field_ids: Fields to analyze, all recorded fields when None
+            metric: Score analyzed (one of HISTORY_METRICS)
+            window: Recorded seasons of each field per rolling mean and anomaly baseline
+            trend_window: Latest seasons of each field the trend is fitted on, all when None
+            anomaly_threshold: Absolute z-score from which the latest season is an anomaly
+            offset: First field of the returned page
+            limit: Fields in the returned page, all when None
+            sort_by: 'trend' (most improving first) or 'anomaly' (largest |z| first),
+                     field order when None
+            include_series: Include each page field's season values
+        
+        Returns:
+            Dictionary with the page of fields, a portfolio summary and the largest anomalies
+        
+        Raises:
+            RuntimeError: If the service has no history store
+            ValueError: If the metric, sort or a window is invalid
+        """
+        if self.history_store is None:
+            raise RuntimeError("Field efficiency history is not enabled")
+        if metric not in HISTORY_METRICS:
+            raise ValueError(f"Unknown metric '{metric}'; expected one of {', '.join(HISTORY_METRICS)}")
+        if sort_by is not None and sort_by not in self.TREND_SORTS:
+            raise ValueError(f"Unknown sort '{sort_by}'; expected one of {', '.join(self.TREND_SORTS)}")
+        if window < 1 or (trend_window is not None and trend_window < 2):
+            raise ValueError("window must be at least 1 and trend_window at least 2")
+        
+        history = self.history_store.load(field_ids, [metric])
+        values = history['values'][metric]
+        total, seasons = values.shape
+        pagination = {'offset': offset, 'limit': limit, 'sort_by': sort_by}
+        if total == 0:
+            return {
+                'metric': metric,
+                'seasons': [],
+                'fields': [],
+                'total_fields': 0,
+                'pagination': dict(pagination, returned=0),
+                'summary': {'improving': 0, 'declining': 0, 'stable': 0, 'insufficient_history': 0,
+                            'anomalies': 0, 'mean_trend_per_year': None},
+                'anomalies': []
+            }
+        
+        present = ~np.isnan(values)
+        # Season positions in years, so trends are per year whatever the seasons per year
+        positions = history['season_index'] / len(SEASONS)
+        trend_values = values
+        if trend_window is not None:
+            # Count of present seasons from the right: keep each field's latest trend_window
+            from_end = np.cumsum(present[:, ::-1], axis=1)[:, ::-1]
+            trend_values = np.where(from_end <= trend_window, values, np.nan)
+        slopes, points = trend_slopes(trend_values, positions)
+        rolling, zscores, expected = recorded_window_stats(values, window)
+        
+        rows = np.arange(total)
+        latest = seasons - 1 - np.argmax(present[:, ::-1], axis=1)
+        latest_z = zscores[rows, latest]
+        anomalous = np.abs(latest_z) >= anomaly_threshold  # NaN compares False
+        
+        stop = total if limit is None else offset + limit
+        if sort_by is None:
+            page = np.arange(offset, min(stop, total))
+        else:
+            keys = slopes if sort_by == 'trend' else np.abs(latest_z)
+            page = ordered_slice(np.where(np.isnan(keys), -np.inf, keys), offset, stop)
+        
+        def entry(index: int) -> Dict[str, Any]:
+            column = latest[index]
+            item = {
+                'field_id': history['field_ids'][index],
+                'latest_season': history['seasons'][column],
+                'value': _rounded(values[index, column]),
+                'rolling_mean': _rounded(rolling[index, column]),
+                'trend_per_year': _rounded(slopes[index], 3),
+                'trend_points': int(points[index]),
+                'zscore': _rounded(latest_z[index]),
+                'expected': _rounded(expected[index, column]),
+                'is_anomaly': bool(anomalous[index]),
+                'seasons_recorded': int(present[index].sum())
+            }
+            if include_series:
+                item['series'] = [
+                    {'season': history['seasons'][column], 'value': _rounded(values[index, column])}
+                    for column in np.flatnonzero(present[index]).tolist()
+                ]
+            return item
+        
+        flagged = np.where(anomalous, np.abs(latest_z), -np.inf)
+        listed = ordered_slice(flagged, 0, min(int(anomalous.sum()), self.MAX_LISTED_ANOMALIES))
+        has_trend = ~np.isnan(slopes)
+        
+        return {
+            'metric': metric,
+            'seasons': history['seasons'],
+            'fields': [entry(index) for index in page.tolist()],
+            'total_fields': total,
+            'pagination': dict(pagination, returned=len(page)),
+            'summary': {
+                'improving': int((slopes > 0).sum()),
+                'declining': int((slopes < 0).sum()),
+                'stable': int((slopes == 0).sum()),
+                'insufficient_history': int((~has_trend).sum()),
+                'anomalies': int(anomalous.sum()),
+                'mean_trend_per_year': _rounded(slopes[has_trend].mean(), 3) if has_trend.any() else None
+            },
+            'anomalies': [entry(index) for index in listed.tolist()]
+        }
+    
+    def get_field_history(self, field_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get every recorded season of one field
+        
+        Args:
+            field_id: Field ID
+        
+        Returns:
+            Dictionary with the field's seasons and their scores, or None if it has no history
+        
+        Raises:
+            RuntimeError: If the service has no history store
+        """
+        if self.history_store is None:
+            raise RuntimeError("Field efficiency history is not enabled")
+        history = self.history_store.load([field_id])
+        if not history['field_ids']:
+            return None
+        recorded = np.flatnonzero(~np.isnan(history['values'][HISTORY_METRICS[0]][0]))
+        return {
+            'field_id': field_id,
+            'seasons': [
+                {'season': history['seasons'][column], **{metric: _rounded(history['values'][metric][0, column])
+                                                          for metric in HISTORY_METRICS}}
+                for column in recorded.tolist()
+            ]
+        }
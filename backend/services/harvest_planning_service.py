@@ -7,39 +7,17 @@ from typing import Dict, List, Any, Optional
 from datetime import datetime, date, timedelta
 import logging
 
+from services.crop_catalog import get_crop_catalog
+
 logger = logging.getLogger(__name__)
 
 class HarvestPlanningService:
     """Service for calculating optimal harvest planning"""
     
-    # Crop-specific maturity days
-    CROP_MATURITY_DAYS = {
-        'Rice': 120,
-        'Wheat': 140,
-        'Cotton': 150,
-        'Maize': 90,
-        'Tomato': 90,
-        'Potato': 100,
-        'Sugarcane': 365,
-        'Soybean': 100,
-        'Pigeonpeas': 120,
-        'Mothbeans': 75,
-        'Mungbean': 70,
-        'Kidneybeans': 90,
-        'Chickpea': 100,
-        'Blackgram': 75,
-        'Lentil': 90,
-        'Apple': 150,
-        'Banana': 300,
-        'Coconut': 365,
-        'Coffee': 270,
-        'Grapes': 120,
-        'Jute': 120,
-        'Muskmelon': 100,
-        'Orange': 240,
-        'Papaya': 270,
-        'Watermelon': 90
-    }
+    def __init__(self):
+        """Initialize the service with the shared crop catalog"""
+        # Crop-specific maturity days
+        self.catalog = get_crop_catalog()
     
     # NDVI to maturity mapping
     def ndvi_to_maturity(self, ndvi: float) -> float:
@@ -81,10 +59,7 @@ class HarvestPlanningService:
             Dictionary with harvest planning details
         """
         # Get maturity days for crop
-        maturity_days = self.CROP_MATURITY_DAYS.get(
-            crop_type.capitalize(),
-            120  # Default fallback
-        )
+        maturity_days = self.catalog.get_maturity_days(crop_type)
         
         # Parse planting date
         try:
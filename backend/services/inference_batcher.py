@@ -0,0 +1,276 @@
+"""
+Inference Batcher
+Groups requests that arrive close together into micro-batches for a single forward pass
+"""
+
+import threading
+import queue
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Sequence
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    """Thread-safe fixed-bucket histogram (cumulative counts, Prometheus style)"""
+
+    def __init__(self, buckets: Sequence[float]):
+        """
+        Initialize the histogram
+
+        Args:
+            buckets: Upper bounds of the buckets, an implicit +Inf bucket is added
+        """
+        self.buckets = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """Record a single observation"""
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += value
+            self._max = max(self._max, value)
+
+    def snapshot(self) -> Dict:
+        """
+        Get a point-in-time copy of the histogram
+
+        Returns:
+            Dictionary with cumulative bucket counts, count, sum, mean and max
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total, value_sum, value_max = self._count, self._sum, self._max
+
+        cumulative = {}
+        running = 0
+        for bound, count in zip(self.buckets, counts):
+            running += count
+            cumulative[f"le_{bound:g}"] = running
+        cumulative['le_inf'] = running + counts[-1]
+
+        return {
+            'buckets': cumulative,
+            'count': total,
+            'sum': round(value_sum, 3),
+            'mean': round(value_sum / total, 3) if total else 0,
+            'max': round(value_max, 3)
+        }
+
+
+class _PendingRequest:
+    """A queued inference request waiting for its batch"""
+
+    __slots__ = ('inputs', 'future', 'enqueued_at')
+
+    def __init__(self, inputs: np.ndarray):
+        self.inputs = inputs
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class InferenceBatcher:
+    """
+    Dynamic micro-batching scheduler in front of a model
+
+    Requests are queued and a worker thread drains the queue, waiting at most
+    `max_wait_ms` after the first request of a batch for more requests to arrive, up to
+    `max_batch_size` rows. The stacked batch goes through `predict_fn` once and each
+    caller's future receives its own slice of the output.
+
+    With `num_workers` > 1, batches are still gathered one at a time but several
+    forward passes can run concurrently, for backends such as a TFLite interpreter
+    pool that scale with cores.
+    """
+
+    BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+    QUEUE_WAIT_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+    def __init__(self, predict_fn: Callable[[np.ndarray], np.ndarray],
+                 max_batch_size: int = 16, max_wait_ms: float = 5.0,
+                 name: str = "inference", num_workers: int = 1):
+        """
+        Initialize the batcher
+
+        Args:
+            predict_fn: Function mapping a (B, ...) input array to a (B, ...) output array
+            max_batch_size: Maximum number of rows in one forward pass
+            max_wait_ms: Maximum time to hold the first request while gathering a batch
+            name: Name used for the worker threads and log messages
+            num_workers: Number of forward passes that may run concurrently
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+        self.num_workers = max(1, int(num_workers))
+
+        self.batch_size_histogram = Histogram(self.BATCH_SIZE_BUCKETS)
+        self.queue_wait_histogram = Histogram(self.QUEUE_WAIT_BUCKETS_MS)
+        self.batches_processed = 0
+        self.errors = 0
+
+        self._queue: "queue.Queue[Optional[_PendingRequest]]" = queue.Queue()
+        self._carry: Optional[_PendingRequest] = None
+        self._workers: List[threading.Thread] = []
+        self._start_lock = threading.Lock()
+        self._collect_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._closed = False
+
+    def submit(self, inputs: np.ndarray) -> Future:
+        """
+        Queue inputs for batched inference
+
+        Args:
+            inputs: Input array with a leading batch dimension (usually 1)
+
+        Returns:
+            Future resolving to the model output rows for these inputs
+        """
+        if self._closed:
+            raise RuntimeError(f"{self.name} batcher is closed")
+
+        self._ensure_worker()
+        request = _PendingRequest(inputs)
+        self._queue.put(request)
+        return request.future
+
+    def predict(self, inputs: np.ndarray, timeout: Optional[float] = None) -> np.ndarray:
+        """Submit inputs and block until their outputs are ready"""
+        return self.submit(inputs).result(timeout=timeout)
+
+    def close(self):
+        """Stop the worker threads after the queued requests are served"""
+        self._closed = True
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join(timeout=5)
+
+    def get_stats(self) -> Dict:
+        """
+        Get batching statistics
+
+        Returns:
+            Dictionary with configuration, counters and histograms
+        """
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'num_workers': self.num_workers,
+            'batches_processed': self.batches_processed,
+            'errors': self.errors,
+            'queue_depth': self._queue.qsize(),
+            'batch_size': self.batch_size_histogram.snapshot(),
+            'queue_wait_ms': self.queue_wait_histogram.snapshot()
+        }
+
+    def _ensure_worker(self):
+        """Start the worker threads on first use"""
+        if self._workers:
+            return
+        with self._start_lock:
+            if not self._workers:
+                for i in range(self.num_workers):
+                    worker = threading.Thread(
+                        target=self._run, name=f"{self.name}-batcher-{i}", daemon=True
+                    )
+                    worker.start()
+                    self._workers.append(worker)
+
+    def _next_request(self, timeout: Optional[float]) -> Optional[_PendingRequest]:
+        """Get the next request, honouring one carried over from the previous batch"""
+        if self._carry is not None:
+            request, self._carry = self._carry, None
+            return request
+        if timeout is None:
+            return self._queue.get()
+        if timeout <= 0:
+            return self._queue.get_nowait()
+        return self._queue.get(timeout=timeout)
+
+    def _collect_batch(self) -> Optional[List[_PendingRequest]]:
+        """Block for the first request, then gather more until the batch is full or the deadline passes"""
+        first = self._next_request(timeout=None)
+        if first is None:
+            return None
+
+        batch = [first]
+        rows = len(first.inputs)
+        deadline = first.enqueued_at + self.max_wait
+
+        while rows < self.max_batch_size:
+            # Past the deadline we still take whatever is already queued
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self._next_request(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                # Shutdown sentinel, serve what we have and stop afterwards
+                self._queue.put(None)
+                break
+            if rows + len(request.inputs) > self.max_batch_size:
+                # Keep it for the next batch instead of overflowing this one
+                self._carry = request
+                break
+            batch.append(request)
+            rows += len(request.inputs)
+
+        return batch
+
+    def _run(self):
+        """Worker loop, gathering is serialized so batches fill before the next one starts"""
+        while True:
+            with self._collect_lock:
+                batch = self._collect_batch()
+            if batch is None:
+                break
+            self._process(batch)
+
+    def _process(self, batch: List[_PendingRequest]):
+        """Run one forward pass and distribute the outputs"""
+        started = time.perf_counter()
+        for request in batch:
+            self.queue_wait_histogram.observe((started - request.enqueued_at) * 1000.0)
+
+        try:
+            if len(batch) == 1:
+                inputs = batch[0].inputs
+            else:
+                inputs = np.concatenate([request.inputs for request in batch], axis=0)
+            self.batch_size_histogram.observe(len(inputs))
+
+            outputs = self.predict_fn(inputs)
+            with self._stats_lock:
+                self.batches_processed += 1
+
+            offset = 0
+            for request in batch:
+                rows = len(request.inputs)
+                request.future.set_result(outputs[offset:offset + rows])
+                offset += rows
+
+        except Exception as e:
+            with self._stats_lock:
+                self.errors += 1
+            logger.error(f"Error in {self.name} batch of {len(batch)} requests: {e}")
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
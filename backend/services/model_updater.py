@@ -0,0 +1,302 @@
+"""
+Model Updater
+Folds grower-reported crop outcomes into the recommendation model in the background
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional
+import logging
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+
+from services.neighbor_index import NeighborIndex
+from services.outcome_store import OutcomeStore, decode_crops
+from services.recommendation_artifacts import ModelBundle, load_bundle, prune_versions, write_version
+from services.tree_kernel import TreeEnsembleKernel
+
+logger = logging.getLogger(__name__)
+
+
+def warm_start_fit(model, features: np.ndarray, labels: np.ndarray, extra_estimators: int):
+    """
+    Grow a fitted tree ensemble on new data (process pool task)
+
+    Gradient boosting adds stages fitted to the current residuals, a random forest adds
+    trees; the existing trees are kept as they are. HistGradientBoosting refits its
+    feature binning on every fit, which would leave the kept trees splitting on stale
+    bins, so it is refitted from scratch with the same parameters instead.
+
+    Args:
+        model: Fitted GradientBoosting, HistGradientBoosting or RandomForest classifier
+        features: Scaled training rows
+        labels: Class index per row
+        extra_estimators: Stages / trees to add (ignored for HistGradientBoosting)
+
+    Returns:
+        The grown (or refitted) model
+    """
+    if 'max_iter' in model.get_params():
+        return clone(model).set_params(warm_start=False).fit(features, labels)
+    model.set_params(warm_start=True, n_estimators=model.n_estimators + extra_estimators)
+    model.fit(features, labels)
+    return model.set_params(warm_start=False)
+
+
+class ModelUpdater:
+    """
+    Background warm-start updates of CropRecommendationService
+
+    An update always grows the offline-trained base version (not the previous update),
+    on the training dataset plus every stored outcome, so repeated updates do not keep
+    enlarging the ensemble. The fit runs in a separate process and the result is
+    published as a new version and swapped into the service in one assignment;
+    requests keep scoring with the previous bundle until then.
+    """
+
+    IDLE = "idle"
+    UPDATING = "updating"
+
+    def __init__(self, service, store: Optional[OutcomeStore] = None, min_samples: Optional[int] = None,
+                 interval_seconds: Optional[float] = None, extra_estimators: Optional[int] = None,
+                 keep_versions: int = 5):
+        """
+        Initialize the updater
+
+        Args:
+            service: CropRecommendationService (or a LazyService holding it)
+            store: Outcome store, defaults to OutcomeStore()
+            min_samples: New outcomes that trigger a scheduled update (env RECOMMEND_UPDATE_MIN_SAMPLES)
+            interval_seconds: Time between checks, 0 for manual updates only (env RECOMMEND_UPDATE_INTERVAL_SECONDS)
+            extra_estimators: Stages / trees added per update (env RECOMMEND_UPDATE_ESTIMATORS)
+            keep_versions: Published versions kept when pruning
+        """
+        self.service = service
+        self.store = store or OutcomeStore()
+        self.min_samples = min_samples if min_samples is not None else \
+            int(os.getenv("RECOMMEND_UPDATE_MIN_SAMPLES", 50))
+        self.interval_seconds = interval_seconds if interval_seconds is not None else \
+            float(os.getenv("RECOMMEND_UPDATE_INTERVAL_SECONDS", 3600))
+        self.extra_estimators = extra_estimators if extra_estimators is not None else \
+            int(os.getenv("RECOMMEND_UPDATE_ESTIMATORS", 10))
+        self.keep_versions = keep_versions
+
+        self.state = self.IDLE
+        self.last_update: Optional[Dict] = None
+        self.last_error: Optional[str] = None
+
+        self._base: Optional[ModelBundle] = None
+        # Outcome count of the last update that was not promoted; not retried until more arrive
+        self._rejected_outcomes = 0
+        self._update_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._force = False
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start the background thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="recommendation-updater", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background thread after the current update"""
+        self._stopped = True
+        self._wake.set()
+
+    def trigger(self) -> bool:
+        """
+        Request an update now, whatever the number of new outcomes
+
+        Returns:
+            False if an update is already running
+        """
+        if self.state == self.UPDATING:
+            return False
+        self._force = True
+        self._wake.set()
+        return True
+
+    def _run(self):
+        """Check for new outcomes every interval, or when triggered"""
+        while not self._stopped:
+            self._wake.wait(self.interval_seconds or None)
+            self._wake.clear()
+            if self._stopped:
+                break
+            force, self._force = self._force, False
+            try:
+                if force or self.pending() >= max(1, self.min_samples):
+                    self.update()
+            except Exception as e:
+                logger.error(f"Recommendation model update failed: {e}")
+
+    def pending(self) -> int:
+        """Stored outcomes the served model has not been trained on"""
+        manifest = self.service.bundle.manifest or {}
+        trained = max(manifest.get('update', {}).get('outcomes', 0), self._rejected_outcomes)
+        return self.store.count() - trained
+
+    def _base_bundle(self, current: ModelBundle) -> ModelBundle:
+        """The offline-trained version the served model descends from"""
+        base_version = ((current.manifest or {}).get('update') or {}).get('base_version')
+        if base_version is None:
+            return current
+        if self._base is None or self._base.version != base_version:
+            try:
+                self._base = load_bundle(os.path.join(self.service.model_dir, base_version), self.service.FEATURES)
+            except Exception as e:
+                logger.warning(f"Base version {base_version} unavailable, growing {current.version}: {e}")
+                return current
+        return self._base
+
+    def update(self) -> Optional[Dict]:
+        """
+        Run one update and swap the new model in
+
+        Returns:
+            Update summary, or None if another update is running
+
+        Raises:
+            RuntimeError: If there is no trained model or no usable outcome
+        """
+        if not self._update_lock.acquire(blocking=False):
+            return None
+        self.state = self.UPDATING
+        started = time.perf_counter()
+        try:
+            summary = self._update()
+            summary['seconds'] = round(time.perf_counter() - started, 2)
+            summary['finished_at'] = datetime.now().isoformat()
+            self.last_update, self.last_error = summary, None
+            if summary['promoted']:
+                logger.info(f"Recommendation model updated to {summary['version']} "
+                            f"with {summary['outcomes_used']} outcomes in {summary['seconds']}s")
+            else:
+                logger.warning(f"Recommendation model update {summary['version']} scored worse than "
+                               f"{summary['base_version']}, keeping the served model: {summary['metrics']}")
+            return summary
+        except Exception as e:
+            self.last_error = str(e)
+            raise
+        finally:
+            self.state = self.IDLE
+            self._update_lock.release()
+
+    def _update(self) -> Dict:
+        """
+        Grow the base model on dataset + outcomes, publish it and swap it in
+
+        An update that scores worse than the base, on the training rows or on the
+        outcomes, is published without promotion (for inspection) and not served.
+        """
+        service = self.service
+        current = service.bundle
+        if current.version.startswith("dummy-"):
+            raise RuntimeError("No trained model to update")
+        base = self._base_bundle(current)
+        targets = base.crop_targets
+
+        # Outcomes of crops the model has no class for cannot be learned by growing it
+        records = np.array(self.store.read())
+        crops = decode_crops(records)
+        known = np.array([crop in targets for crop in crops], dtype=bool)
+        if not known.any():
+            raise RuntimeError("No stored outcome matches a crop the model knows")
+        outcome_features = records['features'][known].astype(np.float64)
+        outcome_labels = np.array([targets[crop] for crop, ok in zip(crops, known) if ok])
+
+        df = pd.read_csv(service.data_path)
+        df = df[df['label'].isin(targets)]
+        features = np.vstack([df[service.FEATURES].to_numpy(dtype=np.float64), outcome_features])
+        labels = np.concatenate([df['label'].map(targets).to_numpy(), outcome_labels])
+
+        scaled = service.scale_features(features, base.scaler)
+        outcome_scaled = scaled[-len(outcome_labels):]
+        accuracy_before = float(base.model.score(outcome_scaled, outcome_labels))
+        base_train_accuracy = float(base.model.score(scaled, labels))
+
+        # Fitting in another process keeps the GIL free for requests
+        fit_started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            model = pool.submit(warm_start_fit, base.model, scaled, labels, self.extra_estimators).result()
+        fit_seconds = time.perf_counter() - fit_started
+
+        train_accuracy = float(model.score(scaled, labels))
+        accuracy_after = float(model.score(outcome_scaled, outcome_labels))
+        promote = train_accuracy >= base_train_accuracy and accuracy_after >= accuracy_before
+        metrics = {
+            'train_accuracy': round(train_accuracy, 4),
+            'base_train_accuracy': round(base_train_accuracy, 4),
+            'outcome_accuracy_before': round(accuracy_before, 4),
+            'outcome_accuracy_after': round(accuracy_after, 4),
+            'train_rows': int(len(labels)),
+            'outcome_rows': int(len(outcome_labels)),
+            'fit_seconds': round(fit_seconds, 2)
+        }
+        update_info = {
+            'base_version': base.version,
+            'outcomes': int(len(records)),
+            'added_estimators': 0 if 'max_iter' in base.model.get_params() else self.extra_estimators
+        }
+        neighbors = NeighborIndex.build(features, np.array([base.reverse_targets[label] for label in labels]),
+                                        base.scaler)
+
+        version = None
+        try:
+            version_dir = write_version(
+                service.model_dir, model, base.scaler, base.reverse_targets, service.FEATURES, metrics,
+                {'update': update_info}, promote=promote, neighbors=neighbors
+            )
+            version = os.path.basename(version_dir)
+            if promote:
+                bundle = load_bundle(version_dir, service.FEATURES)
+            prune_versions(service.model_dir, self.keep_versions, protect=(base.version,))
+        except OSError as e:
+            if not promote:
+                logger.warning(f"Could not publish rejected model update: {e}")
+            else:
+                # Read-only model directory: serve the update from memory until restart
+                logger.warning(f"Could not publish updated model, serving it unpublished: {e}")
+                try:
+                    kernel = TreeEnsembleKernel.from_sklearn(model, base.scaler)
+                except (TypeError, ValueError):
+                    kernel = None
+                bundle = ModelBundle(
+                    f"{base.version}+{len(records)}", model, base.scaler, base.reverse_targets, kernel,
+                    manifest={'version': f"{base.version}+{len(records)}", 'metrics': metrics, 'update': update_info},
+                    neighbors=neighbors
+                )
+
+        if promote:
+            service.swap_bundle(bundle)
+            version = bundle.version
+            self._rejected_outcomes = 0
+        else:
+            self._rejected_outcomes = int(len(records))
+        return dict(update_info, version=version, promoted=promote, outcomes_used=int(len(outcome_labels)),
+                    outcomes_skipped=int((~known).sum()), metrics=metrics)
+
+    def get_status(self) -> Dict:
+        """
+        Get update state
+
+        Returns:
+            Dictionary with state, settings, store size, last update and last error
+        """
+        return {
+            'state': self.state,
+            'min_samples': self.min_samples,
+            'interval_seconds': self.interval_seconds,
+            'extra_estimators': self.extra_estimators,
+            'store': self.store.get_stats(),
+            'last_update': self.last_update,
+            'last_error': self.last_error
+        }
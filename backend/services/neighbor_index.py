@@ -0,0 +1,120 @@
+"""
+Neighbor Index
+KD-tree over the scaled recommendation dataset, for "similar historical samples" lookups
+"""
+
+import os
+from typing import Dict, Optional, Tuple
+import logging
+
+import joblib
+import numpy as np
+from sklearn.neighbors import KDTree
+
+logger = logging.getLogger(__name__)
+
+
+class NeighborIndex:
+    """
+    Nearest historical soil samples of a query
+
+    Rows are indexed in the model's MinMax-scaled feature space, so every feature
+    spans roughly [0, 1] and distances weigh them equally. A query costs O(log n)
+    tree descents instead of a scan, which keeps it cheap as regional data is
+    appended to the dataset.
+    """
+
+    def __init__(self, tree: KDTree, features: np.ndarray, labels: np.ndarray,
+                 scale: np.ndarray, offset: np.ndarray):
+        """
+        Initialize the index
+
+        Args:
+            tree: KD-tree over the scaled rows
+            features: Unscaled rows of shape (rows, n_features), returned with matches
+            labels: Crop name per row
+            scale: MinMaxScaler scale_
+            offset: MinMaxScaler min_
+        """
+        self.tree = tree
+        self.features = features
+        self.labels = labels
+        self.scale = scale
+        self.offset = offset
+
+    @classmethod
+    def build(cls, features: np.ndarray, labels: np.ndarray, scaler, leaf_size: int = 40) -> "NeighborIndex":
+        """
+        Index a dataset
+
+        Args:
+            features: Unscaled rows of shape (rows, n_features)
+            labels: Crop name per row
+            scaler: Fitted MinMaxScaler of the model
+            leaf_size: KD-tree leaf size
+
+        Returns:
+            NeighborIndex
+        """
+        features = np.ascontiguousarray(features, dtype=np.float64)
+        scale = np.asarray(scaler.scale_, dtype=np.float64)
+        offset = np.asarray(scaler.min_, dtype=np.float64)
+        tree = KDTree(features * scale + offset, leaf_size=leaf_size)
+        return cls(tree, features, np.asarray(labels).astype(str), scale, offset)
+
+    def query(self, features: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k nearest rows of each query
+
+        Args:
+            features: Unscaled queries of shape (rows, n_features)
+            k: Neighbors per query, capped at the index size
+
+        Returns:
+            Tuple of (distances, row indices), both of shape (rows, k), nearest first
+        """
+        features = np.asarray(features, dtype=np.float64).reshape(-1, self.features.shape[1])
+        k = max(1, min(k, len(self)))
+        return self.tree.query(features * self.scale + self.offset, k=k)
+
+    def __len__(self) -> int:
+        return len(self.features)
+
+    def save(self, path: str):
+        """
+        Save the index
+
+        Args:
+            path: Destination file, written atomically
+        """
+        tmp_path = f"{path}.tmp"
+        joblib.dump({
+            'tree': self.tree,
+            'features': self.features,
+            'labels': self.labels,
+            'scale': self.scale,
+            'offset': self.offset
+        }, tmp_path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: Optional[str] = None) -> "NeighborIndex":
+        """
+        Load an index saved with save()
+
+        Args:
+            path: Index file
+            mmap_mode: Passed to joblib.load; 'r' shares the rows between processes
+
+        Returns:
+            NeighborIndex
+        """
+        return cls(**joblib.load(path, mmap_mode=mmap_mode))
+
+    def get_info(self) -> Dict:
+        """Get index size"""
+        return {
+            'rows': len(self),
+            'features': int(self.features.shape[1]),
+            'crops': int(len(np.unique(self.labels)))
+        }
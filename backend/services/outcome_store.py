@@ -0,0 +1,138 @@
+"""
+Outcome Store
+Append-only binary log of labelled soil samples reported by growers
+"""
+
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MAGIC = b"SFOUTC01"
+HEADER_SIZE = 16
+LABEL_BYTES = 24
+
+# One fixed-size record per sample: 7 features, canonical crop ID, report time
+RECORD_DTYPE = np.dtype([
+    ('features', '<f4', (7,)),
+    ('crop', f'S{LABEL_BYTES}'),
+    ('reported_at', '<f8')
+])
+
+
+class OutcomeStore:
+    """
+    Fixed-width record file of crop outcomes
+
+    Records are appended under a lock and fsynced, and read back as a memory-mapped
+    structured array, so ingestion and model updates never parse text. A record torn
+    by a crash mid-append is ignored: only whole records are counted.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialize the store, creating the file if needed
+
+        Args:
+            path: Store file (env CROP_OUTCOME_STORE, default var/crop_outcomes.bin, a
+                  runtime directory kept apart from the versioned model artifacts)
+        """
+        self.path = path or os.getenv("CROP_OUTCOME_STORE") or os.path.join(BASE_DIR, "var", "crop_outcomes.bin")
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._lock:
+            if not os.path.exists(self.path) or os.path.getsize(self.path) < HEADER_SIZE:
+                with open(self.path, 'wb') as f:
+                    f.write(MAGIC.ljust(HEADER_SIZE, b'\0'))
+            else:
+                with open(self.path, 'rb') as f:
+                    if f.read(len(MAGIC)) != MAGIC:
+                        raise ValueError(f"{self.path} is not an outcome store")
+
+    def append(self, features: np.ndarray, crops: Sequence[str]) -> int:
+        """
+        Append labelled samples
+
+        Args:
+            features: Array of shape (rows, 7) in FEATURES order
+            crops: Canonical crop ID per row
+
+        Returns:
+            Number of records in the store after the append
+        """
+        features = np.asarray(features, dtype=np.float64).reshape(-1, RECORD_DTYPE['features'].shape[0])
+        if len(features) != len(crops):
+            raise ValueError("One crop per sample is required")
+
+        records = np.zeros(len(features), dtype=RECORD_DTYPE)
+        records['features'] = features
+        records['crop'] = [crop.encode('ascii')[:LABEL_BYTES] for crop in crops]
+        records['reported_at'] = time.time()
+
+        with self._lock:
+            with open(self.path, 'r+b') as f:
+                # Overwrite a torn tail record instead of appending after it
+                f.seek(HEADER_SIZE + self._count(f) * RECORD_DTYPE.itemsize)
+                f.write(records.tobytes())
+                f.truncate()
+                f.flush()
+                os.fsync(f.fileno())
+                return self._count(f)
+
+    @staticmethod
+    def _count(f) -> int:
+        """Whole records in an open store file"""
+        size = os.fstat(f.fileno()).st_size
+        return max(0, size - HEADER_SIZE) // RECORD_DTYPE.itemsize
+
+    def count(self) -> int:
+        """Number of records in the store"""
+        with open(self.path, 'rb') as f:
+            return self._count(f)
+
+    def read(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """
+        Read records
+
+        Args:
+            start: First record
+            stop: Record after the last one, defaults to the current end
+
+        Returns:
+            Read-only structured array of RECORD_DTYPE (memory-mapped when not empty)
+        """
+        total = self.count()
+        stop = total if stop is None else min(stop, total)
+        if stop <= start:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        return np.memmap(self.path, dtype=RECORD_DTYPE, mode='r',
+                         offset=HEADER_SIZE + start * RECORD_DTYPE.itemsize, shape=(stop - start,))
+
+    def crop_counts(self) -> Dict[str, int]:
+        """Number of records per crop"""
+        records = self.read()
+        crops, counts = np.unique(records['crop'], return_counts=True)
+        return {crop.decode('ascii'): int(count) for crop, count in zip(crops, counts)}
+
+    def get_stats(self) -> Dict:
+        """Get store size"""
+        records = self.count()
+        return {
+            'path': self.path,
+            'records': records,
+            'bytes': HEADER_SIZE + records * RECORD_DTYPE.itemsize,
+            'record_bytes': RECORD_DTYPE.itemsize
+        }
+
+
+def decode_crops(records: np.ndarray) -> List[str]:
+    """Crop IDs of store records as str"""
+    return [crop.decode('ascii') for crop in records['crop']]
@@ -0,0 +1,217 @@
+"""
+Prediction Cache
+Content-addressed cache of crop disease analyses, keyed by image bytes and model version
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+import logging
+
+from utils.lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionCache:
+    """
+    Two-tier cache in front of CropDiseaseService.predict
+
+    The memory tier is a bounded LRU. The optional disk tier stores one JSON file per
+    key under `cache_dir` and evicts the least recently used files once their total
+    size exceeds `max_disk_bytes`. Results are stored as JSON so every hit returns a
+    fresh copy that callers can safely mutate.
+    """
+
+    def __init__(self, model_version: str, max_entries: Optional[int] = None,
+                 cache_dir: Optional[str] = None, max_disk_mb: Optional[float] = None):
+        """
+        Initialize the cache
+
+        Args:
+            model_version: Version string of the loaded model, part of every key
+            max_entries: Memory tier capacity (env PREDICTION_CACHE_SIZE, default 1024, 0 disables)
+            cache_dir: Directory of the disk tier (env PREDICTION_CACHE_DIR, unset disables)
+            max_disk_mb: Disk tier size budget (env PREDICTION_CACHE_DISK_MB, default 256)
+        """
+        self.model_version = model_version
+        if max_entries is None:
+            max_entries = int(os.getenv("PREDICTION_CACHE_SIZE", 1024))
+        self.memory = LRUCache(max_entries)
+
+        self.cache_dir = cache_dir or os.getenv("PREDICTION_CACHE_DIR") or None
+        if max_disk_mb is None:
+            max_disk_mb = float(os.getenv("PREDICTION_CACHE_DISK_MB", 256))
+        self.max_disk_bytes = int(max_disk_mb * 1024 * 1024)
+
+        self.disk_hits = 0
+        self.disk_evictions = 0
+        self._disk_index: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._disk_lock = threading.Lock()
+
+        if self.cache_dir:
+            self._load_disk_index()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any tier is active"""
+        return self.memory.max_entries > 0 or bool(self.cache_dir)
+
+    def new_hasher(self):
+        """
+        Start an incremental cache key for an image received in chunks
+
+        Feed the image bytes with `update()`; `hexdigest()` then equals make_key(image_data).
+
+        Returns:
+            hashlib SHA-256 object seeded with the model version
+        """
+        return hashlib.sha256(self.model_version.encode('utf-8'))
+
+    def make_key(self, image_data: bytes) -> str:
+        """
+        Build the cache key for an image
+
+        Args:
+            image_data: Image data as bytes
+
+        Returns:
+            Hex SHA-256 of the model version and image bytes
+        """
+        digest = self.new_hasher()
+        digest.update(image_data)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Look up a cached analysis
+
+        Args:
+            key: Cache key from make_key
+
+        Returns:
+            A fresh copy of the cached result, or None on a miss
+        """
+        payload = self.memory.get(key)
+        if payload is None and self.cache_dir:
+            payload = self._disk_get(key)
+            if payload is not None:
+                self.disk_hits += 1
+                self.memory.put(key, payload)
+
+        return json.loads(payload) if payload is not None else None
+
+    def put(self, key: str, result: Dict):
+        """
+        Store an analysis result
+
+        Args:
+            key: Cache key from make_key
+            result: JSON-serializable analysis result
+        """
+        if not self.enabled:
+            return
+
+        payload = json.dumps(result)
+        self.memory.put(key, payload)
+        if self.cache_dir:
+            self._disk_put(key, payload)
+
+    def get_stats(self) -> Dict:
+        """
+        Get cache statistics
+
+        Returns:
+            Memory tier stats plus disk tier usage and hit counters
+        """
+        stats = {
+            'model_version': self.model_version,
+            'memory': self.memory.get_stats(),
+            'disk': None
+        }
+        if self.cache_dir:
+            stats['disk'] = {
+                'path': self.cache_dir,
+                'entries': len(self._disk_index),
+                'bytes': self._disk_bytes,
+                'max_bytes': self.max_disk_bytes,
+                'hits': self.disk_hits,
+                'evictions': self.disk_evictions
+            }
+        return stats
+
+    def _disk_path(self, key: str) -> str:
+        """Path of the file holding a key, sharded by prefix"""
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _load_disk_index(self):
+        """Rebuild the LRU order of the disk tier from file modification times"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            files = []
+            for root, _, names in os.walk(self.cache_dir):
+                for name in names:
+                    if name.endswith('.json'):
+                        stat = os.stat(os.path.join(root, name))
+                        files.append((stat.st_mtime, name[:-5], stat.st_size))
+
+            for _, key, size in sorted(files):
+                self._disk_index[key] = size
+                self._disk_bytes += size
+            logger.info(f"Prediction cache: {len(files)} entries on disk at {self.cache_dir}")
+            self._evict_disk()
+        except Exception as e:
+            logger.error(f"Error loading prediction cache from {self.cache_dir}: {e}")
+            self.cache_dir = None
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        """Read a payload from disk and refresh its recency"""
+        with self._disk_lock:
+            if key not in self._disk_index:
+                return None
+            self._disk_index.move_to_end(key)
+
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r') as f:
+                payload = f.read()
+            os.utime(path)
+            return payload
+        except OSError:
+            with self._disk_lock:
+                self._disk_bytes -= self._disk_index.pop(key, 0)
+            return None
+
+    def _disk_put(self, key: str, payload: str):
+        """Write a payload to disk atomically and evict over budget"""
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write prediction cache entry: {e}")
+            return
+
+        size = len(payload)
+        with self._disk_lock:
+            self._disk_bytes += size - self._disk_index.pop(key, 0)
+            self._disk_index[key] = size
+            self._evict_disk()
+
+    def _evict_disk(self):
+        """Remove least recently used files until the tier fits its budget"""
+        while self._disk_bytes > self.max_disk_bytes and self._disk_index:
+            key, size = self._disk_index.popitem(last=False)
+            self._disk_bytes -= size
+            self.disk_evictions += 1
+            try:
+                os.remove(self._disk_path(key))
+            except OSError:
+                pass
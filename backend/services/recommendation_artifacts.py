@@ -0,0 +1,293 @@
+"""
+Crop Recommendation Artifacts
+Versioned on-disk layout of trained recommendation models and the bundle the service serves
+
+Layout:
+    models/crop_recommendation/
+        LATEST                      version served by default
+        <version>/
+            manifest.json           hashes, metrics, feature order, class map
+            model.joblib            Selected classifier
+            scaler.joblib           MinMaxScaler
+            kernel.joblib           TreeEnsembleKernel arrays (GradientBoostingClassifier only)
+            neighbors.joblib        NeighborIndex over the training dataset
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+import logging
+
+import joblib
+import numpy as np
+
+from services.neighbor_index import NeighborIndex
+from services.tree_kernel import TreeEnsembleKernel
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+LATEST_FILE = "LATEST"
+MODEL_FILE = "model.joblib"
+SCALER_FILE = "scaler.joblib"
+KERNEL_FILE = "kernel.joblib"
+NEIGHBORS_FILE = "neighbors.joblib"
+
+
+class ModelBundle:
+    """
+    Everything needed to score one model version
+
+    The service swaps whole bundles, so a request always sees a model, scaler, kernel
+    and class map that belong together.
+    """
+
+    __slots__ = ('version', 'model', 'scaler', 'kernel', 'neighbors', 'reverse_targets', 'class_labels',
+                 'manifest', 'path')
+
+    def __init__(self, version: str, model, scaler, reverse_targets: Dict[int, str],
+                 kernel: Optional[TreeEnsembleKernel] = None, manifest: Optional[Dict] = None,
+                 path: Optional[str] = None, neighbors: Optional[NeighborIndex] = None):
+        """
+        Initialize the bundle
+
+        Args:
+            version: Model version, part of every cache key
+            model: Fitted classifier
+            scaler: Fitted scaler, or None
+            reverse_targets: Class index to crop name
+            kernel: Optional NumPy tree kernel for the model
+            manifest: Manifest of a versioned artifact
+            path: Directory or file the model was loaded from
+            neighbors: Optional index of the historical samples
+        """
+        self.version = version
+        self.model = model
+        self.scaler = scaler
+        self.kernel = kernel
+        self.neighbors = neighbors
+        self.reverse_targets = reverse_targets
+        self.manifest = manifest
+        self.path = path
+        # Crop names in predict_proba column order
+        self.class_labels = np.array([reverse_targets.get(int(c), f"Crop_{c}") for c in model.classes_])
+
+    @property
+    def crop_targets(self) -> Dict[str, int]:
+        """Crop name to class index"""
+        return {name: index for index, name in self.reverse_targets.items()}
+
+    def get_info(self) -> Dict:
+        """Get version, source and training metrics"""
+        return {
+            'version': self.version,
+            'path': self.path,
+            'created_at': self.manifest.get('created_at') if self.manifest else None,
+            'metrics': self.manifest.get('metrics') if self.manifest else None
+        }
+
+
+def file_sha256(path: str) -> str:
+    """Hex SHA-256 of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def latest_version(root: str) -> Optional[str]:
+    """
+    Read the version LATEST points to
+
+    Args:
+        root: Artifact root directory
+
+    Returns:
+        Version name, or None when nothing was published
+    """
+    try:
+        with open(os.path.join(root, LATEST_FILE), 'r') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def list_versions(root: str) -> List[str]:
+    """Published version directories, oldest first"""
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        name for name in os.listdir(root)
+        if os.path.isfile(os.path.join(root, name, MANIFEST_FILE))
+    )
+
+
+def load_bundle(version_dir: str, features: List[str], mmap_mode: Optional[str] = 'r') -> ModelBundle:
+    """
+    Load a published version
+
+    Arrays are memory-mapped read-only by default, so forked workers share their pages.
+
+    Args:
+        version_dir: Version directory
+        features: Feature order the caller will pass, checked against the manifest
+        mmap_mode: joblib mmap mode, None to read into memory
+
+    Returns:
+        ModelBundle
+
+    Raises:
+        ValueError: If the files do not match the manifest
+    """
+    with open(os.path.join(version_dir, MANIFEST_FILE), 'r') as f:
+        manifest = json.load(f)
+
+    if manifest['features'] != list(features):
+        raise ValueError(f"Feature order {manifest['features']} does not match {list(features)}")
+    for name, info in manifest['files'].items():
+        if file_sha256(os.path.join(version_dir, name)) != info['sha256']:
+            raise ValueError(f"{name} does not match its manifest hash")
+
+    model = joblib.load(os.path.join(version_dir, MODEL_FILE), mmap_mode=mmap_mode)
+    scaler = joblib.load(os.path.join(version_dir, SCALER_FILE), mmap_mode=mmap_mode)
+    reverse_targets = {int(index): name for index, name in manifest['classes'].items()}
+
+    kernel = None
+    if KERNEL_FILE in manifest['files']:
+        try:
+            kernel = TreeEnsembleKernel.load(os.path.join(version_dir, KERNEL_FILE), mmap_mode=mmap_mode)
+            kernel.check_parity(model, scaler)
+        except Exception as e:
+            logger.warning(f"Tree kernel of {manifest['version']} unusable, using sklearn: {e}")
+            kernel = None
+
+    neighbors = None
+    if NEIGHBORS_FILE in manifest['files']:
+        try:
+            neighbors = NeighborIndex.load(os.path.join(version_dir, NEIGHBORS_FILE), mmap_mode=mmap_mode)
+        except Exception as e:
+            logger.warning(f"Neighbor index of {manifest['version']} unusable: {e}")
+
+    return ModelBundle(manifest['version'], model, scaler, reverse_targets, kernel, manifest, version_dir, neighbors)
+
+
+def write_version(root: str, model, scaler, reverse_targets: Dict[int, str], features: List[str],
+                  metrics: Dict, extra: Optional[Dict] = None, promote: bool = True,
+                  neighbors: Optional[NeighborIndex] = None) -> str:
+    """
+    Publish a trained model as a new version
+
+    The version is written to a staging directory and renamed into place, and LATEST
+    is replaced atomically, so a loading service never sees a partial version.
+
+    Args:
+        root: Artifact root directory
+        model: Fitted classifier (a tree kernel is exported for GradientBoostingClassifier)
+        scaler: Fitted MinMaxScaler
+        reverse_targets: Class index to crop name
+        features: Feature order the model was trained on
+        metrics: Evaluation metrics
+        extra: Additional manifest fields (training data, parameters, ...)
+        promote: Point LATEST at the new version
+        neighbors: Index of the historical samples, saved next to the model
+
+    Returns:
+        Path of the version directory
+    """
+    import sklearn
+
+    os.makedirs(root, exist_ok=True)
+    created_at = datetime.now()
+    staging = os.path.join(root, f".staging-{created_at:%Y%m%d%H%M%S%f}")
+    os.makedirs(staging)
+
+    try:
+        joblib.dump(model, os.path.join(staging, MODEL_FILE))
+        joblib.dump(scaler, os.path.join(staging, SCALER_FILE))
+        try:
+            TreeEnsembleKernel.from_sklearn(model, scaler).save(os.path.join(staging, KERNEL_FILE))
+        except TypeError as e:
+            # Other model families are served by sklearn alone
+            logger.info(f"No tree kernel for this model: {e}")
+        except Exception as e:
+            logger.warning(f"Tree kernel not exported: {e}")
+        if neighbors is not None:
+            neighbors.save(os.path.join(staging, NEIGHBORS_FILE))
+
+        files = {
+            name: {'sha256': file_sha256(os.path.join(staging, name)),
+                   'bytes': os.path.getsize(os.path.join(staging, name))}
+            for name in (MODEL_FILE, SCALER_FILE, KERNEL_FILE, NEIGHBORS_FILE)
+            if os.path.exists(os.path.join(staging, name))
+        }
+        version = f"{created_at:%Y%m%d-%H%M%S}-{files[MODEL_FILE]['sha256'][:8]}"
+
+        manifest = {
+            'version': version,
+            'created_at': created_at.isoformat(),
+            'model_type': type(model).__name__,
+            'features': list(features),
+            'classes': {str(index): name for index, name in sorted(reverse_targets.items())},
+            'metrics': metrics,
+            'files': files,
+            'library_versions': {
+                'scikit-learn': sklearn.__version__,
+                'numpy': np.__version__,
+                'joblib': joblib.__version__
+            }
+        }
+        manifest.update(extra or {})
+        with open(os.path.join(staging, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2, default=str)
+
+        version_dir = os.path.join(root, version)
+        os.rename(staging, version_dir)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    if promote:
+        promote_version(root, version)
+    return version_dir
+
+
+def promote_version(root: str, version: str):
+    """
+    Point LATEST at a version
+
+    Args:
+        root: Artifact root directory
+        version: Published version name
+    """
+    if not os.path.isfile(os.path.join(root, version, MANIFEST_FILE)):
+        raise ValueError(f"Unknown version: {version}")
+    tmp_path = os.path.join(root, f"{LATEST_FILE}.tmp")
+    with open(tmp_path, 'w') as f:
+        f.write(version + "\n")
+    os.replace(tmp_path, os.path.join(root, LATEST_FILE))
+
+
+def prune_versions(root: str, keep: int, protect: Sequence[str] = ()) -> List[str]:
+    """
+    Delete the oldest versions, never the one LATEST points to
+
+    Args:
+        root: Artifact root directory
+        keep: Number of most recent versions to keep
+        protect: Versions never deleted (e.g. the base of incremental updates)
+
+    Returns:
+        Removed version names
+    """
+    kept = {latest_version(root), *protect}
+    versions = list_versions(root)
+    removed = []
+    for version in versions[:max(0, len(versions) - keep)]:
+        if version not in kept:
+            shutil.rmtree(os.path.join(root, version), ignore_errors=True)
+            removed.append(version)
+    return removed
@@ -0,0 +1,160 @@
+"""
+TFLite Interpreter Pool
+Thread-local TFLite interpreters with preallocated, fixed-shape batched tensors
+"""
+
+import os
+import threading
+from typing import Dict, List, Optional
+import logging
+
+import numpy as np
+import tensorflow as tf
+
+logger = logging.getLogger(__name__)
+
+
+class _BoundInterpreter:
+    """An interpreter allocated for one input shape, with its tensor details resolved once"""
+
+    __slots__ = ('interpreter', 'batch_size', 'input_index', 'input_dtype', 'input_quantization',
+                 'output_index', 'output_quantization')
+
+    def __init__(self, model_path: str, input_shape: tuple, num_threads: int):
+        self.interpreter = tf.lite.Interpreter(model_path=model_path, num_threads=num_threads)
+
+        input_detail = self.interpreter.get_input_details()[0]
+        if tuple(input_detail['shape']) != input_shape:
+            self.interpreter.resize_tensor_input(input_detail['index'], input_shape, strict=False)
+        self.interpreter.allocate_tensors()
+
+        input_detail = self.interpreter.get_input_details()[0]
+        output_detail = self.interpreter.get_output_details()[0]
+        self.batch_size = input_shape[0]
+        self.input_index = input_detail['index']
+        self.input_dtype = input_detail['dtype']
+        self.input_quantization = input_detail['quantization']
+        self.output_index = output_detail['index']
+        self.output_quantization = output_detail['quantization'] if output_detail['dtype'] != np.float32 else None
+
+    def invoke(self, batch: np.ndarray) -> np.ndarray:
+        """Run a batch that exactly matches the allocated shape"""
+        if self.input_dtype != np.float32:
+            # Integer-input model: quantize with the input tensor's scale and zero point
+            scale, zero_point = self.input_quantization
+            info = np.iinfo(self.input_dtype)
+            batch = np.clip(np.round(batch / scale + zero_point), info.min, info.max)
+        self.interpreter.set_tensor(self.input_index, batch.astype(self.input_dtype, copy=False))
+        self.interpreter.invoke()
+
+        output = self.interpreter.get_tensor(self.output_index)
+        if self.output_quantization is not None:
+            scale, zero_point = self.output_quantization
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+
+class TFLiteInterpreterPool:
+    """
+    One set of TFLite interpreters per worker thread
+
+    A tf.lite.Interpreter is not thread-safe, so each thread lazily builds its own.
+    Tensors are allocated once per shape and batches are zero-padded up to the next
+    power-of-two bucket (capped at `max_batch_size`), so a thread keeps at most a
+    handful of fixed-shape interpreters and never reallocates on the request path.
+    """
+
+    def __init__(self, model_path: str, max_batch_size: int = 16,
+                 input_shape: tuple = (224, 224, 3), num_threads: Optional[int] = None):
+        """
+        Initialize the pool
+
+        Args:
+            model_path: Path to the .tflite model
+            max_batch_size: Largest batch a single invoke handles
+            input_shape: Per-image input shape
+            num_threads: Threads per interpreter (env TFLITE_NUM_THREADS, default 1)
+        """
+        self.model_path = model_path
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.input_shape = tuple(input_shape)
+        self.num_threads = num_threads or int(os.getenv("TFLITE_NUM_THREADS", 1))
+        self.buckets = self._batch_buckets(self.max_batch_size)
+
+        self._local = threading.local()
+        self._count_lock = threading.Lock()
+        self.interpreters_created = 0
+
+        # Fail fast on a broken model file, and warm the calling thread
+        self._get_interpreter(1)
+
+    @staticmethod
+    def _batch_buckets(max_batch_size: int) -> List[int]:
+        """Powers of two up to the maximum batch size, plus the maximum itself"""
+        buckets = []
+        size = 1
+        while size < max_batch_size:
+            buckets.append(size)
+            size *= 2
+        buckets.append(max_batch_size)
+        return buckets
+
+    def _bucket_for(self, rows: int) -> int:
+        """Smallest allocated batch size that fits the rows"""
+        for bucket in self.buckets:
+            if rows <= bucket:
+                return bucket
+        return self.max_batch_size
+
+    def _get_interpreter(self, batch_size: int) -> _BoundInterpreter:
+        """Get this thread's interpreter for a batch size, building it on first use"""
+        interpreters: Dict[int, _BoundInterpreter] = getattr(self._local, 'interpreters', None)
+        if interpreters is None:
+            interpreters = self._local.interpreters = {}
+
+        bound = interpreters.get(batch_size)
+        if bound is None:
+            bound = _BoundInterpreter(self.model_path, (batch_size,) + self.input_shape, self.num_threads)
+            interpreters[batch_size] = bound
+            with self._count_lock:
+                self.interpreters_created += 1
+            logger.info(f"TFLite interpreter allocated for batch {batch_size} on {threading.current_thread().name}")
+        return bound
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        """
+        Run inference on a batch of any size
+
+        Args:
+            batch: Preprocessed images of shape (B, 224, 224, 3)
+
+        Returns:
+            Class probabilities of shape (B, num_classes)
+        """
+        outputs = []
+        for start in range(0, len(batch), self.max_batch_size):
+            chunk = batch[start:start + self.max_batch_size]
+            rows = len(chunk)
+            bound = self._get_interpreter(self._bucket_for(rows))
+
+            if rows < bound.batch_size:
+                padded = np.zeros((bound.batch_size,) + self.input_shape, dtype=np.float32)
+                padded[:rows] = chunk
+                chunk = padded
+            else:
+                # Strided views (e.g. image tiles) must be packed before set_tensor
+                chunk = np.ascontiguousarray(chunk)
+
+            # Copy out of the interpreter's buffer before the next invoke reuses it
+            outputs.append(np.array(bound.invoke(chunk)[:rows]))
+
+        return outputs[0] if len(outputs) == 1 else np.concatenate(outputs, axis=0)
+
+    def get_info(self) -> Dict:
+        """Get pool configuration"""
+        return {
+            'model_path': self.model_path,
+            'batch_buckets': self.buckets,
+            'threads_per_interpreter': self.num_threads,
+            'interpreters_created': self.interpreters_created
+        }
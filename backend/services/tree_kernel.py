@@ -0,0 +1,286 @@
+"""
+Tree Ensemble Kernel
+Array-backed GradientBoostingClassifier + MinMaxScaler inference in plain NumPy
+"""
+
+import os
+from typing import Dict, Optional
+import logging
+
+import joblib
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Largest absolute probability difference tolerated against sklearn at export time
+PARITY_TOLERANCE = 1e-9
+
+
+class TreeEnsembleKernel:
+    """
+    Flattened gradient boosting ensemble
+
+    Every tree is padded to a perfect binary tree of the ensemble's depth and stored
+    in shared (trees, nodes) arrays, so a child is found by index arithmetic
+    (2i+1 / 2i+2) and a batch walks all trees at once for `max_depth` steps, with no
+    per-tree Python loop and no sklearn input validation. Inputs are compared in
+    float32 like sklearn's tree code, against thresholds rounded down to float32,
+    which takes exactly the same branch at every split.
+    """
+
+    # Padding grows as 2^depth per tree
+    MAX_DEPTH = 12
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, leaf_value: np.ndarray,
+                 init_raw: np.ndarray, learning_rate: float, classes: np.ndarray,
+                 scale: Optional[np.ndarray] = None, offset: Optional[np.ndarray] = None):
+        """
+        Initialize the kernel from flattened arrays
+
+        Args:
+            feature: Split feature per internal node, shape (trees, 2^depth - 1)
+            threshold: float32 split threshold per internal node, same shape (+inf below leaves)
+            leaf_value: Output per leaf slot, shape (trees, 2^depth)
+            init_raw: Raw score of the init estimator per output
+            learning_rate: Shrinkage applied to every tree
+            classes: Class labels in probability column order
+            scale: MinMaxScaler scale_, or None when inputs are already scaled
+            offset: MinMaxScaler min_
+        """
+        self.feature = feature
+        self.threshold = threshold
+        self.leaf_value = leaf_value
+        self.init_raw = init_raw
+        self.learning_rate = float(learning_rate)
+        self.classes = classes
+        self.scale = scale
+        self.offset = offset
+
+        self.n_trees, self.n_internal = feature.shape
+        self.max_depth = int(np.log2(leaf_value.shape[1]))
+        self.trees_per_stage = len(init_raw)
+
+        # Flat views and per-tree offsets used by the traversal
+        self._feature_flat = feature.ravel()
+        self._threshold_flat = threshold.ravel()
+        self._leaf_flat = leaf_value.ravel()
+        self._tree_base = (np.arange(self.n_trees, dtype=np.int32) * self.n_internal)[np.newaxis, :]
+        self._leaf_base = (np.arange(self.n_trees, dtype=np.int32) * leaf_value.shape[1])[np.newaxis, :]
+
+    @classmethod
+    def from_sklearn(cls, model, scaler=None) -> "TreeEnsembleKernel":
+        """
+        Flatten a fitted GradientBoostingClassifier (and optional MinMaxScaler)
+
+        Args:
+            model: Fitted GradientBoostingClassifier
+            scaler: Fitted MinMaxScaler applied before the model, or None
+
+        Returns:
+            TreeEnsembleKernel
+
+        Raises:
+            TypeError: If the model or scaler type is not supported
+            ValueError: If the trees are too deep or the kernel does not match sklearn
+        """
+        from sklearn.ensemble import GradientBoostingClassifier
+        from sklearn.preprocessing import MinMaxScaler
+
+        if not isinstance(model, GradientBoostingClassifier):
+            raise TypeError(f"Unsupported model type: {type(model).__name__}")
+        if scaler is not None and not isinstance(scaler, MinMaxScaler):
+            raise TypeError(f"Unsupported scaler type: {type(scaler).__name__}")
+
+        estimators = model.estimators_.ravel()
+        depth = max(1, max(estimator.tree_.max_depth for estimator in estimators))
+        if depth > cls.MAX_DEPTH:
+            raise ValueError(f"Trees of depth {depth} are too deep to flatten")
+
+        n_internal, n_leaves = 2 ** depth - 1, 2 ** depth
+        feature = np.zeros((len(estimators), n_internal), dtype=np.int32)
+        threshold = np.full((len(estimators), n_internal), np.inf, dtype=np.float32)
+        leaf_value = np.zeros((len(estimators), n_leaves), dtype=np.float64)
+
+        for index, estimator in enumerate(estimators):
+            tree = estimator.tree_
+            stack = [(0, 0, 0)]  # (sklearn node, perfect-tree slot, depth)
+            while stack:
+                node, slot, node_depth = stack.pop()
+                if tree.children_left[node] < 0:
+                    # Slots below a leaf keep threshold +inf and always go left; every
+                    # leaf slot under it carries the leaf's value
+                    first = last = slot
+                    for _ in range(depth - node_depth):
+                        first, last = 2 * first + 1, 2 * last + 2
+                    leaf_value[index, first - n_internal:last - n_internal + 1] = tree.value[node, 0, 0]
+                    continue
+
+                feature[index, slot] = tree.feature[node]
+                threshold[index, slot] = _round_down_float32(tree.threshold[node])
+                stack.append((tree.children_left[node], 2 * slot + 1, node_depth + 1))
+                stack.append((tree.children_right[node], 2 * slot + 2, node_depth + 1))
+
+        kernel = cls(
+            feature=feature,
+            threshold=threshold,
+            leaf_value=leaf_value,
+            init_raw=np.zeros(model.estimators_.shape[1]),
+            learning_rate=model.learning_rate,
+            classes=np.asarray(model.classes_),
+            scale=np.asarray(scaler.scale_, dtype=np.float64) if scaler is not None else None,
+            offset=np.asarray(scaler.min_, dtype=np.float64) if scaler is not None else None
+        )
+
+        # The init estimator's raw score is constant per output: whatever the trees do not explain
+        probe = np.zeros((1, model.n_features_in_))
+        raw = np.asarray(model.decision_function(probe), dtype=np.float64).reshape(1, -1)
+        kernel.init_raw = raw[0] - kernel.learning_rate * kernel._tree_sum(kernel._prepare(probe, scaled=True))[0]
+
+        kernel.check_parity(model, scaler)
+        return kernel
+
+    def _prepare(self, features: np.ndarray, scaled: bool = False) -> np.ndarray:
+        """Scale raw features and cast to float32 the way sklearn does before tree traversal"""
+        features = np.asarray(features, dtype=np.float64)
+        if not scaled and self.scale is not None:
+            features = features * self.scale + self.offset
+        return np.ascontiguousarray(features, dtype=np.float32)
+
+    def _tree_sum(self, x: np.ndarray) -> np.ndarray:
+        """Sum of leaf values per output for prepared rows, shape (rows, trees_per_stage)"""
+        rows, n_features = x.shape
+        x_flat = x.ravel()
+        row_base = (np.arange(rows, dtype=np.int32) * n_features)[:, np.newaxis]
+
+        slot = np.zeros((rows, self.n_trees), dtype=np.int32)
+        for _ in range(self.max_depth):
+            node = self._tree_base + slot
+            go_right = x_flat[row_base + self._feature_flat[node]] > self._threshold_flat[node]
+            slot = 2 * slot + 1 + go_right
+
+        leaf_values = self._leaf_flat[self._leaf_base + slot - self.n_internal]
+        return leaf_values.reshape(rows, -1, self.trees_per_stage).sum(axis=1)
+
+    def decision_function(self, features: np.ndarray, chunk_size: int = 256) -> np.ndarray:
+        """
+        Raw scores for a batch
+
+        Args:
+            features: Unscaled features of shape (rows, n_features)
+            chunk_size: Rows walked at once, bounds the (rows, trees) working arrays
+
+        Returns:
+            Raw scores of shape (rows, trees_per_stage)
+        """
+        x = self._prepare(features)
+        raw = np.empty((len(x), self.trees_per_stage))
+        for start in range(0, len(x), chunk_size):
+            chunk = x[start:start + chunk_size]
+            raw[start:start + len(chunk)] = self._tree_sum(chunk)
+        return self.init_raw + self.learning_rate * raw
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """
+        Class probabilities for a batch
+
+        Args:
+            features: Unscaled features of shape (rows, n_features)
+
+        Returns:
+            Probabilities of shape (rows, n_classes), columns in `classes` order
+        """
+        raw = self.decision_function(features)
+        if self.trees_per_stage == 1:
+            positive = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+
+        raw -= raw.max(axis=1, keepdims=True)
+        np.exp(raw, out=raw)
+        raw /= raw.sum(axis=1, keepdims=True)
+        return raw
+
+    def check_parity(self, model, scaler=None, rows: int = 256, seed: int = 0) -> float:
+        """
+        Compare probabilities with sklearn on random inputs spanning the scaler's range
+
+        Args:
+            model: The sklearn model the kernel was built from
+            scaler: The scaler the kernel was built with
+            rows: Number of random rows
+            seed: Random seed
+
+        Returns:
+            Largest absolute probability difference
+
+        Raises:
+            ValueError: If the difference exceeds PARITY_TOLERANCE
+        """
+        rng = np.random.default_rng(seed)
+        if scaler is not None:
+            low, high = scaler.data_min_, scaler.data_max_
+            span = np.where(high > low, high - low, 1.0)
+            features = low - 0.1 * span + rng.random((rows, len(low))) * 1.2 * span
+            expected = model.predict_proba(features * scaler.scale_ + scaler.min_)
+        else:
+            features = rng.random((rows, model.n_features_in_))
+            expected = model.predict_proba(features)
+
+        difference = float(np.abs(self.predict_proba(features) - expected).max())
+        if difference > PARITY_TOLERANCE:
+            raise ValueError(f"Tree kernel differs from sklearn by {difference:.3g}")
+        return difference
+
+    def save(self, path: str):
+        """
+        Save the flattened arrays
+
+        Arrays are stored uncompressed so load() can memory-map them.
+
+        Args:
+            path: Destination file, written atomically
+        """
+        arrays = {
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'leaf_value': self.leaf_value,
+            'init_raw': self.init_raw,
+            'learning_rate': self.learning_rate,
+            'classes': self.classes,
+            'scale': self.scale,
+            'offset': self.offset
+        }
+        tmp_path = f"{path}.tmp"
+        joblib.dump(arrays, tmp_path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: Optional[str] = None) -> "TreeEnsembleKernel":
+        """
+        Load a kernel saved with save()
+
+        Args:
+            path: Kernel file
+            mmap_mode: Passed to joblib.load; 'r' shares the arrays between processes
+
+        Returns:
+            TreeEnsembleKernel
+        """
+        return cls(**joblib.load(path, mmap_mode=mmap_mode))
+
+    def get_info(self) -> Dict:
+        """Get kernel size and shape"""
+        return {
+            'trees': self.n_trees,
+            'nodes_per_tree': self.n_internal + self.leaf_value.shape[1],
+            'max_depth': self.max_depth,
+            'classes': int(len(self.classes)),
+            'includes_scaler': self.scale is not None
+        }
+
+
+def _round_down_float32(value: float) -> np.float32:
+    """Largest float32 not above value, so float32(x) <= it exactly when float32(x) <= value"""
+    rounded = np.float32(value)
+    if float(rounded) > value:
+        rounded = np.nextafter(rounded, np.float32(-np.inf))
+    return rounded
@@ -0,0 +1,95 @@
+"""
+Inference Executors
+Keeps CPU-heavy image and model work off the asyncio event loop
+"""
+
+import asyncio
+import functools
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceExecutor:
+    """
+    Configurable executor pool for inference work
+
+    Blocking calls (model forward passes, service methods) always run on a thread pool.
+    Pure CPU-bound functions such as image decoding run on a process pool when
+    `mode` is "process", otherwise on the same thread pool. PIL and TensorFlow release
+    the GIL for most of their work, so threads are the default.
+    """
+
+    def __init__(self, mode: Optional[str] = None, max_workers: Optional[int] = None, name: str = "inference"):
+        """
+        Initialize the executor
+
+        Args:
+            mode: "thread" or "process" (env INFERENCE_EXECUTOR, default "thread")
+            max_workers: Pool size (env INFERENCE_WORKERS, default TF intra-op threads / CPU count)
+            name: Thread name prefix and log label, to tell several executors apart
+        """
+        self.name = name
+        self.mode = (mode or os.getenv("INFERENCE_EXECUTOR", "thread")).lower()
+        if self.mode not in ("thread", "process"):
+            logger.warning(f"Unknown INFERENCE_EXECUTOR '{self.mode}', using thread")
+            self.mode = "thread"
+
+        self.max_workers = max_workers or int(os.getenv("INFERENCE_WORKERS", 0)) or self._default_workers()
+
+        self._thread_pool = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix=name
+        )
+        self._process_pool: Optional[Executor] = None
+        if self.mode == "process":
+            # Spawned workers only import the pure decoding helpers, never TensorFlow
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+
+        logger.info(f"{name.capitalize()} executor: {self.mode} pool with {self.max_workers} workers")
+
+    @staticmethod
+    def _default_workers() -> int:
+        """Size the pool to TF's intra-op thread count, falling back to the CPU count"""
+        intra_op = int(os.getenv("TF_NUM_INTRAOP_THREADS", 0))
+        return intra_op or os.cpu_count() or 4
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a blocking callable on the thread pool and await its result"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._thread_pool, functools.partial(fn, *args, **kwargs))
+
+    async def run_cpu(self, fn: Callable, *args) -> Any:
+        """
+        Run a pure CPU-bound function, on the process pool when configured
+
+        Args:
+            fn: Module-level (picklable) function
+            *args: Picklable arguments
+
+        Returns:
+            Function result
+        """
+        loop = asyncio.get_running_loop()
+        pool = self._process_pool or self._thread_pool
+        return await loop.run_in_executor(pool, functools.partial(fn, *args))
+
+    def get_info(self) -> Dict:
+        """Get executor configuration"""
+        return {
+            'name': self.name,
+            'mode': self.mode,
+            'max_workers': self.max_workers
+        }
+
+    def shutdown(self):
+        """Shut down the pools"""
+        self._thread_pool.shutdown(wait=False, cancel_futures=True)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
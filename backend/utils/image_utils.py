@@ -0,0 +1,229 @@
+"""
+Image Utilities
+Pure image decoding helpers, kept free of TensorFlow so they can run in worker processes
+"""
+
+import io
+import math
+from typing import BinaryIO, Dict, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+# Modes accepted from uploads, everything else is rejected before decoding pixels
+SUPPORTED_MODES = ('RGB', 'RGBA', 'L')
+
+
+class ImageDecodeError(ValueError):
+    """Raised when uploaded bytes are not a supported image"""
+
+
+class DecodedImage:
+    """Model-ready pixels plus the metadata of the original upload"""
+
+    __slots__ = ('array', 'size', 'format', 'mode')
+
+    def __init__(self, array: np.ndarray, size: Tuple[int, int], format: str, mode: str):
+        self.array = array
+        self.size = size
+        self.format = format
+        self.mode = mode
+
+    def get_info(self) -> Dict:
+        """Get the original image metadata"""
+        return {
+            'size': self.size,
+            'format': self.format,
+            'mode': self.mode
+        }
+
+
+def decode_image(image_data: Union[bytes, BinaryIO], target_size: Tuple[int, int] = (224, 224)) -> DecodedImage:
+    """
+    Validate and preprocess an uploaded image in a single decode
+
+    JPEGs are decoded in draft mode, letting libjpeg scale the DCT by 1/2, 1/4 or 1/8
+    so a 12 MP photo is decoded close to the target size instead of at full resolution.
+
+    Args:
+        image_data: Image data as bytes, or a seekable binary file object positioned at
+            the start of the image (read in place, without copying it to bytes)
+        target_size: Target size for resizing
+
+    Returns:
+        DecodedImage with a normalized float32 array of shape (1, height, width, 3)
+
+    Raises:
+        ImageDecodeError: If the data is not a supported image
+    """
+    if isinstance(image_data, (bytes, bytearray, memoryview)):
+        image_data = io.BytesIO(image_data)
+
+    try:
+        image = Image.open(image_data)
+    except Exception:
+        raise ImageDecodeError("Invalid image data")
+
+    # Header fields are available before any pixels are decoded
+    size, image_format, mode = image.size, image.format, image.mode
+    if mode not in SUPPORTED_MODES:
+        raise ImageDecodeError("Unsupported image format")
+
+    try:
+        if image_format == 'JPEG':
+            image.draft('RGB', target_size)
+
+        # Convert to RGB if necessary
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        # Resize image
+        image = image.resize(target_size)
+
+        # Convert to array, normalize and add batch dimension
+        image_array = np.asarray(image, dtype=np.float32) / 255.0
+    except Exception:
+        raise ImageDecodeError("Invalid image data")
+
+    return DecodedImage(np.expand_dims(image_array, axis=0), size, image_format, mode)
+
+
+class TileGrid:
+    """Layout of overlapping square tiles over a resized image"""
+
+    __slots__ = ('rows', 'cols', 'tile_size', 'stride', 'source_size')
+
+    def __init__(self, rows: int, cols: int, tile_size: int, stride: int, source_size: Tuple[int, int]):
+        self.rows = rows
+        self.cols = cols
+        self.tile_size = tile_size
+        self.stride = stride
+        self.source_size = source_size
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """(width, height) the image is resized to so the tiles cover it exactly"""
+        return ((self.cols - 1) * self.stride + self.tile_size,
+                (self.rows - 1) * self.stride + self.tile_size)
+
+    def tile_box(self, row: int, col: int) -> Tuple[int, int, int, int]:
+        """(x, y, width, height) of a tile in original image pixels"""
+        scale_x = self.source_size[0] / self.size[0]
+        scale_y = self.source_size[1] / self.size[1]
+        return (int(round(col * self.stride * scale_x)), int(round(row * self.stride * scale_y)),
+                int(round(self.tile_size * scale_x)), int(round(self.tile_size * scale_y)))
+
+    def get_info(self) -> Dict:
+        """Get the grid layout"""
+        return {
+            'rows': self.rows,
+            'cols': self.cols,
+            'tile_size': self.tile_size,
+            'stride': self.stride,
+            'scale': round(self.size[0] / self.source_size[0], 4),
+            'analyzed_size': self.size
+        }
+
+
+def plan_tile_grid(size: Tuple[int, int], tile_size: int = 224, overlap: float = 0.25,
+                   max_tiles: int = 64) -> TileGrid:
+    """
+    Choose a tile grid for an image
+
+    Tiles are taken at native resolution when that fits in `max_tiles`, otherwise the
+    image is scaled down until it does. Small images are scaled up to a single tile.
+
+    Args:
+        size: Original (width, height)
+        tile_size: Tile side in pixels
+        overlap: Fraction of a tile shared with its neighbour, in [0, 1)
+        max_tiles: Maximum number of tiles
+
+    Returns:
+        TileGrid
+    """
+    width, height = size
+    stride = max(1, int(round(tile_size * (1 - overlap))))
+    scale = 1.0
+    while True:
+        cols = max(1, math.ceil((width * scale - tile_size) / stride) + 1)
+        rows = max(1, math.ceil((height * scale - tile_size) / stride) + 1)
+        if rows * cols <= max(1, max_tiles):
+            break
+        scale *= 0.9
+
+    return TileGrid(rows, cols, tile_size, stride, (width, height))
+
+
+def decode_image_tiles(image_data: Union[bytes, BinaryIO], tile_size: int = 224, overlap: float = 0.25,
+                       max_tiles: int = 64) -> Tuple[DecodedImage, TileGrid]:
+    """
+    Decode an image at the resolution of its tile grid
+
+    Args:
+        image_data: Image data as bytes or a seekable binary file object
+        tile_size: Tile side in pixels
+        overlap: Fraction of a tile shared with its neighbour
+        max_tiles: Maximum number of tiles
+
+    Returns:
+        Tuple of (DecodedImage with a normalized float32 array of shape (height, width, 3),
+        TileGrid to cut it with tile_views)
+
+    Raises:
+        ImageDecodeError: If the data is not a supported image
+    """
+    if isinstance(image_data, (bytes, bytearray, memoryview)):
+        image_data = io.BytesIO(image_data)
+
+    try:
+        image = Image.open(image_data)
+    except Exception:
+        raise ImageDecodeError("Invalid image data")
+
+    size, image_format, mode = image.size, image.format, image.mode
+    if mode not in SUPPORTED_MODES:
+        raise ImageDecodeError("Unsupported image format")
+
+    grid = plan_tile_grid(size, tile_size, overlap, max_tiles)
+    try:
+        if image_format == 'JPEG':
+            image.draft('RGB', grid.size)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        if image.size != grid.size:
+            image = image.resize(grid.size)
+        image_array = np.asarray(image, dtype=np.float32) / 255.0
+    except Exception:
+        raise ImageDecodeError("Invalid image data")
+
+    return DecodedImage(image_array, size, image_format, mode), grid
+
+
+def tile_views(image_array: np.ndarray, grid: TileGrid) -> np.ndarray:
+    """
+    Cut an image into its grid of tiles without copying pixels
+
+    Args:
+        image_array: Array of shape (height, width, 3) matching grid.size
+        grid: Tile grid from plan_tile_grid
+
+    Returns:
+        Read-only view of shape (rows, cols, tile_size, tile_size, 3)
+    """
+    windows = np.lib.stride_tricks.sliding_window_view(image_array, (grid.tile_size, grid.tile_size, 3))
+    return windows[::grid.stride, ::grid.stride, 0]
+
+
+def preprocess_image_bytes(image_data: bytes, target_size: Tuple[int, int] = (224, 224)) -> np.ndarray:
+    """
+    Preprocess image bytes for model prediction
+
+    Args:
+        image_data: Image data as bytes
+        target_size: Target size for resizing
+
+    Returns:
+        Normalized float32 array of shape (1, height, width, 3)
+    """
+    return decode_image(image_data, target_size).array
@@ -0,0 +1,162 @@
+"""
+Lazy Service
+Deferred, thread-safe service construction with warm-up and readiness state
+"""
+
+import asyncio
+import importlib
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class LazyService:
+    """
+    Holder that builds a service on first use or in the background
+
+    Attribute access is forwarded to the built service, so a LazyService can stand in
+    for the service itself. Request handlers should `await ensure_loaded()` first so
+    a cold service is built on a worker thread rather than on the event loop.
+    """
+
+    PENDING = "pending"
+    LOADING = "loading"
+    WARMING = "warming"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self, name: str, factory: Callable[[], Any], warm_up: Optional[Callable[[Any], None]] = None):
+        """
+        Initialize the holder
+
+        Args:
+            name: Service name used in logs and health reports
+            factory: Callable building the service
+            warm_up: Optional callable run once on the built service before it is ready
+        """
+        self.name = name
+        self._factory = factory
+        self._warm_up = warm_up
+        self._service = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+        self.state = self.PENDING
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.warm_up_seconds: Optional[float] = None
+
+    @classmethod
+    def from_import(cls, name: str, module: str, class_name: str,
+                    warm_up: Optional[Callable[[Any], None]] = None, **kwargs) -> "LazyService":
+        """
+        Build a holder whose service module is only imported when the service is built
+
+        Args:
+            name: Service name
+            module: Dotted module path
+            class_name: Service class in the module
+            warm_up: Optional warm-up callable
+            **kwargs: Constructor arguments
+
+        Returns:
+            LazyService instance
+        """
+        def factory():
+            return getattr(importlib.import_module(module), class_name)(**kwargs)
+        return cls(name, factory, warm_up)
+
+    @property
+    def ready(self) -> bool:
+        """Whether the service is built and warmed up"""
+        return self._ready.is_set()
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the service object is available (only stored after warm-up, so ready as well)"""
+        return self._service is not None
+
+    def get(self) -> Any:
+        """
+        Get the service, building and warming it up on first call
+
+        Returns:
+            The service instance
+
+        Raises:
+            RuntimeError: If construction failed
+        """
+        if self._ready.is_set():
+            return self._service
+
+        with self._lock:
+            if self._ready.is_set():
+                return self._service
+            if self.state == self.FAILED:
+                raise RuntimeError(f"{self.name} service failed to load: {self.error}")
+
+            try:
+                self.state = self.LOADING
+                started = time.perf_counter()
+                service = self._factory()
+                self.load_seconds = round(time.perf_counter() - started, 3)
+
+                if self._warm_up is not None:
+                    self.state = self.WARMING
+                    started = time.perf_counter()
+                    self._warm_up(service)
+                    self.warm_up_seconds = round(time.perf_counter() - started, 3)
+
+                self._service = service
+                self.state = self.READY
+                self._ready.set()
+                logger.info(f"{self.name} service ready (load {self.load_seconds}s, warm-up {self.warm_up_seconds}s)")
+            except Exception as e:
+                self.state = self.FAILED
+                self.error = str(e)
+                logger.error(f"Error loading {self.name} service: {e}")
+                raise RuntimeError(f"{self.name} service failed to load: {e}")
+
+        return self._service
+
+    async def ensure_loaded(self) -> Any:
+        """Get the service without blocking the event loop while it is built"""
+        if self._ready.is_set():
+            return self._service
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get)
+
+    def start_background(self) -> threading.Thread:
+        """Build the service on a background thread"""
+        def load():
+            try:
+                self.get()
+            except RuntimeError:
+                pass  # Already logged, reported through get_status
+
+        thread = threading.Thread(target=load, name=f"load-{self.name}", daemon=True)
+        thread.start()
+        return thread
+
+    def get_status(self) -> Dict:
+        """
+        Get the loading state
+
+        Returns:
+            Dictionary with state, timings and error if any
+        """
+        return {
+            'state': self.state,
+            'load_seconds': self.load_seconds,
+            'warm_up_seconds': self.warm_up_seconds,
+            'error': self.error
+        }
+
+    def __getattr__(self, item: str) -> Any:
+        # Only reached for attributes not defined on the holder itself
+        if item.startswith('_'):
+            raise AttributeError(item)
+        return getattr(self.get(), item)
@@ -15,7 +15,7 @@ export const API_CONFIG = {
  */
 export const API_ENDPOINTS = {
   // Crop Health
-  analyzeCrop: `${API_CONFIG.baseURL}/analyze-base64`,
+  analyzeCrop: `${API_CONFIG.baseURL}/analyze-raw`,
   
   // Crop Recommendation
   recommendCrop: `${API_CONFIG.baseURL}/recommend-crop`,
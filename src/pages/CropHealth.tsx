@@ -154,30 +154,21 @@ const CropHealth = () => {
       };
       reader.readAsDataURL(file);
 
-      // Convert file to base64 for backend
-      const base64Image = await new Promise<string>((resolve) => {
-        const reader = new FileReader();
-        reader.onloadend = () => {
-          const base64 = reader.result as string;
-          resolve(base64.split(',')[1]); // Remove data:image/...;base64, prefix
-        };
-        reader.readAsDataURL(file);
-      });
-
       toast.info("Analyzing crop image with AI...");
 
+      // Send the file itself as the request body, metadata as query params
+      const params = new URLSearchParams({ user_id: user.id, filename: file.name });
+      const cropType = fields.find(f => f.id === selectedField)?.crop_type;
+      if (selectedField) params.set('field_id', selectedField);
+      if (cropType) params.set('crop_type', cropType);
+
       // Call the FastAPI backend
-      const response = await fetch(API_ENDPOINTS.analyzeCrop, {
+      const response = await fetch(`${API_ENDPOINTS.analyzeCrop}?${params}`, {
         method: 'POST',
         headers: {
-          'Content-Type': 'application/json',
+          'Content-Type': file.type,
         },
-        body: JSON.stringify({
-          image_data: base64Image,
-          field_id: selectedField || null,
-          crop_type: fields.find(f => f.id === selectedField)?.crop_type || null,
-          user_id: user.id
-        })
+        body: file
       });
 
       if (!response.ok) {
@@ -47,6 +47,12 @@ if not exist "models\class_indices.json" (
     exit /b 1
 )
 
+REM Train the crop recommendation model once, the API only loads it
+if not exist "models\crop_recommendation\LATEST" if not exist "models\crop_recommendation_model.pkl" (
+    echo 🌱 Training crop recommendation model...
+    python -m scripts.train_crop_recommendation
+)
+
 REM Set environment variables
 set FLASK_ENV=development
 set DEBUG=True
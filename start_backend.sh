@@ -41,6 +41,12 @@ if [ ! -f "models/class_indices.json" ]; then
     exit 1
 fi
 
+# Train the crop recommendation model once, the API only loads it
+if [ ! -f "models/crop_recommendation/LATEST" ] && [ ! -f "models/crop_recommendation_model.pkl" ]; then
+    echo "🌱 Training crop recommendation model..."
+    python3 -m scripts.train_crop_recommendation
+fi
+
 # Set environment variables
 export FLASK_ENV=development
 export DEBUG=True